@@ -0,0 +1,229 @@
+import json
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field, asdict
+
+# --------------------------------------------------------------------------
+# 특징 분석(analyze_features) 결과 형식
+# 전처리 단계의 분석 프롬프트와 단일 호출(single-pass) 프롬프트가 같은 지침/형식을 쓰고,
+# LLM이 돌려준 JSON은 여기서 관대하게 추출 -> 값 정규화 -> 검증한다.
+# 검증 실패 시 재시도(수리 프롬프트)는 LAWLENS_ANALYSIS_RETRIES회까지만.
+# --------------------------------------------------------------------------
+ANALYSIS_RETRIES = int(os.getenv("LAWLENS_ANALYSIS_RETRIES", "1"))
+FAILED_CRIME = "분석실패"
+TARGET_TYPES = ("개인(닉네임)", "개인(실명/지인)", "집단", "불특정")
+SPACES = ("1:1대화", "소수단톡방", "다수단톡방", "전체채팅/게시판")
+EXPRESSIONS = ("단순욕설", "인격비하", "성적표현", "패드립", "협박", "사실적시")
+SEXUAL_INTENTS = ("없음", "분노표출", "성적흥분/만족", "조롱")
+CANDIDATE_CRIMES = ("모욕", "통신매체이용음란(통매음)", "명예훼손", "협박", "기타")
+RISK_LEVELS = ("높음", "중간", "낮음", "없음")
+
+# PromptTemplate 조각 (중괄호는 이스케이프된 상태)
+FEATURE_GUIDE = """
+        [분석 지침]
+        1. 대상 특정성 (target_type): 개인(닉네임), 개인(실명/지인), 집단, 불특정 중 선택
+        2. 공연성 (space): 1:1대화, 소수단톡방, 다수단톡방, 전체채팅/게시판 중 선택
+        3. 표현 유형 (expression): 단순욕설, 인격비하, 성적표현, 패드립, 협박, 사실적시 중 선택 (복수 가능)
+        4. 목적성 (sexual_intent): 없음, 분노표출, 성적흥분/만족, 조롱 중 선택 (통매음 판단 핵심)
+        5. 범죄 유형 후보 (candidate_crime): 모욕, 통신매체이용음란(통매음), 명예훼손, 협박, 기타 중 선택
+        6. 위험도 (risk_level): 높음, 중간, 낮음, 없음
+        7. STT/OCR 오타 보정 : "박아" vs "밖에", "보지" vs "보지요" 등 발음이 유사한 오타가 있어도 문맥을 보고 원래 의도를 파악하여 판단하세요.
+"""
+
+FEATURE_FORMAT = """
+        {{
+            "features": {{
+                "target_type": "...",
+                "space": "...",
+                "expression": ["...", "..."],
+                "sexual_intent": "..."
+            }},
+            "candidate_crime": "...",
+            "risk_level": "...",
+            "reason": "간단한 분석 이유 한 줄"
+        }}
+"""
+
+
+def _canonical(value, allowed):
+    # "통신매체이용음란"처럼 괄호 설명이 빠진 값도 허용하고, 목록의 표기로 맞춘다
+    value = str(value or "").strip()
+    for item in allowed:
+        if value == item or value == item.split("(")[0]:
+            return item
+    return None
+
+
+def _matches(value, allowed):
+    return _canonical(value, allowed) is not None
+
+
+def validate_analysis(data):
+    # 반환: 오류 메시지 목록 (비어 있으면 통과)
+    if not isinstance(data, dict):
+        return ["JSON 객체가 아님"]
+    errors = []
+    features = data.get("features")
+    if not isinstance(features, dict):
+        errors.append("features 누락")
+        features = {}
+    for key, allowed in (("target_type", TARGET_TYPES), ("space", SPACES), ("sexual_intent", SEXUAL_INTENTS)):
+        if not _matches(features.get(key), allowed):
+            errors.append(f"features.{key} 값 오류: {features.get(key)!r}")
+    expression = features.get("expression")
+    if isinstance(expression, str):
+        expression = [expression]
+    if not isinstance(expression, list) or not all(_matches(item, EXPRESSIONS) for item in expression):
+        errors.append(f"features.expression 값 오류: {expression!r}")
+    if not _matches(data.get("candidate_crime"), CANDIDATE_CRIMES):
+        errors.append(f"candidate_crime 값 오류: {data.get('candidate_crime')!r}")
+    if not _matches(data.get("risk_level"), RISK_LEVELS):
+        errors.append(f"risk_level 값 오류: {data.get('risk_level')!r}")
+    return errors
+
+
+# ---------------------------------------------------------
+# 관대한 JSON 추출
+# 코드 펜스/앞뒤 설명 문장/끝의 쉼표/스마트 따옴표/잘린 닫는 괄호를 허용한다
+# ---------------------------------------------------------
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+
+def find_json_object(text):
+    # 첫 '{'부터 짝이 맞는 '}'까지 (문자열 안의 괄호는 무시). 끝까지 안 닫히면 부족한 괄호를 채운다
+    start = text.find("{")
+    if start < 0:
+        return None
+    stack = []
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return text[start:i + 1]
+    tail = '"' if in_string else ""
+    return text[start:] + tail + "".join(reversed(stack))
+
+
+def extract_json(text):
+    # 반환: (dict 또는 None, 오류 목록)
+    text = str(text or "").translate(_SMART_QUOTES).replace("```json", "").replace("```", "")
+    body = find_json_object(text)
+    if body is None:
+        return None, ["JSON 객체 없음"]
+    for candidate in (body, _TRAILING_COMMA_RE.sub(r"\1", body)):
+        try:
+            return json.loads(candidate), []
+        except ValueError as e:
+            error = f"JSON 파싱 실패: {e}"
+    return None, [error]
+
+
+# ---------------------------------------------------------
+# 결과 모델
+# ---------------------------------------------------------
+@dataclass
+class FeatureAnalysis:
+    target_type: str
+    space: str
+    sexual_intent: str
+    candidate_crime: str
+    risk_level: str
+    expression: list = field(default_factory=list)
+    reason: str = ""
+
+    @classmethod
+    def from_dict(cls, data):
+        # 반환: (FeatureAnalysis 또는 None, 오류 목록)
+        errors = validate_analysis(data)
+        if errors:
+            return None, errors
+        features = data["features"]
+        expression = features.get("expression") or []
+        if isinstance(expression, str):
+            expression = [expression]
+        return cls(
+            target_type=_canonical(features.get("target_type"), TARGET_TYPES),
+            space=_canonical(features.get("space"), SPACES),
+            sexual_intent=_canonical(features.get("sexual_intent"), SEXUAL_INTENTS),
+            candidate_crime=_canonical(data.get("candidate_crime"), CANDIDATE_CRIMES),
+            risk_level=_canonical(data.get("risk_level"), RISK_LEVELS),
+            expression=[_canonical(item, EXPRESSIONS) for item in expression],
+            reason=str(data.get("reason") or ""),
+        ), []
+
+    def to_dict(self):
+        # 나머지 코드가 쓰는 기존 dict 형태 그대로
+        values = asdict(self)
+        return {
+            "features": {key: values[key] for key in ("target_type", "space", "expression", "sexual_intent")},
+            "candidate_crime": values["candidate_crime"],
+            "risk_level": values["risk_level"],
+            "reason": values["reason"],
+        }
+
+
+def parse_analysis(text):
+    # LLM 응답 텍스트 -> (정규화된 분석 dict 또는 None, 오류 목록)
+    data, errors = extract_json(text)
+    if errors:
+        return None, errors
+    analysis, errors = FeatureAnalysis.from_dict(data)
+    return (analysis.to_dict() if analysis else None), errors
+
+
+def failed_analysis(errors):
+    return {"error": "; ".join(errors), "candidate_crime": FAILED_CRIME}
+
+
+# ---------------------------------------------------------
+# 실패 지표 (출처별: features / single_pass)
+# ---------------------------------------------------------
+_METRICS = Counter()
+_METRICS_LOCK = threading.Lock()
+
+
+def record(source, outcome):
+    with _METRICS_LOCK:
+        _METRICS[f"{source}.{outcome}"] += 1
+
+
+def metrics():
+    with _METRICS_LOCK:
+        return dict(_METRICS)
+
+
+# ---------------------------------------------------------
+# 단일 호출 응답: <analysis>JSON</analysis> 뒤에 보고서가 이어진다
+# ---------------------------------------------------------
+ANALYSIS_OPEN = "<analysis>"
+ANALYSIS_CLOSE = "</analysis>"
+
+
+def split_tagged_analysis(text):
+    # 반환: (분석 dict 또는 None, 태그 뒤 나머지 텍스트, 오류 목록)
+    start = text.find(ANALYSIS_OPEN)
+    end = text.find(ANALYSIS_CLOSE)
+    if start < 0 or end < start:
+        record("single_pass", "missing")
+        return None, text, ["<analysis> 태그 없음"]
+    analysis, errors = parse_analysis(text[start + len(ANALYSIS_OPEN):end])
+    record("single_pass", "invalid" if errors else "ok")
+    return analysis, text[end + len(ANALYSIS_CLOSE):], errors
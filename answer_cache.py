@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import threading
+
+from langchain_core.documents import Document
+
+from sqlite_cache import SQLiteCache, cache_path
+
+# --------------------------------------------------------------------------
+# 답변 캐시
+# 1) 정확히 같은 상황: clean_text 결과 + candidate_crime 해시로 조회
+# 2) 거의 같은 상황: 질의 임베딩 코사인 유사도가 임계값 이상이면 재사용
+# 판례 DB가 바뀌면 (corpus_version) 자동으로 다른 키 공간을 사용한다.
+# 같은 저장소에 특징 분석 결과(clean_text 결과 기준)와 고소장 초안(입력 원문 기준)도 보관해,
+# 반복된 상황은 LLM 호출 없이 답할 수 있게 한다. (get_answer_cache()로 전처리기/엔진이 함께 사용)
+# --------------------------------------------------------------------------
+ANSWER_CACHE_ENABLED = os.getenv("LAWLENS_ANSWER_CACHE", "1") != "0"
+ANSWER_CACHE_TTL = float(os.getenv("LAWLENS_ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("LAWLENS_ANSWER_CACHE_MAX_ENTRIES", "5000"))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("LAWLENS_ANSWER_CACHE_MAX_MB", "256")) * 1024 * 1024
+ANSWER_CACHE_SIMILARITY = float(os.getenv("LAWLENS_ANSWER_CACHE_SIMILARITY", "0.97"))
+
+
+def _serialize(result):
+    payload = {
+        "result": result["result"],
+        "docs": [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in result["docs"]],
+        "scores": [None if score is None else float(score) for score in result["scores"]],
+    }
+    if result.get("analysis"):
+        payload["analysis"] = result["analysis"]
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def _deserialize(blob):
+    payload = json.loads(blob.decode("utf-8"))
+    docs = [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in payload["docs"]]
+    result = {"result": payload["result"], "docs": docs, "scores": payload["scores"]}
+    if "analysis" in payload:
+        result["analysis"] = payload["analysis"]
+    return result
+
+
+class AnswerCache:
+    def __init__(self, path=None, ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_MAX_ENTRIES,
+                 max_bytes=ANSWER_CACHE_MAX_BYTES, similarity_threshold=ANSWER_CACHE_SIMILARITY):
+        self.store = SQLiteCache(path or cache_path("answers.sqlite3"), ttl=ttl,
+                                 max_entries=max_entries, max_bytes=max_bytes)
+        self.similarity_threshold = similarity_threshold
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.analysis_hits = 0
+        self.complaint_hits = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_tag(candidate_crime, corpus_version=""):
+        return f"{candidate_crime or ''}|{corpus_version}"
+
+    @staticmethod
+    def make_key(normalized_text, candidate_crime, corpus_version=""):
+        raw = f"{AnswerCache.make_tag(candidate_crime, corpus_version)}\x1f{normalized_text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _count(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    # vector_fn: 정확 일치가 없을 때만 호출되는 질의 임베딩 함수
+    def lookup(self, normalized_text, candidate_crime, corpus_version="", vector_fn=None):
+        key = self.make_key(normalized_text, candidate_crime, corpus_version)
+        blob = self.store.get(key)
+        if blob is not None:
+            self._count("exact_hits")
+            return _deserialize(blob), None
+
+        vector = None
+        if vector_fn is not None and self.similarity_threshold < 1.0:
+            vector = vector_fn()
+            tag = self.make_tag(candidate_crime, corpus_version)
+            match = self.store.nearest(vector, self.similarity_threshold, tag=tag)
+            if match is not None:
+                self._count("near_hits")
+                return _deserialize(match[1]), vector
+
+        self._count("misses")
+        return None, vector
+
+    def store_result(self, normalized_text, candidate_crime, result, corpus_version="", vector=None):
+        key = self.make_key(normalized_text, candidate_crime, corpus_version)
+        tag = self.make_tag(candidate_crime, corpus_version)
+        self.store.put(key, _serialize(result), vector=vector, tag=tag)
+
+    # ---------------------------------------------------------
+    # 특징 분석 / 고소장 초안 (정확히 같은 입력만)
+    # ---------------------------------------------------------
+    @staticmethod
+    def _side_key(kind, text, version=""):
+        return hashlib.sha256(f"{kind}|{version}\x1f{text}".encode("utf-8")).hexdigest()
+
+    def lookup_analysis(self, normalized_text, version=""):
+        blob = self.store.get(self._side_key("analysis", normalized_text, version))
+        if blob is None:
+            return None
+        self._count("analysis_hits")
+        return json.loads(blob.decode("utf-8"))
+
+    def store_analysis(self, normalized_text, analysis, version=""):
+        blob = json.dumps(analysis, ensure_ascii=False).encode("utf-8")
+        self.store.put(self._side_key("analysis", normalized_text, version), blob, tag="analysis")
+
+    def lookup_complaint(self, story):
+        blob = self.store.get(self._side_key("complaint", story))
+        if blob is None:
+            return None
+        self._count("complaint_hits")
+        return blob.decode("utf-8")
+
+    def store_complaint(self, story, complaint):
+        self.store.put(self._side_key("complaint", story), complaint.encode("utf-8"), tag="complaint")
+
+    def stats(self):
+        stats = self.store.stats()
+        lookups = self.exact_hits + self.near_hits + self.misses
+        stats.update({
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "answer_misses": self.misses,
+            "answer_hit_rate": (self.exact_hits + self.near_hits) / lookups if lookups else 0.0,
+            "analysis_hits": self.analysis_hits,
+            "complaint_hits": self.complaint_hits,
+        })
+        return stats
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_answer_cache():
+    global _CACHE
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = AnswerCache()
+    return _CACHE
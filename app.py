@@ -1,9 +1,9 @@
 import streamlit as st
+import startup
 import os
-import pandas as pd
-import altair as alt
+import sys
+import time
 import warnings
-import re 
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,55 +12,42 @@ os.environ["ANONYMIZED_TELEMETRY"] = "False"
 warnings.filterwarnings("ignore")
 
 # 함수 임포트
-from rag_system import run_lawlens_analysis, get_lawlens_advisor, generate_complaint_draft
-from media_utils import extract_text_from_image, extract_text_from_audio
+from rag_system import get_lawlens_advisor, get_engine
 from data_preprocessor import LawLensPreprocessor
+from orchestrator import DiagnosisOrchestrator, SINGLE_PASS
+from result_view import build_view, render_message_dashboard
+from legal_terms import StreamingAnnotator
+import telemetry
+
+# OCR/STT(cv2, pytesseract, whisper -> torch)는 파일을 처음 올렸을 때 startup.media()로 import
+startup.mark("imports")
 
 # 페이지 설정
 st.set_page_config(page_title="LawLens - AI 법률 진단", page_icon="⚖️", layout="wide")
 
 # --------------------------------------------------------------------------
-# 💡 법률 용어 사전 & 툴팁
+# 🔥 공유 리소스 (프로세스당 1회 생성, 모든 세션이 공유)
 # --------------------------------------------------------------------------
-LEGAL_DICTIONARY = {
-    "공연성": "불특정 또는 다수인이 인식할 수 있는 상태 (인터넷 댓글은 기본적으로 충족됨)",
-    "특정성": "제3자가 봤을 때 '이 욕이 누구를 향한 것인지' 알 수 있는 상태",
-    "모욕성": "사실 적시 없이 경멸적 감정을 표현하여 사회적 평가를 떨어뜨리는 것",
-    "비방할 목적": "공익이 아닌, 오로지 상대방을 깎아내리려는 악의적 의도",
-    "전파가능성": "한 사람에게 말했어도, 그 사람이 말을 퍼뜨릴 가능성이 있으면 공연성 인정",
-    "송치": "경찰이 '죄가 있다'고 보아 사건을 검찰로 넘기는 것",
-    "불송치": "경찰이 '죄가 안 된다'고 보아 사건을 자체 종결하는 것",
-    "기소": "검사가 법원에 재판을 청구하는 것",
-    "불기소": "검사가 재판에 넘기지 않고 사건을 끝내는 처분",
-    "기소유예": "죄는 인정되나, 반성 등을 고려해 검사가 한 번 봐주는(재판 X) 처분",
-    "약식명령": "재판 없이 서류 심사만으로 벌금형을 내리는 간소화 절차",
-    "구약식": "검사가 판사에게 벌금형 약식명령을 내려달라고 요청하는 것",
-    "선고유예": "죄가 가벼워 형 선고를 미루고, 2년 뒤 없던 일로 해주는 판결",
-    "집행유예": "형을 선고하되, 감옥에 보내는 것을 일정 기간 미뤄주는 판결",
-    "친고죄": "피해자가 직접 고소해야만 처벌 가능한 범죄 (모욕죄)",
-    "반의사불벌죄": "피해자가 처벌을 원치 않으면 처벌 못 하는 범죄 (명예훼손)",
-    "위법성 조각": "죄의 요건은 갖췄으나 정당방위 등 이유로 처벌하지 않는 것",
-    "사실적시": "허위가 아닌 진실한 사실을 말함",
-    "고소": "피해자가 처벌을 요구하는 것",
-    "고발": "제3자가 처벌을 요구하는 것",
-    "합의": "가해자가 보상하고 피해자가 처벌불원 의사를 밝히는 계약"
-}
-
-def add_legal_tooltips(text):
-    if not text: return ""
-    sorted_keys = sorted(LEGAL_DICTIONARY.keys(), key=len, reverse=True)
-    pattern = re.compile('|'.join(re.escape(key) for key in sorted_keys))
-
-    def replace_func(match):
-        term = match.group(0)
-        definition = LEGAL_DICTIONARY[term]
-        url = f"https://terms.naver.com/search.naver?query={term}"
-        return (
-            f'<a href="{url}" target="_blank" style="text-decoration: none; color: inherit;">'
-            f'<span style="font-weight: bold; border-bottom: 2px dotted #555; cursor: help;" '
-            f'title="💡 {term}: {definition} (클릭 시 백과사전 검색)">{term}</span></a>'
-        )
-    return pattern.sub(replace_func, text)
+@st.cache_resource(show_spinner=False)
+def load_engine():
+    engine = get_engine()
+    engine.warm_up()
+    return engine
+
+@st.cache_resource(show_spinner=False)
+def load_preprocessor():
+    return LawLensPreprocessor()
+
+@st.cache_resource(show_spinner=False)
+def load_orchestrator():
+    return DiagnosisOrchestrator(engine=load_engine(), preprocessor=load_preprocessor())
+
+# LAWLENS_TELEMETRY=1 + LAWLENS_METRICS_PORT 설정 시 Prometheus /metrics 엔드포인트 (프로세스당 1회)
+@st.cache_resource(show_spinner=False)
+def start_metrics_server():
+    return telemetry.start_metrics_server()
+
+start_metrics_server()
 
 # --------------------------------------------------------------------------
 # ⚠️ 음성 파일 법적 효력 안내 팝업
@@ -110,6 +97,10 @@ with st.sidebar:
         ["💬 일반 채팅/게임 (General)", "📰 기사/커뮤니티 악플 (Comments)"],
         captions=["1:1 대화, 롤 채팅 등", "여러 명의 댓글 분석"]
     )
+    single_pass = st.checkbox(
+        "⚡ 빠른 분석 (AI 1회 호출)", value=SINGLE_PASS,
+        help="특징 분석과 보고서를 한 번에 생성합니다. 형식이 맞지 않으면 자동으로 기존 방식으로 다시 분석합니다."
+    )
     
     st.markdown("---")
     st.subheader("📂 증거 파일 업로드")
@@ -143,117 +134,39 @@ with st.sidebar:
     if uploaded_imgs: st.success(f"📷 이미지 {len(uploaded_imgs)}장 준비됨")
     if uploaded_audios: st.success(f"🎤 음성파일 {len(uploaded_audios)}개 준비됨")
 
+    # 단계별 소요 시간 (LAWLENS_TELEMETRY=1 일 때만)
+    if telemetry.enabled():
+        with st.expander("🛠 단계별 소요 시간 (디버그)", expanded=False):
+            spans = telemetry.recent_spans(since=st.session_state.get("turn_started"))
+            if spans:
+                total = max(s["ts"] + s["ms"] / 1000 for s in spans) - min(s["ts"] for s in spans)
+                st.caption(f"마지막 진단 (총 {total:.1f}s)")
+                st.dataframe(
+                    [{"단계": s["span"], "ms": s["ms"], "스레드": s["thread"]} for s in spans],
+                    hide_index=True, width="stretch"
+                )
+            stats = telemetry.summary()
+            st.caption("누적 (프로세스 전체)")
+            st.dataframe(
+                [{"단계": name, "횟수": v["count"], "평균 ms": round(v["mean_ms"], 1), "최대 ms": round(v["max_ms"], 1)}
+                 for name, v in sorted(stats["stages"].items())],
+                hide_index=True, width="stretch"
+            )
+            if stats["counters"]:
+                st.json(stats["counters"], expanded=False)
+            st.caption("앱 시작")
+            st.json(startup.report(), expanded=False)
+
 # ==============================================================================
 # 💬 채팅 및 결과 표시 화면
 # ==============================================================================
-for message in st.session_state.messages:
+for index, message in enumerate(st.session_state.messages):
     with st.chat_message(message["role"]):
         st.markdown(message["content"], unsafe_allow_html=True) 
 
-        # 그래프 및 대시보드
-        if "df" in message and message["df"] is not None:
-            df = message["df"]
-            st.markdown("---")
-            st.subheader("📊 유사 판례 분석 대시보드")
-            
-            if "scores" in message and message["scores"]:
-                scores = message["scores"]
-                avg_score = sum(scores) / len(scores)
-                st.metric("전체 판례 평균 유사도", f"{avg_score*100:.1f}%")
-            else:
-                 st.metric("전체 판례 평균 유사도", "0.0%")
-
-            if not df.empty:
-                # -------------------------------------------------------
-                # [추가] 판결 내용을 '유죄/무죄/기타'로 그룹화하는 로직
-                # -------------------------------------------------------
-                def categorize_judgment(text):
-                    text = str(text)
-                    if any(x in text for x in ['유죄', '벌금', '징역', '선고유예', '집행유예']):
-                        return '유죄'
-                    elif any(x in text for x in ['무죄', '기각', '공소기각', '혐의없음']):
-                        return '무죄'
-                    else:
-                        return '기타'
-                
-                # 데이터프레임에 '판결_구분' 컬럼 추가
-                df['판결_구분'] = df['판결'].apply(categorize_judgment)
-                # -------------------------------------------------------
-
-                col1, col2 = st.columns([1.5, 1])
-                
-                with col1:
-                    st.markdown("##### 📏 판례별 유사도 비교")
-                    sim_chart = alt.Chart(df).mark_bar(color='#ff9f43', cornerRadius=5).encode(
-                        x=alt.X('사건번호:N', sort=None, axis=alt.Axis(labelAngle=-45), title='사건 번호'),
-                        y=alt.Y('유사도(%):Q', scale=alt.Scale(domain=[0, 100]), title='유사도(%)'),
-                        tooltip=[
-                            alt.Tooltip('판례명:N', title='판례명'),
-                            alt.Tooltip('유사도(%):Q', title='유사도(%)', format='.1f')
-                        ]
-                    ).properties(height=250)
-                    st.altair_chart(sim_chart, theme="streamlit")
-
-                with col2:
-                    st.markdown("##### ⚖️ 판결 결과 비율")
-                    # [수정] 도넛 차트 (innerRadius=60) & 색상 고정
-                    pie_chart = alt.Chart(df).mark_arc(innerRadius=60).encode(
-                        theta=alt.Theta(field="판결_구분", aggregate="count", type='quantitative'),
-                        # 색상 매핑: 유죄=빨강, 무죄=파랑, 기타=회색
-                        color=alt.Color('판결_구분:N', 
-                                        scale=alt.Scale(domain=['유죄', '무죄', '기타'], 
-                                                        range=['#e74c3c', '#3498db', "#555455"]),
-                                        legend=alt.Legend(title="판결 구분")),
-                        tooltip=[
-                            alt.Tooltip('판결_구분:N', title='구분'),
-                            alt.Tooltip('count():Q', title='건수'),
-                            alt.Tooltip('판결:N', title='상세 내용') # 마우스 올리면 원래 판결 내용도 보임
-                        ]
-                    ).properties(height=250)
-                    st.altair_chart(pie_chart, theme="streamlit")
-                
-                col3, col4 = st.columns(2)
-                with col3:
-                    st.markdown("##### 💰 벌금 액수 비교")
-                    bar_chart = alt.Chart(df).mark_bar(cornerRadius=5).encode(
-                        x=alt.X('사건번호:N', axis=alt.Axis(labelAngle=-45), title='사건 번호'), 
-                        y=alt.Y('벌금(만원):Q', title='벌금(만원)'),
-                        color=alt.Color('판결:N'),
-                        tooltip=[
-                            alt.Tooltip('사건번호:N', title='사건번호'),
-                            alt.Tooltip('벌금(만원):Q', title='벌금')
-                        ]
-                    ).properties(height=200)
-                    st.altair_chart(bar_chart, theme="streamlit")
-
-                with col4:
-                    st.markdown("##### 📈 연도별 추이")
-                    line_chart = alt.Chart(df).mark_line(point=True).encode(
-                        x=alt.X('연도:O', title='연도'), 
-                        y=alt.Y('벌금(만원):Q', title='벌금(만원)'),
-                        color=alt.value("#8b5c49"),
-                        tooltip=[
-                            alt.Tooltip('연도:O', title='연도'),
-                            alt.Tooltip('벌금(만원):Q', title='벌금')
-                        ]
-                    ).properties(height=200)
-                    st.altair_chart(line_chart, theme="streamlit")
-
-                st.markdown("##### 🔎 상세 판례 데이터 (원본 보기)")
-                #  use_container_width=True를 width="stretch"로 변경
-                st.dataframe(
-                    df,
-                    column_config={
-                        "판례명": st.column_config.TextColumn("판례 제목", width="medium"),
-                        "사건번호": st.column_config.TextColumn("사건 번호"),
-                        "유사도(%)": st.column_config.ProgressColumn("유사도", format="%.1f%%", min_value=0, max_value=100),
-                        "벌금(만원)": st.column_config.NumberColumn("벌금", format="%d 만원"),
-                        "판결": st.column_config.TextColumn("결과"),
-                        "링크": st.column_config.LinkColumn("판례 원본", display_text="전문 보기 🔗")
-                    },
-                    hide_index=True,
-                    width="stretch" 
-                )
+        # 그래프 및 대시보드 (지난 대화는 접어 두고, 마지막 답변만 펼침)
+        if message.get("view") is not None:
+            render_message_dashboard(st, message["view"], key=index, expanded=index == len(st.session_state.messages) - 1)
 
         if "complaint" in message:
             with st.expander("📄 생성된 고소장 초안 (클릭하여 펼치기)", expanded=False):
@@ -321,6 +234,8 @@ else:
 # 🧠 공통 분석 로직
 # ------------------------------------------------------------------------------
 if user_input_trigger and final_query:
+    # 디버그 패널이 이번 진단의 구간만 보여주도록 시작 시각 기록
+    st.session_state["turn_started"] = time.time()
     processed_files_text = ""
     display_msg = ""
     
@@ -328,24 +243,22 @@ if user_input_trigger and final_query:
 
         if uploaded_imgs:
             all_extracted_text = ""
-            for idx, img_file in enumerate(uploaded_imgs):
-                file_ext = os.path.splitext(img_file.name)[1]
-                safe_filename = f"temp_img_{idx}{file_ext}"   
-                with open(safe_filename, "wb") as f: f.write(img_file.getbuffer())
-                extracted = extract_text_from_image(safe_filename)
+            # 메모리에서 바로 디코딩 + 여러 장 병렬 OCR (임시 파일 없음)
+            image_texts = startup.media().extract_texts_from_images([img_file.getvalue() for img_file in uploaded_imgs])
+            for idx, extracted in enumerate(image_texts):
                 if extracted: all_extracted_text += f"\n[이미지 {idx+1}]\n{extracted}\n"
-                if os.path.exists(safe_filename): os.remove(safe_filename)
             if all_extracted_text: processed_files_text += f"\n\n[이미지 내용]\n{all_extracted_text}"
 
         if uploaded_audios:
             all_audio_text = ""
+            partial_box = st.empty()
             for idx, audio_file in enumerate(uploaded_audios):
-                file_ext = os.path.splitext(audio_file.name)[1]
-                safe_filename = f"temp_audio_{idx}{file_ext}"
-                with open(safe_filename, "wb") as f: f.write(audio_file.getbuffer())
-                extracted = extract_text_from_audio(safe_filename, hf_token=HF_TOKEN)
+                # 청크 단위로 인식되는 대로 부분 결과 표시 (임시 파일 없음)
+                def show_partial(text, idx=idx):
+                    partial_box.caption(f"🎤 음성 {idx+1} 인식 중: ...{text[-200:]}")
+                extracted = startup.media().extract_text_from_audio_bytes(audio_file.getvalue(), on_partial=show_partial)
                 if "❌" not in extracted: all_audio_text += f"\n[음성 {idx+1}]\n{extracted}\n"
-                if os.path.exists(safe_filename): os.remove(safe_filename)
+            partial_box.empty()
             if all_audio_text: processed_files_text += f"\n\n[음성 내용]\n{all_audio_text}"
 
         full_query = final_query + processed_files_text
@@ -361,121 +274,70 @@ if user_input_trigger and final_query:
             st.markdown(display_msg)
 
         with st.chat_message("assistant"):
+            advisor = get_lawlens_advisor() # (안 쓰지만 임포트 때문에 남김)
+            orchestrator = load_orchestrator()
+            answer_box = st.empty()
+            turn = {"result": "", "docs": [], "scores": [], "complaint": ""}
+            # 법률 용어 툴팁은 토큰이 들어오는 대로 한 번씩만 변환 (전체 보고서 재변환 X)
+            annotator = StreamingAnnotator()
+
+            def handle_event(event):
+                if event["type"] == "docs":
+                    turn["docs"], turn["scores"] = event["docs"], event["scores"]
+                elif event["type"] == "token":
+                    turn["result"] += event["text"]
+                    annotator.feed(event["text"])
+                    answer_box.markdown(annotator.preview() + " ▌", unsafe_allow_html=True)
+                elif event["type"] == "complaint":
+                    turn["complaint"] = event["text"]
+
+            # 전처리 + 판례 분석 + 고소장 초안을 동시에 시작 (고소장은 백그라운드)
+            events = orchestrator.stream(full_query, single_pass=single_pass)
             with st.spinner("⚖️ 판례 검색 및 법률 분석 중... (유죄 판례 우선 검색)"):
-                advisor = get_lawlens_advisor() # (안 쓰지만 임포트 때문에 남김)
-                processor = LawLensPreprocessor()
-                pre_result = processor.run_pipeline(full_query)
-                
-                analysis = pre_result["analysis"]
-                candidate = analysis.get("candidate_crime", "기타")
-                search_query = f"{pre_result['normalized_text']}\n키워드: {candidate}"
-                
-                # 여기서 run_lawlens_analysis 호출
-                retrieval_result = run_lawlens_analysis(search_query)
-                
-                result_text = retrieval_result["result"]
-                final_docs = retrieval_result["docs"]
-                final_scores = retrieval_result["scores"]
+                for event in events:
+                    handle_event(event)
+                    if event["type"] == "docs": break
+
+            # 답변은 생성되는 대로 화면에 출력
+            for event in events:
+                handle_event(event)
+                if event["type"] in ("done", "complaint"): break
+
+            with st.spinner("📄 경찰서 제출용 고소장 초안 작성 중..."):
+                for event in events:
+                    handle_event(event)
+
+                final_docs = turn["docs"]
+                final_scores = turn["scores"]
+                complaint_text = turn["complaint"]
                 
-                final_display_text = add_legal_tooltips(result_text)
-
-                data_list = []
-                for i, doc in enumerate(final_docs):
-                    meta = doc.metadata
-                    score = final_scores[i] if i < len(final_scores) else 0
-                    data_list.append({
-                        "판례명": meta.get("title", "?"), "사건번호": meta.get("case_id", "?"),
-                        "벌금(만원)": meta.get("fine", 0), "연도": meta.get("year", 2020),
-                        "판결": meta.get("judgment", "기타"), "유사도(%)": score * 100,
-                        "링크": f"https://www.law.go.kr/precSc.do?menuId=7&query={meta.get('case_id','')}"
-                    })
-                df = pd.DataFrame(data_list)
-
-                st.markdown(final_display_text, unsafe_allow_html=True)
-                
-                complaint_text = ""
-                with st.spinner("📄 경찰서 제출용 고소장 초안 작성 중..."):
-                    complaint_text = generate_complaint_draft(full_query)
-                
-                if not df.empty:
-                    st.markdown("---")
-                    st.subheader("📊 대시보드")
-                    
-                    avg_score = sum(final_scores) / len(final_scores) if final_scores else 0
-                    st.metric("전체 판례 평균 유사도", f"{avg_score*100:.1f}%")
-
-                    col1, col2 = st.columns([1.5, 1])
-                    with col1:
-                        st.markdown("##### 📏 판례별 유사도 비교")
-                        sim_chart = alt.Chart(df).mark_bar(color='#ff9f43', cornerRadius=5).encode(
-                            x=alt.X('사건번호:N', sort=None, axis=alt.Axis(labelAngle=-45), title='사건 번호'),
-                            y=alt.Y('유사도(%):Q', scale=alt.Scale(domain=[0, 100]), title='유사도(%)'),
-                            tooltip=[
-                                alt.Tooltip('판례명:N', title='판례명'),
-                                alt.Tooltip('유사도(%):Q', title='유사도(%)', format='.1f')
-                            ]
-                        ).properties(height=250)
-                        st.altair_chart(sim_chart, theme="streamlit")
-                    with col2:
-                        st.markdown("##### ⚖️ 판결 결과 비율")
-                        pie_chart = alt.Chart(df).mark_arc(innerRadius=50).encode(
-                            theta=alt.Theta(field="판결", aggregate="count", type='quantitative'),
-                            color=alt.Color('판결:N', scale=alt.Scale(domain=['유죄', '무죄'], range=['#d9534f', '#5bc0de'])),
-                            tooltip=[
-                                alt.Tooltip('판결:N', title='결과'),
-                                alt.Tooltip('count():Q', title='건수')
-                            ]
-                        ).properties(height=250)
-                        st.altair_chart(pie_chart, theme="streamlit")
-                    
-                    col3, col4 = st.columns(2)
-                    with col3:
-                        st.markdown("##### 💰 벌금 액수 비교")
-                        bar_chart = alt.Chart(df).mark_bar(cornerRadius=5).encode(
-                            x=alt.X('사건번호:N', axis=alt.Axis(labelAngle=-45), title='사건 번호'), 
-                            y=alt.Y('벌금(만원):Q', title='벌금(만원)'),
-                            color=alt.Color('판결:N'),
-                            tooltip=[
-                                alt.Tooltip('사건번호:N', title='사건번호'),
-                                alt.Tooltip('벌금(만원):Q', title='벌금')
-                            ]
-                        ).properties(height=200)
-                        st.altair_chart(bar_chart, theme="streamlit")
-                    with col4:
-                        st.markdown("##### 📈 연도별 추이")
-                        line_chart = alt.Chart(df).mark_line(point=True).encode(
-                            x=alt.X('연도:O', title='연도'), 
-                            y=alt.Y('벌금(만원):Q', title='벌금(만원)'),
-                            color=alt.value("#8b5c49"),
-                            tooltip=[
-                                alt.Tooltip('연도:O', title='연도'),
-                                alt.Tooltip('벌금(만원):Q', title='벌금')
-                            ]
-                        ).properties(height=200)
-                        st.altair_chart(line_chart, theme="streamlit")
-
-                    st.markdown("##### 🔎 상세 판례 데이터 (원본 보기)")
-                    st.dataframe(
-                        df,
-                        column_config={
-                            "판례명": st.column_config.TextColumn("판례 제목", width="medium"),
-                            "사건번호": st.column_config.TextColumn("사건 번호"),
-                            "유사도(%)": st.column_config.ProgressColumn("유사도", format="%.1f%%", min_value=0, max_value=100),
-                            "벌금(만원)": st.column_config.NumberColumn("벌금", format="%d 만원"),
-                            "판결": st.column_config.TextColumn("결과"),
-                            "링크": st.column_config.LinkColumn("판례 원본", display_text="전문 보기 🔗")
-                        },
-                        hide_index=True,
-                        width="stretch" # 데이터프레임 width 수정 완료
-                    )
-                    
+                annotator.flush()
+                final_display_text = annotator.annotated
+                answer_box.markdown(final_display_text, unsafe_allow_html=True)
+
+                # 판례 목록은 열 단위로 한 번만 정리해 저장 (대시보드는 다시 실행된 화면에서 그림)
+                view = build_view(final_docs, final_scores)
+
                 st.session_state.messages.append({
                     "role": "assistant",
                     "content": final_display_text,
-                    "df": df,
-                    "scores": final_scores,
+                    "view": view,
                     "complaint": complaint_text
                 })
                 
                 st.session_state["uploader_key"] += 1
-                st.rerun()
\ No newline at end of file
+                st.rerun()
+
+# ------------------------------------------------------------------------------
+# 첫 화면을 그린 뒤 검색 엔진 백그라운드 예열 + 시작 시간 보고 (프로세스당 1회)
+# ------------------------------------------------------------------------------
+@st.cache_resource(show_spinner=False)
+def finish_startup():
+    startup.mark("first_render")
+    thread = startup.prewarm()
+    if thread is None:
+        # 예열을 하면 예열이 끝난 뒤 startup 쪽에서 한 번만 보고한다
+        print(startup.format_report(), file=sys.stderr)
+    return thread
+
+finish_startup()
@@ -0,0 +1,326 @@
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ALL_COMPLETED, FIRST_COMPLETED, wait
+
+from orchestrator import build_search_query
+from rag_system import get_engine
+
+# --------------------------------------------------------------------------
+# 배치(오프라인) 분석 CLI
+# 신고된 메시지 JSONL을 읽어 전처리 -> 특징 분석 -> 판례 검색 -> 답변 생성을 실행한다.
+# 결과 파일 자체가 체크포인트이므로, 중단 후 같은 명령을 다시 실행하면 남은 항목만 처리한다.
+#
+# 입력 한 줄 예: {"id": "r-0001", "text": "야 이 ..."}
+# 실행 예: python batch_analyze.py reports.jsonl -o results.jsonl --concurrency 8 --llm-rps 4
+# --------------------------------------------------------------------------
+STAGES = ("clean", "features", "retrieval", "generation")
+
+
+class RateLimiter:
+    # 토큰 버킷: 초당 rate회 (burst만큼 몰아서 허용). rate <= 0이면 제한 없음
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        with self._lock:
+            for stage, seconds in latency.items():
+                self.samples.setdefault(stage, []).append(seconds)
+
+    def report(self):
+        lines = []
+        for stage, values in self.samples.items():
+            if not values:
+                continue
+            mean = sum(values) / len(values)
+            lines.append(
+                f"  {stage:<11} n={len(values):<6} mean={mean*1000:8.1f}ms "
+                f"p50={percentile(values, 50)*1000:8.1f}ms p95={percentile(values, 95)*1000:8.1f}ms"
+            )
+        return "\n".join(lines)
+
+
+# ---------------------------------------------------------
+# 입력 / 체크포인트
+# ---------------------------------------------------------
+def iter_items(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            item.setdefault("id", str(line_no))
+            yield item
+
+
+def repair_tail(output_path):
+    # 비정상 종료로 잘린 마지막 줄을 잘라내 다음 기록이 이어 붙지 않게 한다
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        position = size
+        while position > 0:
+            step = min(4096, position)
+            position -= step
+            f.seek(position)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                f.truncate(position + newline + 1)
+                return
+        f.truncate(0)
+
+
+def load_done_ids(output_path):
+    # 오류 없이 끝난 항목만 완료로 본다 (오류 항목은 재실행 시 다시 처리)
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("error") is None and "id" in record:
+                done.add(str(record["id"]))
+    return done
+
+
+# ---------------------------------------------------------
+# 항목 1건 처리
+# ---------------------------------------------------------
+class BatchAnalyzer:
+    def __init__(self, processor, engine, limiter, generate=True):
+        self.processor = processor
+        self.engine = engine
+        self.limiter = limiter
+        self.generate = generate
+
+    def process(self, item):
+        latency = {}
+        record = {"id": str(item["id"])}
+        try:
+            text = item.get("text", "")
+            if self.processor.needs_streaming(text):
+                # 큰 대화 내보내기: 구간별 분석 후 병합 (정제 시간은 features에 포함)
+                started = time.perf_counter()
+                pre_result = self.processor.run_pipeline(text)
+                latency["features"] = time.perf_counter() - started
+                normalized_text, analysis = pre_result["normalized_text"], pre_result["analysis"]
+            else:
+                started = time.perf_counter()
+                normalized_text = self.processor.clean_text(text)
+                latency["clean"] = time.perf_counter() - started
+
+                # 특징 분석의 LLM 호출(수리 재요청 포함)은 전처리기의 limiter가 제한한다
+                started = time.perf_counter()
+                analysis = self.processor.analyze_features(normalized_text)
+                latency["features"] = time.perf_counter() - started
+
+            if "error" in analysis:
+                # 특징 분석 실패는 예외 없이 failed_analysis()로 돌아온다.
+                # 검색/생성을 건너뛰고 오류로 기록해 재실행 시 다시 처리되게 한다.
+                record.update({"normalized_text": normalized_text, "analysis": analysis,
+                               "error": f"AnalysisFailed: {analysis['error']}"})
+                record["latency"] = latency
+                return record
+
+            pre_result = {"raw_text": item.get("text", ""), "normalized_text": normalized_text, "analysis": analysis}
+            search_query = build_search_query(pre_result)
+
+            started = time.perf_counter()
+            selection, inputs = self.engine.prepare(search_query, analysis)
+            latency["retrieval"] = time.perf_counter() - started
+
+            result = selection.get("result", "")
+            if inputs is not None and self.generate:
+                self.limiter.acquire()
+                started = time.perf_counter()
+                result = self.engine.generate(inputs)
+                latency["generation"] = time.perf_counter() - started
+
+            record.update({
+                "normalized_text": normalized_text,
+                "analysis": analysis,
+                "result": result,
+                "prompt_tokens": selection.get("prompt_tokens"),
+                "cases": [
+                    {"case_id": doc.metadata.get("case_id"), "judgment": doc.metadata.get("judgment"), "score": None if score is None else float(score)}
+                    for doc, score in zip(selection["docs"], selection["scores"])
+                ],
+                "error": None,
+            })
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["latency"] = latency
+        return record
+
+
+def run_batch(input_path, output_path, analyzer, concurrency=4, limit=None):
+    repair_tail(output_path)
+    done_ids = load_done_ids(output_path)
+    timer = StageTimer()
+    processed = 0
+    errors = 0
+    started = time.perf_counter()
+
+    def todo():
+        count = 0
+        for item in iter_items(input_path):
+            if str(item["id"]) in done_ids:
+                continue
+            if limit is not None and count >= limit:
+                return
+            count += 1
+            yield item
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="lawlens-batch") as executor:
+        pending = set()
+
+        def drain(return_when):
+            nonlocal processed, errors
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                pending.discard(future)
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                timer.record(record["latency"])
+                processed += 1
+                errors += record["error"] is not None
+            # 완료된 항목은 바로 디스크에 반영 (체크포인트)
+            out.flush()
+            os.fsync(out.fileno())
+
+        try:
+            for item in todo():
+                pending.add(executor.submit(analyzer.process, item))
+                if len(pending) >= concurrency * 2:
+                    drain(FIRST_COMPLETED)
+            while pending:
+                drain(FIRST_COMPLETED)
+        except KeyboardInterrupt:
+            # 시작 전인 항목만 취소하고, 끝났거나 실행 중인 항목은 (어차피 풀 종료 때 기다리므로) 결과를 기록
+            for future in list(pending):
+                if future.cancel():
+                    pending.discard(future)
+            if pending:
+                drain(ALL_COMPLETED)
+            print("\n중단됨: 완료된 항목까지 저장했습니다. 같은 명령으로 다시 실행하면 이어서 처리합니다.", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "skipped": len(done_ids),
+        "processed": processed,
+        "errors": errors,
+        "elapsed": elapsed,
+        "items_per_sec": processed / elapsed if elapsed else 0.0,
+        "timer": timer,
+    }
+
+
+def parquet_engine():
+    # pandas.to_parquet은 pyarrow 또는 fastparquet이 있어야 동작한다
+    for name in ("pyarrow", "fastparquet"):
+        if importlib.util.find_spec(name) is not None:
+            return name
+    return None
+
+
+def write_parquet(jsonl_path, parquet_path):
+    import pandas as pd
+
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    # 재시도된 항목은 마지막 기록만 남김
+    df = pd.DataFrame(records).drop_duplicates(subset="id", keep="last")
+    # 중첩 필드는 JSON 문자열로 저장
+    for column in ("analysis", "cases", "latency"):
+        if column in df:
+            df[column] = df[column].apply(lambda v: json.dumps(v, ensure_ascii=False))
+    df.to_parquet(parquet_path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LawLens 배치 분석 (JSONL 입력)")
+    parser.add_argument("input", help="입력 JSONL (각 줄에 id, text)")
+    parser.add_argument("-o", "--output", required=True, help="결과 JSONL (체크포인트 겸용)")
+    parser.add_argument("--parquet", help="완료 후 Parquet으로도 저장할 경로")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시 처리 항목 수")
+    parser.add_argument("--llm-rps", type=float, default=2.0, help="초당 LLM 호출 수 제한 (0이면 제한 없음)")
+    parser.add_argument("--limit", type=int, help="이번 실행에서 처리할 최대 항목 수")
+    parser.add_argument("--no-generate", action="store_true", help="답변 생성 없이 특징 분석 + 판례 검색만 실행")
+    args = parser.parse_args(argv)
+    if args.parquet and parquet_engine() is None:
+        # 긴 배치가 다 끝난 뒤에 실패하지 않도록 시작 전에 확인
+        parser.error("--parquet에는 pyarrow 또는 fastparquet이 필요합니다 (pip install pyarrow)")
+
+    from data_preprocessor import LawLensPreprocessor
+
+    engine = get_engine()
+    health = engine.warm_up()
+    if not health["ok"]:
+        print(f"엔진 준비 실패: {health}", file=sys.stderr)
+        return 1
+
+    limiter = RateLimiter(args.llm_rps)
+    analyzer = BatchAnalyzer(LawLensPreprocessor(limiter=limiter), engine, limiter, generate=not args.no_generate)
+    summary = run_batch(args.input, args.output, analyzer, concurrency=args.concurrency, limit=args.limit)
+
+    if args.parquet:
+        write_parquet(args.output, args.parquet)
+
+    print(f"처리 {summary['processed']}건 (이전 실행분 {summary['skipped']}건 건너뜀, 오류 {summary['errors']}건)")
+    print(f"소요 {summary['elapsed']:.1f}s, {summary['items_per_sec']:.2f} items/s")
+    print("단계별 지연 시간:")
+    print(summary["timer"].report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
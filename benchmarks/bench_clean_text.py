@@ -0,0 +1,148 @@
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+import emoji
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from text_normalizer import normalize_text
+
+# --------------------------------------------------------------------------
+# clean_text 마이크로 벤치마크
+# 기존 구현(legacy_clean_text)과 새 구현(normalize_text)의 출력이 같은지 확인하고 처리량을 비교한다.
+# 실행: python benchmarks/bench_clean_text.py --mb 4
+# --------------------------------------------------------------------------
+
+def legacy_clean_text(text):
+    if not text:
+        return ""
+    text = re.sub(r'[-=]*\s*\d{4}[년.-]\s*\d{1,2}[월.-]\s*\d{1,2}[일.-]?\s*.*[-=]*', '', text)
+    text = re.sub(r'\[?\s*(오전|오후)?\s*\d{1,2}:\d{2}(:\d{2})?\s*\]?', '', text)
+    system_patterns = [
+        r'.*님이 입장하셨습니다.*',
+        r'.*님이 나갔습니다.*',
+        r'.*님이 .*님을 초대했습니다.*',
+        r'.*채팅방을 나갔습니다.*'
+    ]
+    for pattern in system_patterns:
+        text = re.sub(pattern, '', text)
+    text = re.sub(r'01[016789][-\s.]?\d{3,4}[-\s.]?\d{4}', '[전화번호]', text)
+    text = re.sub(r'(.)\1{2,}', r'\1\1', text)
+    text = emoji.demojize(text, language='ko')
+    text = text.replace(":", " ")
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+SPEAKERS = ["김롤붕", "탑솔러", "정글러", "서폿장인", "미드갓"]
+MESSAGES = [
+    "야이 씨%%%%발 개못생긴 년아 ㅋㅋㅋㅋㅋㅋ",
+    "니네 엄마한테 가서 젖이나 더 먹고와라 🤬",
+    "ㅎㅎㅎㅎ 그만해라 진짜",
+    "내 번호 010-1234-5678 로 연락해",
+    "와 진짜 미쳤다!!!!!! 😂😂😂",
+    "오늘 저녁 7:30에 보자",
+    "이건 일반 대화입니다",
+    "1️⃣ 번부터 정리하면 이렇다",
+]
+SYSTEM_LINES = [
+    "{a}님이 입장하셨습니다.",
+    "{a}님이 나갔습니다.",
+    "{a}님이 {b}님을 초대했습니다.",
+    "{a}님이 채팅방을 나갔습니다.",
+]
+FUZZ_ALPHABET = [
+    "님이 ", "님을 초대했습니다", "입장하셨습니다", "나갔습니다", "채팅방을 나갔습니다",
+    "오전", "오후", "[", "]", ":", "12", "3", "2024", "년", "월", "일", ".", "-", "=",
+    " ", "  ", "\n", "\r", "\t", "010", "1234", "5678", "ㅋ", "ㅋㅋㅋ", "!", "😂", "🤬",
+    "#️⃣", "1⃣", "©", "a", "가", "　", " ",
+    "\u200d", "\ufe0f", "\ufe0e", "♥\ufe0e", "☺\ufe0e", "👨", "👩", "👧", "🏻", "🏽", "🇰", "🇷", "🏴", "\U000e0067", "\U000e007f",
+    "❤", "♀", "👍🏻", "👨\u200d👩\u200d👧", "🏳\ufe0f\u200d🌈",
+]
+
+
+def build_export(target_bytes, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    size = 0
+    day = 1
+    while size < target_bytes:
+        if rng.random() < 0.01:
+            line = f"--------------- 2024년 1월 {day % 28 + 1}일 월요일 ---------------"
+            day += 1
+        elif rng.random() < 0.03:
+            line = rng.choice(SYSTEM_LINES).format(a=rng.choice(SPEAKERS), b=rng.choice(SPEAKERS))
+        else:
+            ampm = rng.choice(["오전", "오후"])
+            line = f"[{rng.choice(SPEAKERS)}] [{ampm} {rng.randint(1, 12)}:{rng.randint(0, 59):02d}] {rng.choice(MESSAGES)}"
+        lines.append(line)
+        size += len(line.encode("utf-8")) + 1
+    return "\n".join(lines)
+
+
+def build_long_line(target_bytes, seed=2):
+    # 줄바꿈 없이 붙여넣은 댓글 모음 (".*" 패턴의 백트래킹이 가장 심한 경우)
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < target_bytes:
+        part = rng.choice(MESSAGES) + " "
+        parts.append(part)
+        size += len(part.encode("utf-8"))
+    return "".join(parts)
+
+
+def fuzz(iterations, seed=1):
+    rng = random.Random(seed)
+    for _ in range(iterations):
+        sample = "".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(0, 40)))
+        expected = legacy_clean_text(sample)
+        actual = normalize_text(sample)
+        if expected != actual:
+            raise AssertionError(f"출력 불일치: {sample!r}\n기존: {expected!r}\n신규: {actual!r}")
+
+
+def timeit(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="clean_text 정규화 벤치마크")
+    parser.add_argument("--mb", type=float, default=2.0, help="합성 대화 내보내기 크기 (MB)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--long-line-kb", type=float, default=32, help="줄바꿈 없는 입력 크기 (KB)")
+    parser.add_argument("--fuzz", type=int, default=20000, help="출력 동일성 퍼징 횟수")
+    args = parser.parse_args()
+
+    fuzz(args.fuzz)
+    text = build_export(int(args.mb * 1024 * 1024))
+    if legacy_clean_text(text) != normalize_text(text):
+        raise AssertionError("합성 대화 내보내기에서 출력 불일치")
+
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+    legacy = timeit(legacy_clean_text, text, args.repeat)
+    current = timeit(normalize_text, text, args.repeat)
+    print(f"입력 크기       : {size_mb:.2f} MB ({text.count(chr(10)) + 1} 줄)")
+    print(f"출력 동일성     : OK (퍼징 {args.fuzz}회 + 합성 내보내기)")
+    print(f"기존 clean_text : {legacy:.3f}s ({size_mb / legacy:.2f} MB/s)")
+    print(f"새 normalizer   : {current:.3f}s ({size_mb / current:.2f} MB/s)")
+    print(f"속도 향상       : x{legacy / current:.2f}")
+
+    line = build_long_line(int(args.long_line_kb * 1024))
+    if legacy_clean_text(line) != normalize_text(line):
+        raise AssertionError("긴 한 줄 입력에서 출력 불일치")
+    legacy = timeit(legacy_clean_text, line, args.repeat)
+    current = timeit(normalize_text, line, args.repeat)
+    print(f"긴 한 줄 ({args.long_line_kb:.0f}KB) : 기존 {legacy:.3f}s / 신규 {current:.4f}s (x{legacy / current:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# 반복 측정이 캐시 적중으로 끝나지 않도록 답변/미디어 캐시는 기본으로 끈다 (모듈 import 전에 설정)
+os.environ.setdefault("LAWLENS_ANSWER_CACHE", "0")
+os.environ.setdefault("LAWLENS_MEDIA_CACHE", "0")
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_preprocessor import LawLensPreprocessor
+from legal_terms import StreamingAnnotator
+from orchestrator import DiagnosisOrchestrator
+from rag_system import LawLensEngine, COLLECTION_NAME
+from result_view import build_view
+import telemetry
+
+from bench_clean_text import build_export
+from fakes import FakeEmbeddings, FakeChatModel, llm_factory
+from fixtures import QUERIES, build_corpus, screenshot, audio_clip
+
+# --------------------------------------------------------------------------
+# 오프라인 종단 간(end-to-end) 벤치마크
+# Gemini LLM/임베딩 대신 결정적인 로컬 백엔드(fakes.py)를 지연 시간만 흉내 내어 넣고,
+# 합성 판례 코퍼스를 임시 Chroma 컬렉션에 적재한 뒤 단계별 지연 시간(p50/p95/p99)과 처리량을 잰다.
+#
+# 단계: clean_text / analyze_features / run_lawlens_analysis / ocr / stt / turn(app.py 한 턴 전체)
+# OCR은 tesseract, STT는 whisper + ffmpeg가 설치되어 있어야 하며 없으면 그 단계만 건너뛴다.
+# 실행 예: python benchmarks/bench_pipeline.py --cases 2000 --iterations 30 --concurrency 4
+#         python benchmarks/bench_pipeline.py --json after.json --baseline before.json
+# --------------------------------------------------------------------------
+STAGES = ("clean_text", "analyze_features", "run_lawlens_analysis", "ocr", "stt", "turn")
+
+
+# ---------------------------------------------------------
+# 1. 측정
+# ---------------------------------------------------------
+def measure(fn, inputs, iterations, warmup=2, concurrency=1):
+    for i in range(warmup):
+        fn(inputs[i % len(inputs)])
+
+    def timed(i):
+        started = time.perf_counter()
+        fn(inputs[i % len(inputs)])
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(timed, range(iterations)))
+    else:
+        latencies = [timed(i) for i in range(iterations)]
+    wall = time.perf_counter() - started
+
+    latencies = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "iterations": iterations, "concurrency": concurrency,
+        "throughput": iterations / wall if wall else 0.0,
+        "mean_ms": float(latencies.mean()), "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+    }
+
+
+# ---------------------------------------------------------
+# 2. 단계별 작업
+# ---------------------------------------------------------
+def media_stages():
+    # tesseract/whisper가 없는 환경에서도 나머지 단계는 돌 수 있도록 여기서만 import
+    import media_utils
+    return media_utils
+
+
+def checked(text, error_prefix):
+    # 추출 함수는 실패해도 에러 문자열을 돌려주므로, 에러 경로를 재는 일이 없도록 여기서 예외로 바꾼다
+    if text.startswith(error_prefix):
+        raise RuntimeError(text)
+    return text
+
+
+def run_turn(orchestrator, query, images=(), audios=()):
+    # app.py 한 턴: 증거 파일 추출 -> 진단 스트림 소비(툴팁 변환 포함) -> 대시보드 레코드
+    extracted = ""
+    if images or audios:
+        media_utils = media_stages()
+        for idx, text in enumerate(media_utils.extract_texts_from_images(list(images))):
+            if text:
+                extracted += f"\n[이미지 {idx+1}]\n{text}\n"
+        for idx, data in enumerate(audios):
+            extracted += f"\n[음성 {idx+1}]\n{media_utils.extract_text_from_audio_bytes(data)}\n"
+
+    annotator = StreamingAnnotator()
+    docs, scores = [], []
+    for event in orchestrator.stream(query + extracted):
+        if event["type"] == "docs":
+            docs, scores = event["docs"], event["scores"]
+        elif event["type"] == "token":
+            annotator.feed(event["text"])
+    annotator.flush()
+    return annotator.annotated, build_view(docs, scores)
+
+
+def stage_functions(args, engine, preprocessor, orchestrator):
+    images = [screenshot()] * args.images
+    audios = [audio_clip(args.audio_seconds)] * args.audios
+    export = build_export(int(args.export_kb * 1024))
+
+    def ocr(_):
+        return [checked(text, "OCR 에러") for text in media_stages().extract_texts_from_images(images)]
+
+    def stt(_):
+        return checked(media_stages().extract_text_from_audio_bytes(audios[0]), "음성 분석 에러")
+
+    def turn(query):
+        media = args.turn_media
+        return run_turn(orchestrator, query, images if media else (), audios if media else ())
+
+    return {
+        "clean_text": (preprocessor.clean_text, [export]),
+        "analyze_features": (preprocessor.analyze_features, list(QUERIES)),
+        "run_lawlens_analysis": (engine.analyze, list(QUERIES)),
+        "ocr": (ocr, [None]),
+        "stt": (stt, [None]),
+        "turn": (turn, list(QUERIES)),
+    }
+
+
+# ---------------------------------------------------------
+# 3. 결과 출력 / 기준 결과와 비교
+# ---------------------------------------------------------
+def print_results(results, baseline=None):
+    print(f"{'단계':<22}{'처리량(/s)':>12}{'p50(ms)':>11}{'p95(ms)':>11}{'p99(ms)':>11}")
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"{name:<22}건너뜀: {result['skipped']}")
+            continue
+        line = (f"{name:<22}{result['throughput']:>12.2f}{result['p50_ms']:>11.1f}"
+                f"{result['p95_ms']:>11.1f}{result['p99_ms']:>11.1f}")
+        before = (baseline or {}).get(name) or {}
+        if before.get("p95_ms"):
+            line += f"   p95 {(result['p95_ms'] / before['p95_ms'] - 1) * 100:+.1f}%"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LawLens 오프라인 종단 간 벤치마크")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"측정할 단계 (쉼표 구분: {', '.join(STAGES)})")
+    parser.add_argument("--cases", type=int, default=1000, help="합성 판례 수")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=1, help="동시 요청 수 (처리량 측정)")
+    parser.add_argument("--llm-first-token", type=float, default=0.3, help="가짜 LLM 첫 토큰 지연 (초)")
+    parser.add_argument("--llm-token", type=float, default=0.002, help="가짜 LLM 토큰당 지연 (초)")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="가짜 임베딩 호출당 지연 (초)")
+    parser.add_argument("--export-kb", type=float, default=64, help="clean_text 입력 크기 (KB)")
+    parser.add_argument("--images", type=int, default=2, help="OCR 단계 스크린샷 수")
+    parser.add_argument("--audios", type=int, default=1)
+    parser.add_argument("--audio-seconds", type=float, default=20.0)
+    parser.add_argument("--turn-media", action="store_true", help="turn 단계에 스크린샷/음성 추출 포함")
+    parser.add_argument("--db", help="코퍼스 경로 (기본: 임시 폴더, 끝나면 삭제)")
+    parser.add_argument("--trace", action="store_true", help="telemetry.py 구간 측정을 켜고 단계 내부 구간별 평균도 출력")
+    parser.add_argument("--json", help="결과를 JSON으로 저장")
+    parser.add_argument("--baseline", help="이전 --json 결과와 p95 비교")
+    args = parser.parse_args(argv)
+
+    telemetry.set_enabled(args.trace)
+    db_path = args.db or tempfile.mkdtemp(prefix="lawlens-bench-")
+    try:
+        started = time.perf_counter()
+        # 적재는 지연 없는 임베딩으로 (측정 대상 아님)
+        summary = build_corpus(db_path, args.cases, FakeEmbeddings())
+        print(f"합성 판례 {summary['upserted']}건 적재: {time.perf_counter() - started:.1f}s ({db_path})")
+
+        engine = LawLensEngine(
+            db_path=db_path, collection_name=COLLECTION_NAME, api_key="offline-benchmark",
+            embeddings=FakeEmbeddings(call_latency=args.embed_latency),
+            llm_factory=llm_factory(args.llm_first_token, args.llm_token),
+        )
+        engine.warm_up()
+        preprocessor = LawLensPreprocessor(llm=FakeChatModel(
+            first_token_latency=args.llm_first_token, token_latency=args.llm_token))
+        orchestrator = DiagnosisOrchestrator(engine=engine, preprocessor=preprocessor)
+
+        functions = stage_functions(args, engine, preprocessor, orchestrator)
+        results = {}
+        for name in filter(None, (stage.strip() for stage in args.stages.split(","))):
+            fn, inputs = functions[name]
+            try:
+                results[name] = measure(fn, inputs, args.iterations, args.warmup, args.concurrency)
+            except (ImportError, OSError, RuntimeError) as e:
+                # tesseract/whisper/ffmpeg 미설치 등
+                results[name] = {"skipped": str(e)}
+            print(f"{name} 완료", file=sys.stderr)
+
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)["results"]
+        print_results(results, baseline)
+        print(f"\nretrieval_modes: {dict(engine.retrieval_modes)}")
+        if args.trace:
+            for name, stage in sorted(telemetry.summary()["stages"].items()):
+                print(f"  {name:<22}{stage['count']:>6}회  평균 {stage['mean_ms']:.1f}ms  최대 {stage['max_ms']:.1f}ms")
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+    finally:
+        if not args.db:
+            shutil.rmtree(db_path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# --------------------------------------------------------------------------
+# 앱 시작(cold start) 벤치마크
+# 새 파이썬 프로세스에서 모듈 묶음을 import하는 데 걸린 시간과 그 직후 RSS를 잰다 (--repeat회 중앙값).
+#   app_text : app.py가 시작할 때 import하는 모듈 (텍스트 채팅만 쓰는 경우)
+#   retrieval: + 판례 검색/생성 백엔드 (첫 질문 또는 백그라운드 예열 시)
+#   media    : + OCR/STT 백엔드 (파일을 처음 올렸을 때)
+# 실행: python benchmarks/bench_startup.py --repeat 5
+# --------------------------------------------------------------------------
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_MODULES = ("startup", "rag_system", "data_preprocessor", "orchestrator", "result_view", "legal_terms", "telemetry")
+PROFILES = {
+    "app_text": APP_MODULES,
+    "retrieval": APP_MODULES + ("langchain_chroma", "langchain_google_genai"),
+    "media": APP_MODULES + ("media_utils",),
+}
+
+PROBE = """
+import importlib, json, sys, time
+started = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - started
+import startup
+print(json.dumps({"seconds": elapsed, "rss_mb": startup.rss_mb(),
+                  "loaded": [m for m in startup.HEAVY_MODULES if m in sys.modules]}))
+"""
+
+
+def probe(modules):
+    env = {**os.environ, "LAWLENS_PREWARM": "none"}
+    proc = subprocess.run([sys.executable, "-c", PROBE, *modules], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import 실패")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LawLens 앱 시작 시간/메모리 벤치마크")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--json", help="결과를 JSON으로 저장")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'구성':<12}{'import(s)':>11}{'RSS(MB)':>10}  로드된 무거운 모듈")
+    for name in args.profiles.split(","):
+        try:
+            runs = [probe(PROFILES[name]) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            results[name] = {"skipped": str(e)}
+            print(f"{name:<12}건너뜀: {e}")
+            continue
+        rss = [run["rss_mb"] for run in runs if run["rss_mb"] is not None]
+        results[name] = {
+            "seconds": statistics.median(run["seconds"] for run in runs),
+            "rss_mb": statistics.median(rss) if rss else None,
+            "loaded": runs[-1]["loaded"],
+        }
+        result = results[name]
+        rss_text = f"{result['rss_mb']:.0f}" if result["rss_mb"] is not None else "?"
+        print(f"{name:<12}{result['seconds']:>11.2f}{rss_text:>10}  {', '.join(result['loaded']) or '-'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
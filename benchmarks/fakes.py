@@ -0,0 +1,137 @@
+import json
+import time
+import zlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from analysis_schema import ANALYSIS_OPEN, ANALYSIS_CLOSE
+from lexical_index import iter_ngrams
+
+# --------------------------------------------------------------------------
+# 벤치마크용 로컬 백엔드 (Gemini 대신 사용, 네트워크 없음)
+# - 같은 입력이면 항상 같은 출력 (결정적)
+# - 지연 시간은 실제 API와 비슷하게 설정 가능: 첫 토큰 지연 + 토큰당 지연 / 호출당 + 문서당 지연
+# --------------------------------------------------------------------------
+EMBEDDING_DIM = 256
+
+CRIME_RULES = (
+    (("엄마", "패드립", "느금"), "모욕"),
+    (("젖", "몸매", "야한"), "통신매체이용음란(통매음)"),
+    (("사기꾼", "전과", "불륜"), "명예훼손"),
+    (("죽여", "찾아간다", "가만 안"), "협박"),
+)
+
+REPORT = """### 1. 📝 AI 사건 정밀 분석
+* **사건 개요:** 상대방이 단체 대화방에서 피해자를 특정할 수 있는 닉네임으로 부르며 욕설을 반복했습니다.
+* **핵심 쟁점:** 모욕성, 공연성, 특정성 충족 여부
+
+### 2. ⚖️ 판례 비교
+메인 판례에서도 다수가 참여한 단톡방에서의 욕설에 대해 공연성을 인정하고 벌금형을 선고했습니다.
+피해자가 처벌을 원치 않으면 합의로 종결될 수 있으나, 모욕죄는 친고죄이므로 고소가 필요합니다.
+
+### 3. 📌 대응 방안
+1. 대화 내용을 캡처해 증거로 보관하세요.
+2. 사이버수사대에 고소장을 제출하면 경찰이 송치 또는 불송치 결정을 합니다.
+3. 검사는 약식명령을 청구(구약식)하거나 기소유예 처분을 할 수 있습니다.
+"""
+
+COMPLAINT = """고 소 장
+
+고소인: 홍길동
+피고소인: 성명불상 (닉네임 기재)
+
+고소 취지: 피고소인을 모욕죄로 고소하오니 처벌하여 주시기 바랍니다.
+범죄 사실: 피고소인은 단체 대화방에서 고소인을 특정하여 욕설을 하였습니다.
+"""
+
+
+# ---------------------------------------------------------
+# 1. 임베딩 (글자 n-gram 해시 -> 고정 차원 벡터, L2 정규화)
+# ---------------------------------------------------------
+class FakeEmbeddings(Embeddings):
+    def __init__(self, call_latency=0.0, per_text_latency=0.0, dim=EMBEDDING_DIM):
+        self.call_latency = call_latency
+        self.per_text_latency = per_text_latency
+        self.dim = dim
+
+    def _vector(self, text):
+        ids = [zlib.crc32(gram.encode("utf-8")) % self.dim for gram in iter_ngrams(text)]
+        vector = np.bincount(ids, minlength=self.dim).astype(np.float32) if ids else np.ones(self.dim, np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        time.sleep(self.call_latency + self.per_text_latency * len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        time.sleep(self.call_latency + self.per_text_latency)
+        return self._vector(text)
+
+
+# ---------------------------------------------------------
+# 2. 채팅 LLM (프롬프트 종류를 보고 정해진 형식의 답을 돌려줌)
+# ---------------------------------------------------------
+def fake_analysis(text):
+    crime = next((crime for keywords, crime in CRIME_RULES if any(k in text for k in keywords)), "모욕")
+    return {
+        "features": {
+            "target_type": "개인(닉네임)",
+            "space": "다수단톡방" if "단톡" in text else "1:1대화",
+            "expression": ["인격비하", "패드립"] if crime == "모욕" else ["단순욕설"],
+            "sexual_intent": "성적흥분/만족" if crime.startswith("통신매체") else "분노표출",
+        },
+        "candidate_crime": crime,
+        "risk_level": "중간",
+        "reason": "벤치마크용 고정 분석",
+    }
+
+
+def fake_response(prompt):
+    if ANALYSIS_OPEN in prompt:
+        analysis = json.dumps(fake_analysis(prompt), ensure_ascii=False)
+        return f"{ANALYSIS_OPEN}{analysis}{ANALYSIS_CLOSE}\n{REPORT}"
+    if "JSON" in prompt:
+        return "```json\n" + json.dumps(fake_analysis(prompt), ensure_ascii=False, indent=2) + "\n```"
+    if "고소장" in prompt and "[사용자 상황]" in prompt and "[분석 데이터]" not in prompt:
+        return COMPLAINT
+    return REPORT
+
+
+def split_tokens(text, size=4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class FakeChatModel(BaseChatModel):
+    first_token_latency: float = 0.0
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "lawlens-fake"
+
+    def _prompt(self, messages):
+        return "\n".join(str(message.content) for message in messages)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        text = fake_response(self._prompt(messages))
+        time.sleep(self.first_token_latency + self.token_latency * len(split_tokens(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        text = fake_response(self._prompt(messages))
+        time.sleep(self.first_token_latency)
+        for token in split_tokens(text):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+def llm_factory(first_token_latency=0.0, token_latency=0.0):
+    # LawLensEngine(llm_factory=...) 형식: 온도를 받아 모델을 돌려준다 (출력은 온도와 무관)
+    def make(temperature=0):
+        return FakeChatModel(first_token_latency=first_token_latency, token_latency=token_latency)
+    return make
@@ -0,0 +1,129 @@
+import io
+import json
+import os
+import random
+import wave
+
+import numpy as np
+
+from ingest_cases import CaseIngestor, iter_records, open_collection, write_manifest
+from lexical_index import build_from_collection, index_path
+from rag_system import COLLECTION_NAME
+
+# --------------------------------------------------------------------------
+# 벤치마크 입력 데이터 (모두 실행 시 생성, 저장소에 바이너리를 두지 않음)
+# 1. 합성 판례 코퍼스 -> 임시 폴더의 Chroma 컬렉션 + 어휘 색인 (ingest_cases.py와 같은 경로로 적재)
+# 2. 채팅 스크린샷 (좌/우 말풍선) PNG 바이트
+# 3. 음성 구간 + 무음이 번갈아 나오는 16kHz WAV 바이트
+# 4. 사용자 질의
+# --------------------------------------------------------------------------
+CRIMES = ("모욕", "통신매체이용음란", "명예훼손", "협박")
+JUDGMENTS = ("벌금 50만원", "벌금 100만원", "벌금 300만원", "징역 6월 집행유예 2년", "선고유예", "무죄", "공소기각")
+SPACES = ("온라인 게임 전체 채팅", "10명이 참여한 단톡방", "인터넷 커뮤니티 게시판", "1:1 개인 메시지", "뉴스 댓글")
+TARGETS = ("닉네임으로 특정되는 피해자", "직장 동료인 피해자", "같은 학교 지인", "불특정 다수")
+INSULTS = ("패드립이 섞인 욕설", "외모를 비하하는 표현", "성적인 표현이 담긴 메시지", "허위사실", "살해하겠다는 말")
+REASONS = (
+    "피해자를 특정할 수 있고 다수가 인식할 수 있는 공간이므로 공연성이 인정된다.",
+    "1:1 대화이므로 전파가능성이 낮아 공연성이 인정되지 않는다.",
+    "성적 수치심을 일으키는 표현으로 성적 욕망을 만족시킬 목적이 인정된다.",
+    "적시한 사실이 허위라는 점에 대한 증명이 부족하다.",
+    "따라서 피고인의 행위는 모욕죄에 해당한다.",
+)
+
+QUERIES = (
+    "롤 전체 채팅에서 상대가 제 닉네임 부르면서 느금마 같은 패드립을 계속 했어요",
+    "단톡방에서 한 명이 제 외모를 비하하면서 10명 앞에서 욕했습니다",
+    "오픈채팅에서 모르는 사람이 야한 사진이랑 몸매 얘기를 계속 보냅니다",
+    "커뮤니티 게시판에 제가 사기꾼이고 전과가 있다는 글이 올라왔어요",
+    "게임 끝나고 DM으로 찾아간다, 죽여버린다고 협박을 받았어요",
+    "회사 동료가 단톡방에서 저를 불륜녀라고 부르며 조롱했어요",
+)
+
+SCREENSHOT_LINES = (
+    ("left", "you are so ugly lol"),
+    ("right", "stop it now"),
+    ("left", "go back to your mom"),
+    ("left", "everyone in this room knows"),
+    ("right", "i will report you"),
+)
+
+
+# ---------------------------------------------------------
+# 1. 합성 판례 코퍼스
+# ---------------------------------------------------------
+def synthetic_cases(count, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        year = rng.randint(2015, 2024)
+        crime = rng.choice(CRIMES)
+        space, target, insult = rng.choice(SPACES), rng.choice(TARGETS), rng.choice(INSULTS)
+        judgment = rng.choice(JUDGMENTS)
+        content = (
+            f"피고인은 {year}. {rng.randint(1, 12)}. {rng.randint(1, 28)}. {space}에서 {target}에게 {insult}을 게시하였다. "
+            f"피고인이 작성한 메시지는 {rng.randint(2, 40)}회 반복 전송되었다. "
+            f"{rng.choice(REASONS)} {rng.choice(REASONS)} "
+            f"이 사건 {crime} 혐의에 대하여 주문과 같이 판결한다."
+        )
+        yield {
+            "case_id": f"{year}고단{1000 + i}", "title": f"{crime} 사건 ({space})",
+            "judgment": judgment, "content": content,
+        }
+
+
+def build_corpus(db_path, count, embeddings, seed=0):
+    # ingest_cases.py와 같은 경로: JSONL -> iter_records -> CaseIngestor -> 매니페스트 -> 어휘 색인
+    os.makedirs(db_path, exist_ok=True)
+    source = os.path.join(db_path, "cases.jsonl")
+    with open(source, "w", encoding="utf-8") as f:
+        for case in synthetic_cases(count, seed):
+            f.write(json.dumps(case, ensure_ascii=False) + "\n")
+    collection = open_collection(db_path, COLLECTION_NAME)
+    summary = CaseIngestor(collection, embeddings, batch_size=256).run(iter_records(source))
+    manifest = write_manifest(db_path, summary)
+    build_from_collection(collection, index_path(db_path), revision=manifest["revision"])
+    return summary
+
+
+# ---------------------------------------------------------
+# 2. 채팅 스크린샷 (cv2 기본 글꼴은 한글을 못 그리므로 영문 대화)
+# ---------------------------------------------------------
+def screenshot(lines=SCREENSHOT_LINES, width=720):
+    import cv2
+
+    row_height = 90
+    img = np.full((row_height * len(lines) + 60, width, 3), 235, dtype=np.uint8)
+    for row, (side, text) in enumerate(lines):
+        (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.9, 2)
+        x = 30 if side == "left" else width - text_w - 60
+        y = 40 + row * row_height
+        color = (255, 255, 255) if side == "left" else (80, 230, 255)
+        cv2.rectangle(img, (x - 15, y), (x + text_w + 15, y + text_h + 30), color, -1)
+        cv2.putText(img, text, (x, y + text_h + 12), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (20, 20, 20), 2, cv2.LINE_AA)
+    ok, encoded = cv2.imencode(".png", img)
+    if not ok:
+        raise RuntimeError("스크린샷 인코딩 실패")
+    return encoded.tobytes()
+
+
+# ---------------------------------------------------------
+# 3. 음성 (말소리 대역 톤 + 무음 구간 -> VAD/청크 분할 경로를 그대로 탄다)
+# ---------------------------------------------------------
+def audio_clip(seconds=20.0, sample_rate=16000, seed=0):
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(int(seconds * sample_rate), dtype=np.float32)
+    pos = 0
+    while pos < len(samples):
+        speech = int(rng.uniform(1.0, 4.0) * sample_rate)
+        t = np.arange(min(speech, len(samples) - pos)) / sample_rate
+        pitch = rng.uniform(120, 260)
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+        samples[pos:pos + len(t)] = 0.3 * envelope * np.sin(2 * np.pi * pitch * t) + 0.02 * rng.standard_normal(len(t))
+        pos += len(t) + int(rng.uniform(0.3, 1.2) * sample_rate)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes())
+    return buffer.getvalue()
@@ -0,0 +1,80 @@
+import re
+
+# --------------------------------------------------------------------------
+# 판례 메타데이터 파생 필드 (판결 구분 / 벌금 / 연도)
+# 판례 DB에 넣을 때 한 번만 계산해 메타데이터에 저장하고,
+# 검색(Chroma where 필터)과 화면(대시보드)이 같은 값을 그대로 쓴다.
+# --------------------------------------------------------------------------
+VERDICT_GUILTY = "유죄"
+VERDICT_ACQUITTAL = "무죄"
+VERDICT_OTHER = "기타"
+
+GUILTY_KEYWORDS = ("유죄", "벌금", "징역", "선고유예", "집행유예")
+ACQUITTAL_KEYWORDS = ("무죄", "기각", "공소기각", "혐의없음")
+
+DERIVED_FIELDS = ("verdict", "fine", "year")
+
+# "벌금 100만원", "벌금 1,500,000원", "벌금 1억 원"
+_FINE_RE = re.compile(r'벌금\s*(?:형)?\s*([\d,]+)\s*(억|만)?\s*원')
+# 사건번호 앞 4자리 연도 (예: 2023고단1234)
+_CASE_YEAR_RE = re.compile(r'^\s*((?:19|20)\d{2})')
+
+
+def classify_verdict(judgment):
+    text = str(judgment or "")
+    if any(keyword in text for keyword in GUILTY_KEYWORDS):
+        return VERDICT_GUILTY
+    if any(keyword in text for keyword in ACQUITTAL_KEYWORDS):
+        return VERDICT_ACQUITTAL
+    return VERDICT_OTHER
+
+
+def _to_int(value):
+    if value is None or value == "":
+        return None
+    try:
+        return int(float(str(value).replace(",", "")))
+    except ValueError:
+        return None
+
+
+def parse_fine(value, judgment=""):
+    # 단위: 만원 (대시보드의 '벌금(만원)'과 같은 단위)
+    fine = _to_int(value)
+    if fine is not None:
+        return fine
+    match = _FINE_RE.search(str(judgment or ""))
+    if not match:
+        return None
+    amount = int(match.group(1).replace(",", ""))
+    unit = match.group(2)
+    if unit == "억":
+        return amount * 10000
+    if unit == "만":
+        return amount
+    return amount // 10000
+
+
+def parse_year(value, case_id=""):
+    year = _to_int(value)
+    if year is not None:
+        return year
+    match = _CASE_YEAR_RE.match(str(case_id or ""))
+    return int(match.group(1)) if match else None
+
+
+def derive_metadata(metadata):
+    # Chroma 메타데이터에는 None을 넣을 수 없으므로 값이 있는 필드만 채운다
+    derived = {"verdict": classify_verdict(metadata.get("judgment"))}
+    fine = parse_fine(metadata.get("fine"), metadata.get("judgment"))
+    if fine is not None:
+        derived["fine"] = fine
+    year = parse_year(metadata.get("year"), metadata.get("case_id"))
+    if year is not None:
+        derived["year"] = year
+    return derived
+
+
+def verdict_of(metadata):
+    # 저장된 값을 우선 사용하고, 예전 DB처럼 없으면 그 자리에서 분류
+    return metadata.get("verdict") or classify_verdict(metadata.get("judgment"))
@@ -0,0 +1,218 @@
+import io
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from text_normalizer import normalize_text
+
+# --------------------------------------------------------------------------
+# 대용량 대화 내보내기(카카오톡 등) 스트리밍 처리
+# 파일을 한 줄씩 읽어 메시지 단위로 정제하고, 화자 경계를 고려해 윈도우로 나눈 뒤
+# 윈도우별 특징 분석을 제한된 동시성으로 실행하고 결과를 하나로 합친다.
+# 전체 텍스트를 메모리에 올리지 않으므로 파일 크기와 무관하게 메모리 사용량이 일정하다.
+# --------------------------------------------------------------------------
+WINDOW_CHARS = 6000
+OVERLAP_MESSAGES = 3
+MAX_WORKERS = 4
+
+# PC: "[닉네임] [오후 2:30] 메시지"
+_PC_LINE_RE = re.compile(r'^\[(?P<speaker>[^\]]+)\]\s*\[(?:오전|오후)?\s*\d{1,2}:\d{2}\]\s*(?P<message>.*)$')
+# 모바일: "2024. 1. 1. 오후 2:30, 닉네임 : 메시지" / "2024년 1월 1일 오후 2:30, 닉네임 : 메시지"
+_MOBILE_LINE_RE = re.compile(
+    r'^\d{4}[.년]\s*\d{1,2}[.월]\s*\d{1,2}[.일]?\s*(?:[가-힣]+요일\s*)?(?:오전|오후)?\s*\d{1,2}:\d{2},\s*'
+    r'(?P<speaker>[^:]+?)\s*:\s*(?P<message>.*)$'
+)
+
+# 정제 후 남은 메시지가 없을 때 (빈 파일, 시스템 메시지/날짜 줄만 있는 파일) - 분석 실패와 구분
+NO_CONTENT_REASON = "분석할 대화 내용이 없습니다."
+
+RISK_ORDER = {"없음": 0, "낮음": 1, "중간": 2, "높음": 3}
+SPACE_ORDER = {"1:1대화": 0, "소수단톡방": 1, "다수단톡방": 2, "전체채팅/게시판": 3}
+
+
+# ---------------------------------------------------------
+# 1. 줄 단위 읽기
+# ---------------------------------------------------------
+def iter_export_lines(source, encoding="utf-8-sig"):
+    # source: 파일 경로 또는 (텍스트/바이너리) 파일 객체
+    if isinstance(source, str):
+        with open(source, "r", encoding=encoding, errors="replace") as f:
+            for line in f:
+                yield line.rstrip("\r\n")
+        return
+    if isinstance(source, io.TextIOBase):
+        for line in source:
+            yield line.rstrip("\r\n")
+        return
+    for line in io.TextIOWrapper(source, encoding=encoding, errors="replace"):
+        yield line.rstrip("\r\n")
+
+
+# ---------------------------------------------------------
+# 2. 화자 인식 + 메시지 단위 정제 (clean_text와 같은 규칙)
+# ---------------------------------------------------------
+def parse_line(line):
+    for pattern in (_PC_LINE_RE, _MOBILE_LINE_RE):
+        match = pattern.match(line)
+        if match:
+            return match.group("speaker").strip(), match.group("message")
+    return None, line
+
+
+def iter_messages(lines):
+    # 헤더가 없는 줄은 직전 화자의 여러 줄 메시지로 본다
+    speaker = None
+    for line in lines:
+        parsed_speaker, message = parse_line(line)
+        if parsed_speaker is not None:
+            speaker = parsed_speaker
+        text = normalize_text(message)
+        if text:
+            yield speaker, text
+
+
+def format_message(speaker, text):
+    return f"[{speaker}] {text}" if speaker else text
+
+
+# ---------------------------------------------------------
+# 3. 화자 경계를 고려한 윈도우 분할
+# ---------------------------------------------------------
+def iter_windows(messages, window_chars=WINDOW_CHARS, overlap_messages=OVERLAP_MESSAGES):
+    # 윈도우가 80%를 넘으면 화자가 바뀌는 지점에서 먼저 자른다
+    soft_limit = int(window_chars * 0.8)
+    buffer = []
+    size = 0
+    index = 0
+    fresh = 0  # 이전 윈도우와 겹치지 않는 새 메시지 수
+
+    def emit():
+        lines = [format_message(s, t) for s, t in buffer]
+        speakers = sorted({s for s, _ in buffer if s})
+        return {"index": index, "text": "\n".join(lines), "speakers": speakers, "messages": len(buffer)}
+
+    for speaker, text in messages:
+        length = len(text) + len(speaker or "") + 3
+        last_speaker = buffer[-1][0] if buffer else None
+        should_cut = fresh and (
+            size + length > window_chars or (size >= soft_limit and speaker != last_speaker)
+        )
+        if should_cut:
+            yield emit()
+            index += 1
+            buffer = buffer[-overlap_messages:] if overlap_messages else []
+            size = sum(len(t) + len(s or "") + 3 for s, t in buffer)
+            fresh = 0
+        buffer.append((speaker, text))
+        size += length
+        fresh += 1
+
+    if fresh:
+        yield emit()
+
+
+# ---------------------------------------------------------
+# 4. 윈도우별 분석 결과 병합
+# ---------------------------------------------------------
+class FeatureMerger:
+    def __init__(self):
+        self.windows = 0
+        self.failed = 0
+        self.best = None
+        self.best_rank = None
+        self.best_text = ""
+        self.space = None
+        self.expressions = []
+        self.crime_votes = Counter()
+        self.speakers = set()
+
+    def add(self, window, analysis):
+        self.windows += 1
+        self.speakers.update(window["speakers"])
+        if not isinstance(analysis, dict) or "error" in analysis:
+            self.failed += 1
+            return
+
+        risk = RISK_ORDER.get(analysis.get("risk_level"), 0)
+        crime = analysis.get("candidate_crime")
+        if crime:
+            # 위험도가 높은 윈도우의 판단에 더 큰 가중치
+            self.crime_votes[crime] += 1 + risk
+
+        features = analysis.get("features") or {}
+        space = features.get("space")
+        if space in SPACE_ORDER and (self.space is None or SPACE_ORDER[space] > SPACE_ORDER[self.space]):
+            self.space = space
+        expression = features.get("expression") or []
+        if isinstance(expression, str):
+            expression = [expression]
+        for item in expression:
+            if item not in self.expressions:
+                self.expressions.append(item)
+
+        # 대표 윈도우: 위험도가 가장 높은 윈도우 (같으면 앞쪽)
+        rank = (risk, -window["index"])
+        if self.best_rank is None or rank > self.best_rank:
+            self.best_rank = rank
+            self.best = analysis
+            self.best_text = window["text"]
+
+    def result(self):
+        if self.windows == 0:
+            analysis = {"features": {}, "candidate_crime": "기타", "risk_level": "없음",
+                        "reason": NO_CONTENT_REASON, "empty": True}
+        elif self.best is None:
+            analysis = {"error": "모든 구간 분석 실패", "candidate_crime": "분석실패"}
+        else:
+            features = dict(self.best.get("features") or {})
+            if self.space:
+                features["space"] = self.space
+            features["expression"] = self.expressions
+            analysis = {
+                "features": features,
+                "candidate_crime": self.crime_votes.most_common(1)[0][0] if self.crime_votes else self.best.get("candidate_crime"),
+                "risk_level": self.best.get("risk_level", "없음"),
+                "reason": self.best.get("reason", ""),
+            }
+        analysis["windows"] = self.windows
+        analysis["failed_windows"] = self.failed
+        return analysis
+
+
+def analyze_windows(windows, analyze_fn, max_workers=MAX_WORKERS):
+    # 실행 중인 작업 수를 max_workers * 2로 제한해 윈도우가 메모리에 쌓이지 않게 한다
+    merger = FeatureMerger()
+    max_in_flight = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lawlens-ingest") as executor:
+        pending = {}
+        for window in windows:
+            pending[executor.submit(analyze_fn, window["text"])] = window
+            if len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _merge_future(merger, pending.pop(future), future)
+        for future in list(pending):
+            _merge_future(merger, pending.pop(future), future)
+    return merger
+
+
+def _merge_future(merger, window, future):
+    try:
+        analysis = future.result()
+    except Exception as e:
+        analysis = {"error": str(e), "candidate_crime": "분석실패"}
+    merger.add(window, analysis)
+
+
+def analyze_export(source, analyze_fn, window_chars=WINDOW_CHARS, overlap_messages=OVERLAP_MESSAGES,
+                   max_workers=MAX_WORKERS):
+    messages = iter_messages(iter_export_lines(source))
+    windows = iter_windows(messages, window_chars=window_chars, overlap_messages=overlap_messages)
+    merger = analyze_windows(windows, analyze_fn, max_workers=max_workers)
+    return {
+        "source": source if isinstance(source, str) else getattr(source, "name", None),
+        # 검색에는 가장 위험도가 높은 구간의 텍스트를 사용
+        "normalized_text": merger.best_text,
+        "analysis": merger.result(),
+        "speakers": sorted(merger.speakers),
+    }
@@ -0,0 +1,148 @@
+import math
+import os
+import re
+
+# --------------------------------------------------------------------------
+# 상담 프롬프트용 판례 컨텍스트 구성 (토큰 예산 적용)
+# 1. 판례 적재 시 본문에서 핵심 사실/판단 문장을 미리 뽑아 메타데이터로 저장 (key_facts, key_holding)
+# 2. 질의 시에는 전체 본문 대신 핵심 문장을 우선 사용하고, 남은 예산 안에서만 본문을 덧붙인다
+# 3. 프롬프트 전체(템플릿 + 질문 + 컨텍스트)의 추정 토큰 수를 요청마다 보고
+# --------------------------------------------------------------------------
+PROMPT_TOKEN_BUDGET = int(os.getenv("LAWLENS_CONTEXT_TOKENS", "6000"))
+MIN_CONTEXT_TOKENS = 600
+MAIN_CASE_SHARE = 0.6
+SPAN_CHARS = 600
+
+FACT_CUES = ("피고인은", "피고인이", "게시", "전송", "발송", "작성", "채팅", "단톡방", "댓글", "메시지")
+HOLDING_CUES = ("판단", "인정", "해당한다", "해당하지", "성립", "이유", "따라서", "그렇다면", "유죄", "무죄", "공연성", "특정")
+
+# 마침표 뒤 공백에서 자르되 '2022. 3. 1.' 같은 날짜는 자르지 않음
+_SENTENCE_RE = re.compile(r'(?<=\D[.?!])\s+|\n+')
+_HANGUL_RE = re.compile(r'[가-힣ㄱ-ㅎㅏ-ㅣ]')
+
+
+# ---------------------------------------------------------
+# 1. 토큰 수 추정 (API 호출 없이)
+# 한글은 글자당 약 0.8토큰, 그 밖의 글자는 4글자당 1토큰 정도로 계산
+# ---------------------------------------------------------
+def estimate_tokens(text):
+    if not text:
+        return 0
+    hangul = len(_HANGUL_RE.findall(text))
+    return math.ceil(hangul * 0.8 + (len(text) - hangul) / 4)
+
+
+def truncate_to_tokens(text, max_tokens):
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # 추정치가 글자 수에 대해 단조 증가하므로 이진 탐색으로 자를 위치를 찾는다
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens - 1:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low].rstrip() + "…"
+
+
+# ---------------------------------------------------------
+# 2. 핵심 문장 추출 (적재 시 1회)
+# ---------------------------------------------------------
+def split_sentences(text):
+    return [s.strip() for s in _SENTENCE_RE.split(text or "") if s and s.strip()]
+
+
+def _pick(sentences, cues, limit):
+    picked = []
+    size = 0
+    for sentence in sentences:
+        if sentence in picked or not any(cue in sentence for cue in cues):
+            continue
+        if size + len(sentence) > limit and picked:
+            break
+        picked.append(sentence[:limit])
+        size += len(sentence)
+    return " ".join(picked)
+
+
+def key_spans(document, limit=SPAN_CHARS):
+    sentences = split_sentences(document)
+    facts = _pick(sentences, FACT_CUES, limit)
+    # 판단 이유는 보통 본문 뒤쪽에 있으므로 뒤에서부터 고른 뒤 원래 순서로 되돌린다
+    holding = _pick(sentences[::-1], HOLDING_CUES, limit)
+    holding = " ".join(reversed(split_sentences(holding))) if holding else ""
+    spans = {}
+    if facts:
+        spans["key_facts"] = facts
+    if holding:
+        spans["key_holding"] = holding
+    return spans
+
+
+def case_spans(doc):
+    # 적재 때 저장된 값을 우선 사용 (예전 DB는 그 자리에서 계산)
+    metadata = doc.metadata
+    if metadata.get("key_facts") or metadata.get("key_holding"):
+        return metadata.get("key_facts", ""), metadata.get("key_holding", "")
+    spans = key_spans(doc.page_content)
+    return spans.get("key_facts", ""), spans.get("key_holding", "")
+
+
+# ---------------------------------------------------------
+# 3. 컨텍스트 조립
+# ---------------------------------------------------------
+def similarity_text(score):
+    # 어휘 색인에서만 찾은 판례는 벡터 유사도가 없다 (BM25 점수는 유사도와 척도가 달라 표시하지 않음)
+    if score is None:
+        return "산출 불가 (키워드 일치로 찾은 판례)"
+    return f"약 {score*100:.1f}%"
+
+
+def _main_case_block(doc, score, budget):
+    metadata = doc.metadata
+    facts, holding = case_spans(doc)
+    header = (
+        f"    [📌 메인 분석 대상 판례]\n"
+        f"    - 판결 결과: {metadata.get('judgment')} (매우 중요!)\n"
+        f"    - 사건번호: {metadata.get('case_id')}\n"
+        f"    - 유사도: {similarity_text(score)}\n"
+    )
+    remaining = budget - estimate_tokens(header)
+    lines = []
+    for label, span in (("핵심 사실", facts), ("법원 판단", holding)):
+        if span and remaining > 0:
+            span = truncate_to_tokens(span, remaining)
+            lines.append(f"    - {label}: {span}\n")
+            remaining -= estimate_tokens(lines[-1])
+    # 핵심 문장을 넣고도 예산이 남으면 본문을 덧붙인다
+    if remaining > 40:
+        lines.append(f"    - 내용: {truncate_to_tokens(doc.page_content, remaining - 10)}\n")
+    return header + "".join(lines)
+
+
+def _other_case_line(i, doc, budget):
+    metadata = doc.metadata
+    _, holding = case_spans(doc)
+    summary = holding or doc.page_content[:100]
+    prefix = f"{i+1}. {metadata.get('case_id')} ({metadata.get('judgment')}): "
+    return prefix + truncate_to_tokens(summary, max(20, budget - estimate_tokens(prefix))) + "\n"
+
+
+def build_context(selection, budget):
+    docs, scores = selection["docs"], selection["scores"]
+    main_budget = int(budget * MAIN_CASE_SHARE)
+    context = "\n" + _main_case_block(docs[0], scores[0], main_budget)
+    context += "\n    [📑 기타 참고 판례]\n    "
+    others = docs[1:]
+    if others:
+        per_case = max(20, (budget - estimate_tokens(context)) // len(others))
+        context += "".join(_other_case_line(i, doc, per_case) for i, doc in enumerate(others))
+    return context
+
+
+def context_budget(template, question, total=PROMPT_TOKEN_BUDGET):
+    # 전체 예산에서 고정 템플릿과 질문이 차지하는 만큼을 빼고 남은 만큼을 판례 컨텍스트에 쓴다
+    return max(MIN_CONTEXT_TOKENS, total - estimate_tokens(template) - estimate_tokens(question))
@@ -1,107 +1,154 @@
-import re
-import emoji
 from langchain_core.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
+import hashlib
+import io
 import json
+import os
+
+from text_normalizer import normalize_text
+from analysis_schema import (
+    FEATURE_GUIDE, FEATURE_FORMAT, ANALYSIS_RETRIES, parse_analysis, failed_analysis, record
+)
+from answer_cache import get_answer_cache
+import chat_ingest
+import telemetry
 
 load_dotenv()
 
+# 특징 분석 응답이 형식 검증을 통과하지 못했을 때 쓰는 수리 프롬프트
+REPAIR_PROMPT = PromptTemplate.from_template("""
+        너는 사이버 범죄 전문 법률 분석가야. 아래 텍스트에 대한 이전 분석 결과가 형식 검증을 통과하지 못했어.
+        오류를 고쳐서 JSON만 다시 출력해.
+
+        [분석할 텍스트]
+        {text}
+
+        [검증 오류]
+        {errors}
+
+        [이전 출력]
+        {previous}
+""" + FEATURE_GUIDE + """
+        [출력 형식 - 반드시 JSON만 출력할 것]""" + FEATURE_FORMAT + """        """)
+
+# 이보다 긴 입력(대화 내보내기 붙여넣기 등)은 프롬프트 하나에 넣지 않고 구간별로 나눠 병렬 분석
+STREAMING_MIN_CHARS = int(os.getenv("LAWLENS_STREAMING_MIN_CHARS", str(chat_ingest.WINDOW_CHARS * 2)))
+
+# 특징 분석 캐시 버전: 분석 기준/출력 형식이 바뀌면 이전 결과를 쓰지 않는다
+ANALYSIS_CACHE_VERSION = hashlib.sha256((FEATURE_GUIDE + FEATURE_FORMAT).encode("utf-8")).hexdigest()[:12]
+
 class LawLensPreprocessor:
-    def __init__(self):
-        # 분석을 위한 LLM 설정
-        self.llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0)
+    def __init__(self, llm=None, limiter=None):
+        # 분석을 위한 LLM 설정 (llm: 벤치마크 등에서 다른 백엔드를 넣을 때 사용)
+        # limiter: acquire()가 있는 호출 속도 제한기 (배치 작업). 수리 재요청을 포함한 모든 LLM 호출 전에 사용
+        if llm is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0)
+        self.llm = llm
+        self.limiter = limiter
+
+    def _invoke(self, chain, inputs):
+        if self.limiter is not None:
+            self.limiter.acquire()
+        return chain.invoke(inputs)
 
     # ---------------------------------------------------------
     # 정규화 (Normalization) & 노이즈 제거 (Noise Cleaning)
     # 파이썬 정규식 사용
     # ---------------------------------------------------------
     def clean_text(self, text):
-        if not text:
-            return ""
-        # 1. 날짜/시간 패턴 강화 (다양한 포맷 대응)
-        # 예: "2024년 1월 1일 월요일", "---- 2024.01.01 ----", "[오전 10:30]", "14:20:55" 등
-        text = re.sub(r'[-=]*\s*\d{4}[년.-]\s*\d{1,2}[월.-]\s*\d{1,2}[일.-]?\s*.*[-=]*', '', text) # 날짜 구분선 제거
-        text = re.sub(r'\[?\s*(오전|오후)?\s*\d{1,2}:\d{2}(:\d{2})?\s*\]?', '', text)  # 타임스탬프 통합 제거
-
-        # 2. 시스템 메시지 제거 (줄 단위 처리로 안전성 확보)
-        # ".*" 패턴은 자칫 일반 대화까지 지울 수 있으므로, 줄의 시작(^)과 끝($)을 명시하거나 특정 키워드 위주로 삭제
-        system_patterns = [
-            r'.*님이 입장하셨습니다.*',
-            r'.*님이 나갔습니다.*',
-            r'.*님이 .*님을 초대했습니다.*',
-            r'.*채팅방을 나갔습니다.*'
-        ]
-        for pattern in system_patterns:
-            text = re.sub(pattern, '', text)
-        # 3. 개인정보(PII) 마스킹
-        # 전화번호 (010-1234-5678, 010 1234 5678) -> [전화번호]
-        text = re.sub(r'01[016789][-\s.]?\d{3,4}[-\s.]?\d{4}', '[전화번호]', text)
-
-        # 4. 반복 문자 축약 
-        text = re.sub(r'(.)\1{2,}', r'\1\1', text)
-
-        # 5. 이모지 변환 시 띄어쓰기 확보
-        # 이모지를 텍스트로 바꿀 때 앞뒤 공백을 넣어 분석기가 단어를 잘 구분하게 함
-        text = emoji.demojize(text, language='ko')
-        text = text.replace(":", " ") # :smile: -> smile (콜론 제거로 토큰화 용이하게)
-
-        # 6. 다중 공백 및 줄바꿈 정리
-        # 타임스탬프 삭제 후 남은 "  " 등을 공백 하나로 통일
-        text = re.sub(r'\s+', ' ', text).strip()
-
-        return text
+        # 구현은 text_normalizer.normalize_text (미리 컴파일된 정규식, 줄 단위 시스템 메시지 제거)
+        # 1. 날짜/타임스탬프 제거 2. 시스템 메시지 제거 3. 전화번호 마스킹
+        # 4. 반복 문자 축약 5. 이모지 -> 텍스트 6. 공백 정리
+        with telemetry.span("clean_text", chars=len(text or "")):
+            return normalize_text(text)
 
     # ---------------------------------------------------------
     # 법률적 판단 및 구조화
     # 규칙으로 짜기 어려운 '맥락'은 LLM에게 시킴
     # ---------------------------------------------------------
     def analyze_features(self, cleaned_text):
+        # 같은 정규화 텍스트는 저장해 둔 분석 결과를 그대로 사용 (LLM 호출 없음, 성공한 결과만 저장)
+        cache = get_answer_cache()
+        cached = self._cached_analysis(cache, cleaned_text)
+        if cached is not None:
+            telemetry.count("analysis_cache_hits")
+            return cached
+        analysis = self._analyze_features(cleaned_text)
+        if cache is not None and "error" not in analysis:
+            try:
+                cache.store_analysis(cleaned_text, analysis, ANALYSIS_CACHE_VERSION)
+            except Exception:
+                pass
+        return analysis
+
+    @staticmethod
+    def _cached_analysis(cache, cleaned_text):
+        if cache is None or not cleaned_text:
+            return None
+        try:
+            return cache.lookup_analysis(cleaned_text, ANALYSIS_CACHE_VERSION)
+        except Exception:
+            return None
+
+    def _analyze_features(self, cleaned_text):
         prompt = PromptTemplate.from_template("""
         너는 사이버 범죄 전문 법률 분석가야. 아래 텍스트를 분석해서 JSON 형식으로 출력해.
         
         [분석할 텍스트]
         {text}
-
-        [분석 지침]
-        1. 대상 특정성 (target_type): 개인(닉네임), 개인(실명/지인), 집단, 불특정 중 선택
-        2. 공연성 (space): 1:1대화, 소수단톡방, 다수단톡방, 전체채팅/게시판 중 선택
-        3. 표현 유형 (expression): 단순욕설, 인격비하, 성적표현, 패드립, 협박, 사실적시 중 선택 (복수 가능)
-        4. 목적성 (sexual_intent): 없음, 분노표출, 성적흥분/만족, 조롱 중 선택 (통매음 판단 핵심)
-        5. 범죄 유형 후보 (candidate_crime): 모욕, 통신매체이용음란(통매음), 명예훼손, 협박, 기타 중 선택
-        6. 위험도 (risk_level): 높음, 중간, 낮음, 없음
-        7. STT/OCR 오타 보정 : "박아" vs "밖에", "보지" vs "보지요" 등 발음이 유사한 오타가 있어도 문맥을 보고 원래 의도를 파악하여 판단하세요.                    
-
-        [출력 형식 - 반드시 JSON만 출력할 것]
-        {{
-            "features": {{
-                "target_type": "...",
-                "space": "...",
-                "expression": ["...", "..."],
-                "sexual_intent": "..."
-            }},
-            "candidate_crime": "...",
-            "risk_level": "...",
-            "reason": "간단한 분석 이유 한 줄"
-        }}
-        """)
+""" + FEATURE_GUIDE + """
+        [출력 형식 - 반드시 JSON만 출력할 것]""" + FEATURE_FORMAT + """        """)
 
         chain = prompt | self.llm
         try:
-            response = chain.invoke({"text": cleaned_text})
-            # JSON 부분만 깔끔하게 추출
-            json_str = response.content.replace("```json", "").replace("```", "").strip()
-            return json.loads(json_str)
+            response = self._invoke(chain, {"text": cleaned_text})
         except Exception as e:
-            return {"error": str(e), "candidate_crime": "분석실패"}
+            record("features", "error")
+            return failed_analysis([str(e)])
+
+        telemetry.count("llm_output_chars", len(response.content), stage="features")
+        # JSON 추출/검증에 실패했을 때만 오류와 이전 출력을 넘겨 다시 요청 (최대 ANALYSIS_RETRIES회)
+        analysis, errors = parse_analysis(response.content)
+        for _ in range(ANALYSIS_RETRIES):
+            if analysis is not None:
+                break
+            record("features", "retry")
+            try:
+                response = self._invoke(REPAIR_PROMPT | self.llm, {
+                    "text": cleaned_text, "errors": "\n".join(errors), "previous": response.content,
+                })
+            except Exception as e:
+                errors = [str(e)]
+                break
+            analysis, errors = parse_analysis(response.content)
+
+        if analysis is None:
+            record("features", "failed")
+            return failed_analysis(errors)
+        record("features", "ok")
+        return analysis
+
+    def needs_streaming(self, raw_text):
+        return len(raw_text or "") > STREAMING_MIN_CHARS
 
     # 전체 파이프라인 실행 함수
     def run_pipeline(self, raw_text):
+        if self.needs_streaming(raw_text):
+            # 큰 입력은 구간별 분석 후 병합 (normalized_text는 위험도가 가장 높은 구간)
+            with telemetry.span("analyze_features", chars=len(raw_text), streaming=True) as stage:
+                final_data = self.run_streaming_pipeline(io.StringIO(raw_text))
+                stage.set(ok="error" not in final_data["analysis"], windows=final_data["analysis"]["windows"])
+            final_data["raw_text"] = raw_text
+            return final_data
+
         # 1단계: 텍스트 정제
         normalized_text = self.clean_text(raw_text)
         
         # 2단계: AI 심층 분석
-        analysis_result = self.analyze_features(normalized_text)
+        with telemetry.span("analyze_features", chars=len(normalized_text)) as stage:
+            analysis_result = self.analyze_features(normalized_text)
+            stage.set(ok="error" not in analysis_result)
         
         # 3단계: 최종 결과 합치기
         final_data = {
@@ -111,6 +158,13 @@ class LawLensPreprocessor:
         }
         return final_data
 
+    # 대용량 대화 내보내기 파일용 파이프라인 (한 줄씩 읽고 구간별 병렬 분석 후 병합)
+    def run_streaming_pipeline(self, source, window_chars=chat_ingest.WINDOW_CHARS,
+                               max_workers=chat_ingest.MAX_WORKERS):
+        return chat_ingest.analyze_export(
+            source, self.analyze_features, window_chars=window_chars, max_workers=max_workers
+        )
+
 # 테스트 실행
 if __name__ == "__main__":
     processor = LawLensPreprocessor()
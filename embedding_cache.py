@@ -0,0 +1,130 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from sqlite_cache import SQLiteCache, cache_path
+
+# --------------------------------------------------------------------------
+# 임베딩 캐시
+# 같은 텍스트는 다시 임베딩 API를 호출하지 않는다.
+# 메모리 LRU (개수 제한) -> SQLite (float32 blob, 용량 제한) -> 원본 임베딩 순으로 조회
+# --------------------------------------------------------------------------
+EMBED_CACHE_ENABLED = os.getenv("LAWLENS_EMBED_CACHE", "1") != "0"
+EMBED_CACHE_MEMORY_ITEMS = int(os.getenv("LAWLENS_EMBED_CACHE_MEMORY_ITEMS", "4096"))
+EMBED_CACHE_MAX_BYTES = int(os.getenv("LAWLENS_EMBED_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+
+def _to_blob(vector):
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def _from_blob(blob):
+    return np.frombuffer(blob, dtype=np.float32).tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    # namespace: 모델명 등 (모델이 바뀌면 다른 키가 된다)
+    def __init__(self, underlying, namespace, store=None, memory_items=EMBED_CACHE_MEMORY_ITEMS):
+        self.underlying = underlying
+        self.namespace = namespace
+        self.store = store or SQLiteCache(cache_path("embeddings.sqlite3"), max_bytes=EMBED_CACHE_MAX_BYTES)
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def _key(self, kind, text):
+        raw = f"{self.namespace}\x1f{kind}\x1f{text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ---------------------------------------------------------
+    # 메모리 LRU
+    # ---------------------------------------------------------
+    def _memory_get(self, key):
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+            return blob
+
+    def _memory_put(self, key, blob):
+        with self._lock:
+            self._memory[key] = blob
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    # ---------------------------------------------------------
+    # 일괄 조회 / 저장
+    # ---------------------------------------------------------
+    def get_many(self, kind, texts):
+        keys = [self._key(kind, text) for text in texts]
+        found = {}
+        for key in keys:
+            blob = self._memory_get(key)
+            if blob is not None:
+                found[key] = blob
+        memory_hits = len(found)
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing:
+            stored = self.store.get_many(missing)
+            for key, blob in stored.items():
+                self._memory_put(key, blob)
+            found.update(stored)
+
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.store_hits += len(found) - memory_hits
+        return keys, found
+
+    def put_many(self, kind, texts, vectors):
+        items = []
+        for text, vector in zip(texts, vectors):
+            key = self._key(kind, text)
+            blob = _to_blob(vector)
+            self._memory_put(key, blob)
+            items.append((key, blob, None, kind))
+        self.store.put_many(items)
+
+    def _embed(self, kind, texts, compute):
+        keys, found = self.get_many(kind, texts)
+
+        # 캐시에 없는 텍스트만 (중복 제거 후) 원본 임베딩 호출
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in pending:
+                pending[key] = text
+        if pending:
+            with self._lock:
+                self.misses += len(pending)
+            new_texts = list(pending.values())
+            vectors = compute(new_texts)
+            self.put_many(kind, new_texts, vectors)
+            for key, vector in zip(pending, vectors):
+                found[key] = _to_blob(vector)
+
+        return [_from_blob(found[key]) for key in keys]
+
+    def embed_documents(self, texts):
+        return self._embed("document", list(texts), self.underlying.embed_documents)
+
+    def embed_query(self, text):
+        return self._embed("query", [text], lambda texts: [self.underlying.embed_query(texts[0])])[0]
+
+    def stats(self):
+        lookups = self.memory_hits + self.store_hits + self.misses
+        return {
+            "memory_items": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.store_hits) / lookups if lookups else 0.0,
+            "store": self.store.stats(),
+        }
@@ -0,0 +1,339 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from case_metadata import derive_metadata
+from lexical_index import build_from_collection, index_path
+from context_builder import key_spans
+
+# --------------------------------------------------------------------------
+# 판례 DB(chroma_db / lawlens_cases) 구축 및 갱신 CLI
+# 1. JSONL/CSV 판례를 한 줄씩 읽어 배치로 묶는다 (메모리 사용량은 배치 크기로 고정)
+# 2. 내용 해시가 DB에 저장된 값과 같으면 건너뛰고, 바뀐 판례만 임베딩
+# 3. 임베딩은 큰 배치 단위 + 재시도(지수 백오프), 결과는 Chroma에 upsert
+# 4. 처리량(건/초)과 단계별 소요 시간을 보고
+# 5. DB가 바뀌면 어휘(BM25) 색인(chroma_db/lexical)도 다시 만든다
+# 판결 구분(verdict)/벌금(만원)/연도는 case_metadata.py 규칙으로,
+# 프롬프트용 핵심 사실/판단 문장(key_facts/key_holding)은 context_builder.py 규칙으로 여기서 한 번만 계산해 저장한다.
+#
+# 입력 한 줄 예: {"case_id": "2023고단1234", "title": "모욕", "judgment": "벌금 100만원",
+#                 "fine": 100, "year": 2023, "content": "피고인은 ..."}
+# 실행 예: python ingest_cases.py cases.jsonl --batch-size 256 --embed-workers 2
+#         python ingest_cases.py --backfill   (기존 DB에 파생 필드/핵심 문장만 채우기, 재임베딩 없음)
+# --------------------------------------------------------------------------
+BATCH_SIZE = 128
+EMBED_WORKERS = 2
+MAX_RETRIES = 6
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+CONTENT_FIELDS = ("content", "text", "page_content", "document")
+METADATA_FIELDS = ("case_id", "judgment", "fine", "year", "title")
+HASH_KEY = "content_hash"
+MANIFEST_NAME = "lawlens_manifest.json"
+
+
+# ---------------------------------------------------------
+# 1. 입력 읽기
+# ---------------------------------------------------------
+def iter_raw_records(path):
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                yield row
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def build_metadata(raw):
+    metadata = {
+        "case_id": str(raw.get("case_id", "")).strip(),
+        "judgment": str(raw.get("judgment") or "").strip(),
+        "title": str(raw.get("title") or "").strip(),
+    }
+    metadata.update(derive_metadata({**metadata, "fine": raw.get("fine"), "year": raw.get("year")}))
+    return metadata
+
+
+def content_hash(document, metadata):
+    payload = json.dumps({"document": document, "metadata": metadata}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def iter_records(path):
+    # 판례 1건 -> {"id", "document", "metadata"} (case_id 또는 본문이 없으면 건너뜀)
+    for raw in iter_raw_records(path):
+        document = next((raw[field] for field in CONTENT_FIELDS if raw.get(field)), "")
+        metadata = build_metadata(raw)
+        if not metadata["case_id"] or not document:
+            yield None
+            continue
+        # 해시는 원본 필드로만 계산 (파생 규칙이 바뀌면 --backfill로 갱신, 재임베딩 불필요)
+        metadata[HASH_KEY] = content_hash(document, {field: raw.get(field) for field in METADATA_FIELDS})
+        metadata.update(key_spans(document))
+        yield {"id": metadata["case_id"], "document": document, "metadata": metadata}
+
+
+def iter_batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ---------------------------------------------------------
+# 2. 임베딩 (재시도 + 지수 백오프)
+# ---------------------------------------------------------
+def with_retry(fn, retries=MAX_RETRIES, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception:
+            if attempt == retries:
+                raise
+            # 동시에 실패한 배치들이 같은 순간에 다시 몰리지 않도록 지터를 섞는다
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+# ---------------------------------------------------------
+# 3. 증분 upsert
+# ---------------------------------------------------------
+class CaseIngestor:
+    def __init__(self, collection, embeddings, batch_size=BATCH_SIZE, embed_workers=EMBED_WORKERS, force=False):
+        self.collection = collection
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.embed_workers = max(1, embed_workers)
+        self.force = force
+        self.stats = {"read": 0, "invalid": 0, "unchanged": 0, "upserted": 0, "failed": 0,
+                      "embed_seconds": 0.0, "upsert_seconds": 0.0}
+
+    def _dedupe(self, batch):
+        # 같은 배치 안에 같은 case_id가 여러 번 있으면 마지막 것만 사용
+        records = {}
+        for record in batch:
+            if record is None:
+                self.stats["invalid"] += 1
+            else:
+                records[record["id"]] = record
+        return list(records.values())
+
+    def changed(self, records):
+        if self.force or not records:
+            return records
+        existing = self.collection.get(ids=[r["id"] for r in records], include=["metadatas"])
+        stored = {
+            id_: (metadata or {}).get(HASH_KEY)
+            for id_, metadata in zip(existing["ids"], existing["metadatas"])
+        }
+        changed = [r for r in records if stored.get(r["id"]) != r["metadata"][HASH_KEY]]
+        self.stats["unchanged"] += len(records) - len(changed)
+        return changed
+
+    def embed(self, records):
+        started = time.perf_counter()
+        vectors = with_retry(lambda: self.embeddings.embed_documents([r["document"] for r in records]))
+        return records, vectors, time.perf_counter() - started
+
+    def upsert(self, records, vectors):
+        started = time.perf_counter()
+        self.collection.upsert(
+            ids=[r["id"] for r in records],
+            embeddings=[list(v) for v in vectors],
+            documents=[r["document"] for r in records],
+            metadatas=[r["metadata"] for r in records],
+        )
+        self.stats["upsert_seconds"] += time.perf_counter() - started
+        self.stats["upserted"] += len(records)
+
+    def run(self, records, on_progress=None):
+        started = time.perf_counter()
+        # 임베딩 배치는 embed_workers개까지 동시에, 대기 중인 배치는 그 2배까지만 유지
+        max_in_flight = self.embed_workers * 2
+        with ThreadPoolExecutor(max_workers=self.embed_workers, thread_name_prefix="lawlens-embed") as executor:
+            pending = {}
+
+            def drain(return_when):
+                done, _ = wait(pending, return_when=return_when)
+                for future in done:
+                    size = pending.pop(future)
+                    try:
+                        batch, vectors, seconds = future.result()
+                    except Exception as e:
+                        self.stats["failed"] += size
+                        print(f"임베딩 실패 ({size}건): {e}", file=sys.stderr)
+                        continue
+                    self.stats["embed_seconds"] += seconds
+                    self.upsert(batch, vectors)
+                if on_progress is not None:
+                    on_progress(self.report(time.perf_counter() - started))
+
+            for batch in iter_batches(records, self.batch_size):
+                self.stats["read"] += len(batch)
+                todo = self.changed(self._dedupe(batch))
+                if not todo:
+                    continue
+                pending[executor.submit(self.embed, todo)] = len(todo)
+                if len(pending) >= max_in_flight:
+                    drain(FIRST_COMPLETED)
+            while pending:
+                drain(FIRST_COMPLETED)
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed):
+        summary = dict(self.stats)
+        summary["elapsed"] = elapsed
+        summary["records_per_sec"] = self.stats["read"] / elapsed if elapsed else 0.0
+        summary["upserts_per_sec"] = self.stats["upserted"] / elapsed if elapsed else 0.0
+        return summary
+
+
+# ---------------------------------------------------------
+# 4. DB 개정 번호 (답변 캐시 무효화용)
+# 문서 수가 같아도 내용이 바뀌면 캐시된 답변을 다시 쓰지 않도록 DB 폴더에 기록한다
+# ---------------------------------------------------------
+def manifest_path(db_path):
+    return os.path.join(db_path, MANIFEST_NAME)
+
+
+def read_manifest(db_path):
+    try:
+        with open(manifest_path(db_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(db_path, summary):
+    manifest = read_manifest(db_path)
+    manifest.update({
+        "revision": int(manifest.get("revision", 0)) + 1,
+        "updated_at": time.time(),
+        "last_ingest": {k: summary[k] for k in ("read", "unchanged", "upserted", "failed")},
+    })
+    tmp = manifest_path(db_path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, manifest_path(db_path))
+    return manifest
+
+
+# ---------------------------------------------------------
+# 5. 파생 필드 백필 (기존 DB, 임베딩은 그대로)
+# ---------------------------------------------------------
+def backfill(collection, page_size=1000):
+    checked = updated = 0
+    offset = 0
+    while True:
+        page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        ids, metadatas = [], []
+        for id_, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+            metadata = metadata or {}
+            derived = {**derive_metadata(metadata), **key_spans(document)}
+            if any(metadata.get(field) != value for field, value in derived.items()):
+                ids.append(id_)
+                metadatas.append({**metadata, **derived})
+        if ids:
+            collection.update(ids=ids, metadatas=metadatas)
+        checked += len(page["ids"])
+        updated += len(ids)
+        offset += len(page["ids"])
+    return {"checked": checked, "updated": updated}
+
+
+def open_collection(db_path, collection_name):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=db_path)
+    return client.get_or_create_collection(collection_name)
+
+
+def format_progress(summary):
+    return (f"\r읽음 {summary['read']} / 변경 없음 {summary['unchanged']} / 저장 {summary['upserted']} / "
+            f"실패 {summary['failed']} ({summary['records_per_sec']:.1f}건/s)")
+
+
+def ingest(args, collection):
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    from rag_system import EMBEDDING_MODEL
+
+    ingestor = CaseIngestor(
+        collection,
+        GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL),
+        batch_size=args.batch_size,
+        embed_workers=args.embed_workers,
+        force=args.force,
+    )
+    summary = ingestor.run(iter_records(args.input),
+                           on_progress=lambda s: print(format_progress(s), end="", file=sys.stderr))
+    print(file=sys.stderr)
+
+    if summary["upserted"]:
+        manifest = write_manifest(args.db, summary)
+        print(f"DB 개정 번호: {manifest['revision']} (실행 중인 앱은 engine.reload()로 반영)")
+
+    print(f"읽음 {summary['read']}건 (형식 오류 {summary['invalid']}건, 변경 없음 {summary['unchanged']}건)")
+    print(f"저장 {summary['upserted']}건, 실패 {summary['failed']}건")
+    print(f"소요 {summary['elapsed']:.1f}s, {summary['records_per_sec']:.1f}건/s "
+          f"(임베딩 {summary['embed_seconds']:.1f}s, 저장 {summary['upsert_seconds']:.1f}s)")
+    return summary
+
+
+def main(argv=None):
+    from rag_system import DB_PATH, COLLECTION_NAME
+
+    parser = argparse.ArgumentParser(description="LawLens 판례 DB 구축/갱신 (JSONL/CSV 입력)")
+    parser.add_argument("input", nargs="?", help="판례 JSONL 또는 CSV (case_id, judgment, fine, year, title, content)")
+    parser.add_argument("--db", default=DB_PATH, help="Chroma 저장 경로")
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="임베딩 API 1회 호출당 판례 수")
+    parser.add_argument("--embed-workers", type=int, default=EMBED_WORKERS, help="동시에 임베딩할 배치 수")
+    parser.add_argument("--force", action="store_true", help="내용 해시와 무관하게 전부 다시 임베딩")
+    parser.add_argument("--backfill", action="store_true", help="기존 판례에 판결 구분/벌금/연도/핵심 문장 메타데이터만 다시 계산")
+    parser.add_argument("--rebuild-lexical", action="store_true", help="변경 여부와 무관하게 어휘(BM25) 색인 다시 만들기")
+    parser.add_argument("--no-lexical", action="store_true", help="어휘(BM25) 색인을 갱신하지 않음")
+    args = parser.parse_args(argv)
+    if not args.input and not args.backfill and not args.rebuild_lexical:
+        parser.error("input, --backfill, --rebuild-lexical 중 하나가 필요합니다")
+
+    collection = open_collection(args.db, args.collection)
+    changed = False
+    failed = 0
+
+    if args.backfill:
+        result = backfill(collection)
+        if result["updated"]:
+            changed = True
+            write_manifest(args.db, {"read": result["checked"], "unchanged": result["checked"] - result["updated"],
+                                     "upserted": result["updated"], "failed": 0})
+        print(f"확인 {result['checked']}건, 메타데이터 갱신 {result['updated']}건")
+
+    if args.input:
+        summary = ingest(args, collection)
+        changed = changed or summary["upserted"] > 0
+        failed = summary["failed"]
+
+    if not args.no_lexical and (changed or args.rebuild_lexical):
+        started = time.perf_counter()
+        lexical = build_from_collection(collection, index_path(args.db), revision=read_manifest(args.db).get("revision"))
+        print(f"어휘 색인: 문서 {lexical['docs']}건, 게시 {lexical['postings']}개 ({time.perf_counter() - started:.1f}s)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+import html
+import json
+import os
+from collections import deque
+
+# --------------------------------------------------------------------------
+# 💡 법률 용어 사전 & 툴팁
+# 용어 사전으로 Aho-Corasick 자동자를 import 시 한 번만 만들고, 보고서를 한 번만 훑어 용어에 툴팁을 단다.
+# - 정규식 alternation과 같은 규칙: 가장 왼쪽에서 시작하는 용어 중 가장 긴 것 (겹치면 앞의 것 우선)
+# - 스트리밍: 용어가 청크 경계에 걸칠 수 있으므로 (가장 긴 용어 길이 - 1)글자만 남겨 두고 나머지는 바로 내보낸다
+# - LAWLENS_LEGAL_TERMS: 추가 사전 파일 (JSON {"용어": "설명"} 또는 한 줄에 "용어<TAB>설명")
+# --------------------------------------------------------------------------
+LEGAL_TERMS_PATH = os.getenv("LAWLENS_LEGAL_TERMS", "")
+SEARCH_URL = "https://terms.naver.com/search.naver?query={term}"
+
+LEGAL_DICTIONARY = {
+    "공연성": "불특정 또는 다수인이 인식할 수 있는 상태 (인터넷 댓글은 기본적으로 충족됨)",
+    "특정성": "제3자가 봤을 때 '이 욕이 누구를 향한 것인지' 알 수 있는 상태",
+    "모욕성": "사실 적시 없이 경멸적 감정을 표현하여 사회적 평가를 떨어뜨리는 것",
+    "비방할 목적": "공익이 아닌, 오로지 상대방을 깎아내리려는 악의적 의도",
+    "전파가능성": "한 사람에게 말했어도, 그 사람이 말을 퍼뜨릴 가능성이 있으면 공연성 인정",
+    "송치": "경찰이 '죄가 있다'고 보아 사건을 검찰로 넘기는 것",
+    "불송치": "경찰이 '죄가 안 된다'고 보아 사건을 자체 종결하는 것",
+    "기소": "검사가 법원에 재판을 청구하는 것",
+    "불기소": "검사가 재판에 넘기지 않고 사건을 끝내는 처분",
+    "기소유예": "죄는 인정되나, 반성 등을 고려해 검사가 한 번 봐주는(재판 X) 처분",
+    "약식명령": "재판 없이 서류 심사만으로 벌금형을 내리는 간소화 절차",
+    "구약식": "검사가 판사에게 벌금형 약식명령을 내려달라고 요청하는 것",
+    "선고유예": "죄가 가벼워 형 선고를 미루고, 2년 뒤 없던 일로 해주는 판결",
+    "집행유예": "형을 선고하되, 감옥에 보내는 것을 일정 기간 미뤄주는 판결",
+    "친고죄": "피해자가 직접 고소해야만 처벌 가능한 범죄 (모욕죄)",
+    "반의사불벌죄": "피해자가 처벌을 원치 않으면 처벌 못 하는 범죄 (명예훼손)",
+    "위법성 조각": "죄의 요건은 갖췄으나 정당방위 등 이유로 처벌하지 않는 것",
+    "사실적시": "허위가 아닌 진실한 사실을 말함",
+    "고소": "피해자가 처벌을 요구하는 것",
+    "고발": "제3자가 처벌을 요구하는 것",
+    "합의": "가해자가 보상하고 피해자가 처벌불원 의사를 밝히는 계약"
+}
+
+
+def load_dictionary(path):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return {str(k).strip(): str(v).strip() for k, v in json.load(f).items() if str(k).strip()}
+        terms = {}
+        for line in f:
+            term, sep, definition = line.rstrip("\n").partition("\t")
+            if sep and term.strip() and not term.startswith("#"):
+                terms[term.strip()] = definition.strip()
+        return terms
+
+
+def tooltip_html(term, definition):
+    # 파일에서 불러온 용어/설명에 따옴표나 '<'가 있어도 마크업이 깨지지 않도록 이스케이프
+    url = html.escape(SEARCH_URL.format(term=term), quote=True)
+    definition = html.escape(definition, quote=True)
+    term = html.escape(term, quote=True)
+    return (
+        f'<a href="{url}" target="_blank" style="text-decoration: none; color: inherit;">'
+        f'<span style="font-weight: bold; border-bottom: 2px dotted #555; cursor: help;" '
+        f'title="💡 {term}: {definition} (클릭 시 백과사전 검색)">{term}</span></a>'
+    )
+
+
+# ---------------------------------------------------------
+# 1. 용어 자동자 (Aho-Corasick)
+# ---------------------------------------------------------
+class TermMatcher:
+    def __init__(self, dictionary):
+        self.replacements = {term: tooltip_html(term, definition) for term, definition in dictionary.items()}
+        self.max_len = max(map(len, self.replacements), default=0)
+        # 노드별: 다음 글자 -> 노드, 실패 링크, 이 노드에서 끝나는 용어 길이들 (실패 링크 쪽 출력 포함)
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+        for term in self.replacements:
+            node = 0
+            for ch in term:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                node = nxt
+            self.out[node] = (len(term),)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                target = self.goto[state].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, text):
+        # 반환: 겹치지 않는 (시작, 끝) 목록 - 가장 왼쪽, 같은 시작이면 가장 긴 용어
+        candidates = []
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length in out[node]:
+                candidates.append((i + 1 - length, i + 1))
+        candidates.sort(key=lambda span: (span[0], -span[1]))
+        matches = []
+        last_end = 0
+        for start, end in candidates:
+            if start >= last_end:
+                matches.append((start, end))
+                last_end = end
+        return matches
+
+    def render(self, text, matches):
+        parts = []
+        pos = 0
+        for start, end in matches:
+            parts.append(text[pos:start])
+            parts.append(self.replacements[text[start:end]])
+            pos = end
+        parts.append(text[pos:])
+        return "".join(parts)
+
+    def annotate(self, text):
+        if not text:
+            return ""
+        return self.render(text, self.find(text))
+
+
+# ---------------------------------------------------------
+# 2. 스트리밍 주석기 (청크가 올 때마다 확정된 앞부분만 변환)
+# ---------------------------------------------------------
+class StreamingAnnotator:
+    def __init__(self, matcher=None):
+        self.matcher = matcher or get_matcher()
+        self.annotated = ""
+        self.pending = ""
+
+    def feed(self, chunk):
+        # 반환: 이번에 확정되어 변환된 HTML 조각
+        buffer = self.pending + chunk
+        # 여기보다 앞에서 시작하는 용어는 가장 긴 것까지 버퍼 안에 다 들어와 있다
+        boundary = len(buffer) - max(self.matcher.max_len - 1, 0)
+        if boundary <= 0:
+            self.pending = buffer
+            return ""
+        matches = [span for span in self.matcher.find(buffer) if span[0] < boundary]
+        cut = max(boundary, matches[-1][1]) if matches else boundary
+        html = self.matcher.render(buffer[:cut], matches)
+        self.pending = buffer[cut:]
+        self.annotated += html
+        return html
+
+    def flush(self):
+        html = self.matcher.annotate(self.pending)
+        self.pending = ""
+        self.annotated += html
+        return html
+
+    def preview(self):
+        # 화면 표시용: 확정된 HTML + 아직 보류 중인 원문
+        return self.annotated + self.pending
+
+
+# ---------------------------------------------------------
+# 3. 기본 사전 (import 시 1회 생성)
+# ---------------------------------------------------------
+def build_dictionary(path=LEGAL_TERMS_PATH):
+    dictionary = dict(LEGAL_DICTIONARY)
+    if path and os.path.exists(path):
+        dictionary.update(load_dictionary(path))
+    return dictionary
+
+
+_MATCHER = TermMatcher(build_dictionary())
+
+
+def get_matcher():
+    return _MATCHER
+
+
+def add_legal_tooltips(text):
+    return _MATCHER.annotate(text)
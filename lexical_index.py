@@ -0,0 +1,196 @@
+import json
+import os
+import re
+import shutil
+import time
+import zlib
+
+import numpy as np
+
+# --------------------------------------------------------------------------
+# 판례 어휘(BM25) 색인
+# 한국어 욕설/은어('패드립', '통매음' 등)는 임베딩만으로는 잘 안 잡히므로
+# 글자 n-gram BM25 색인을 로컬에 두고 벡터 검색 결과와 RRF로 합친다.
+# - n-gram은 해시 버킷으로 바꿔 어휘 사전 없이 CSR 배열(np.save)로 저장
+# - 검색 시에는 np.load(mmap_mode="r")로 필요한 부분만 읽는다
+# - 다시 만들 때는 새 폴더에 쓰고 CURRENT 파일만 바꾼다 (읽고 있는 mmap 파일을 덮어쓰지 않음)
+# - 임베딩 서비스가 느리거나 죽었을 때는 이 색인만으로도 검색 가능
+# --------------------------------------------------------------------------
+NGRAM_SIZES = (2, 3)
+BUCKETS = 1 << 21
+K1 = 1.2
+B = 0.75
+INDEX_DIRNAME = "lexical"
+FORMAT_VERSION = 1
+
+_TOKEN_RE = re.compile(r'[0-9a-z가-힣ㄱ-ㅎㅏ-ㅣ]+')
+
+
+# ---------------------------------------------------------
+# 1. 토큰화 (어절 단위 글자 n-gram -> 해시 버킷)
+# ---------------------------------------------------------
+def iter_ngrams(text):
+    for token in _TOKEN_RE.findall(str(text or "").lower()):
+        if len(token) < NGRAM_SIZES[0]:
+            yield token
+            continue
+        for n in NGRAM_SIZES:
+            for i in range(len(token) - n + 1):
+                yield token[i:i + n]
+
+
+def term_ids(text):
+    return np.fromiter(
+        (zlib.crc32(gram.encode("utf-8")) % BUCKETS for gram in iter_ngrams(text)), dtype=np.int64
+    )
+
+
+def index_path(db_path):
+    return os.path.join(db_path, INDEX_DIRNAME)
+
+
+# ---------------------------------------------------------
+# 2. 색인 생성
+# 게시 목록마다 BM25 가중치를 미리 계산해 두어 검색은 가중치 합산만 하면 된다.
+# ---------------------------------------------------------
+def _publish(root, build_name):
+    tmp = os.path.join(root, "CURRENT.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(build_name)
+    os.replace(tmp, os.path.join(root, "CURRENT"))
+    # 직전 버전은 아직 열려 있을 수 있으니 남기고, 그보다 오래된 버전만 삭제
+    builds = sorted(name for name in os.listdir(root) if name.startswith("build-"))
+    for name in builds[:-2]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def current_build(root):
+    try:
+        with open(os.path.join(root, "CURRENT"), "r", encoding="utf-8") as f:
+            return os.path.join(root, f.read().strip())
+    except OSError:
+        return None
+
+
+def build_index(records, root, revision=None):
+    # records: {"id", "document", "metadata"} 반복자
+    build_name = f"build-{time.time_ns()}"
+    out_dir = os.path.join(root, build_name)
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_docs = os.path.join(out_dir, "docs.jsonl.tmp")
+    term_chunks, doc_chunks, tf_chunks = [], [], []
+    lengths, offsets = [], []
+
+    with open(tmp_docs, "wb") as docs_file:
+        for doc_index, record in enumerate(records):
+            ids = term_ids(record["document"])
+            terms, counts = np.unique(ids, return_counts=True)
+            term_chunks.append(terms)
+            doc_chunks.append(np.full(len(terms), doc_index, dtype=np.int32))
+            tf_chunks.append(counts.astype(np.float32))
+            lengths.append(len(ids))
+            offsets.append(docs_file.tell())
+            line = {"id": record["id"], "page_content": record["document"], "metadata": record["metadata"]}
+            docs_file.write(json.dumps(line, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    doc_count = len(lengths)
+    lengths = np.asarray(lengths, dtype=np.float32)
+    if doc_count:
+        terms = np.concatenate(term_chunks)
+        docs = np.concatenate(doc_chunks)
+        tf = np.concatenate(tf_chunks)
+    else:
+        terms, docs, tf = np.zeros(0, np.int64), np.zeros(0, np.int32), np.zeros(0, np.float32)
+    del term_chunks, doc_chunks, tf_chunks
+
+    order = np.argsort(terms, kind="stable")
+    terms, docs, tf = terms[order], docs[order], tf[order]
+    indptr = np.zeros(BUCKETS + 1, dtype=np.int64)
+    np.cumsum(np.bincount(terms, minlength=BUCKETS), out=indptr[1:])
+
+    avgdl = float(lengths.mean()) if doc_count else 0.0
+    df = np.diff(indptr)[terms].astype(np.float32)
+    idf = np.log(1.0 + (doc_count - df + 0.5) / (df + 0.5))
+    norm = K1 * (1.0 - B + B * lengths[docs] / max(avgdl, 1e-6))
+    weights = (idf * tf * (K1 + 1.0) / (tf + norm)).astype(np.float32)
+
+    np.save(os.path.join(out_dir, "indptr.npy"), indptr)
+    np.save(os.path.join(out_dir, "postings.npy"), docs)
+    np.save(os.path.join(out_dir, "weights.npy"), weights)
+    np.save(os.path.join(out_dir, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+    os.replace(tmp_docs, os.path.join(out_dir, "docs.jsonl"))
+    manifest = {
+        "format": FORMAT_VERSION, "docs": doc_count, "postings": int(len(docs)), "avgdl": avgdl,
+        "ngrams": list(NGRAM_SIZES), "buckets": BUCKETS, "revision": revision, "built_at": time.time(),
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    _publish(root, build_name)
+    return manifest
+
+
+def iter_collection_records(collection, page_size=1000):
+    offset = 0
+    while True:
+        page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            return
+        for id_, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+            yield {"id": id_, "document": document or "", "metadata": metadata or {}}
+        offset += len(page["ids"])
+
+
+def build_from_collection(collection, root, revision=None):
+    return build_index(iter_collection_records(collection), root, revision=revision)
+
+
+# ---------------------------------------------------------
+# 3. 검색 (mmap 배열 위에서 가중치 합산)
+# ---------------------------------------------------------
+class LexicalIndex:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != FORMAT_VERSION or self.manifest.get("buckets") != BUCKETS:
+            raise ValueError("어휘 색인 형식이 다릅니다. ingest_cases.py --rebuild-lexical 로 다시 만드세요.")
+        self.indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode="r")
+        self.postings = np.load(os.path.join(path, "postings.npy"), mmap_mode="r")
+        self.weights = np.load(os.path.join(path, "weights.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.doc_count = self.manifest["docs"]
+
+    @classmethod
+    def load(cls, root):
+        path = current_build(root)
+        if path is None or not os.path.exists(os.path.join(path, "manifest.json")):
+            return None
+        return cls(path)
+
+    def search(self, query, k=10):
+        # 반환: [(문서 번호, BM25 점수, 0~1 근사 관련도)]
+        ids, counts = np.unique(term_ids(query), return_counts=True)
+        if not len(ids) or not self.doc_count:
+            return []
+        scores = np.zeros(self.doc_count, dtype=np.float32)
+        for term, count in zip(ids, counts):
+            start, end = self.indptr[term], self.indptr[term + 1]
+            if start != end:
+                # 한 게시 목록 안에서 문서 번호는 중복되지 않으므로 바로 더해도 된다
+                scores[self.postings[start:end]] += self.weights[start:end] * count
+
+        k = min(k, self.doc_count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        # 질의 n-gram 수로 나눠 길이 영향을 줄인 뒤 (0, 1)로 눌러 담은 값 (유사도와 척도가 달라 화면에 표시하지 않음)
+        per_term = scores[top] / max(1, int(counts.sum()))
+        relevance = per_term / (per_term + 1.0)
+        return [(int(i), float(s), float(r)) for i, s, r in zip(top, scores[top], relevance) if s > 0]
+
+    def record(self, doc_index):
+        with open(os.path.join(self.path, "docs.jsonl"), "rb") as f:
+            f.seek(int(self.offsets[doc_index]))
+            return json.loads(f.readline())
+
+    def stats(self):
+        return {k: self.manifest.get(k) for k in ("docs", "postings", "revision", "built_at")}
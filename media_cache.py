@@ -0,0 +1,69 @@
+import hashlib
+import os
+import threading
+
+from sqlite_cache import SQLiteCache, cache_path
+
+# --------------------------------------------------------------------------
+# OCR / 음성 인식 결과 캐시
+# 키 = 파일 바이트의 SHA-256 + 엔진/모델 버전 (언어팩, Whisper 모델명 등)
+# 같은 증거 파일을 다시 올리면 재계산 없이 바로 결과를 돌려준다.
+# --------------------------------------------------------------------------
+MEDIA_CACHE_ENABLED = os.getenv("LAWLENS_MEDIA_CACHE", "1") != "0"
+MEDIA_CACHE_MAX_ENTRIES = int(os.getenv("LAWLENS_MEDIA_CACHE_MAX_ENTRIES", "20000"))
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("LAWLENS_MEDIA_CACHE_MAX_MB", "128")) * 1024 * 1024
+
+
+def digest_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def digest_file(path, chunk_size=1024 * 1024):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class MediaCache:
+    def __init__(self, path=None, max_entries=MEDIA_CACHE_MAX_ENTRIES, max_bytes=MEDIA_CACHE_MAX_BYTES):
+        self.store = SQLiteCache(path or cache_path("media.sqlite3"), max_entries=max_entries, max_bytes=max_bytes)
+
+    @staticmethod
+    def make_key(digest, engine_version):
+        return f"{engine_version}\x1f{digest}"
+
+    def get(self, digest, engine_version):
+        blob = self.store.get(self.make_key(digest, engine_version))
+        return blob.decode("utf-8") if blob is not None else None
+
+    def put(self, digest, engine_version, text):
+        self.store.put(self.make_key(digest, engine_version), text.encode("utf-8"), tag=engine_version)
+
+    # 캐시에 있으면 바로 반환, 없으면 compute() 결과를 저장 (should_store가 False면 저장 안 함)
+    def cached(self, digest, engine_version, compute, should_store=None):
+        text = self.get(digest, engine_version)
+        if text is not None:
+            return text
+        text = compute()
+        if should_store is None or should_store(text):
+            self.put(digest, engine_version, text)
+        return text
+
+    def stats(self):
+        return self.store.stats()
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+def get_media_cache():
+    global _CACHE
+    if not MEDIA_CACHE_ENABLED:
+        return None
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = MediaCache()
+    return _CACHE
@@ -2,29 +2,142 @@ import pytesseract
 import cv2
 import numpy as np
 import os
-import whisper
-import streamlit as st
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import model_pool
+import telemetry
+import screenshot_ocr
+import transcription
+from media_cache import get_media_cache, digest_bytes, digest_file
 
 warnings.filterwarnings("ignore")
 
-@st.cache_resource(show_spinner=False)
+# 여러 장을 동시에 돌리므로 tesseract 프로세스 하나는 스레드 1개만 사용 (CPU 과점유 방지)
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+OCR_WORKERS = int(os.getenv("LAWLENS_OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+# 말풍선 단위 OCR (0이면 기존처럼 전체 이미지를 한 번에 OCR)
+OCR_SEGMENT = os.getenv("LAWLENS_OCR_SEGMENT", "1") != "0"
+
+# 배포 환경에 맞게 LAWLENS_WHISPER_MODEL로 모델 크기 선택 (기본 tiny)
+WHISPER_MODEL = transcription.WHISPER_MODEL
+
+# Streamlit 밖(배치 작업, 워커 프로세스)에서도 프로세스당 한 번만 로드되도록 공유 풀 사용
 def load_whisper_model():
-    return whisper.load_model("tiny")
+    return model_pool.get_model(model_pool.whisper_key(WHISPER_MODEL))
 
-def extract_text_from_image(image_path):
+# --------------------------------------------------------------------------
+# 결과 캐시용 엔진 버전 (버전이 바뀌면 캐시 키도 바뀜)
+# --------------------------------------------------------------------------
+_OCR_VERSION = None
+
+def ocr_engine_version():
+    global _OCR_VERSION
+    if _OCR_VERSION is None:
+        try:
+            tesseract = str(pytesseract.get_tesseract_version())
+        except Exception:
+            tesseract = "unknown"
+        mode = f"segment-w{screenshot_ocr.MAX_WIDTH}" if OCR_SEGMENT else "full"
+        _OCR_VERSION = f"tesseract-{tesseract}|{screenshot_ocr.OCR_LANG}|{mode}"
+    return _OCR_VERSION
+
+def stt_engine_version():
+    import whisper
+    return f"whisper-{getattr(whisper, '__version__', 'unknown')}|{WHISPER_MODEL}|vad-chunk{int(transcription.CHUNK_SECONDS)}|ts"
+
+def _cached(digest_fn, version_fn, compute, error_prefix):
+    cache = get_media_cache()
+    if cache is None:
+        return compute()
     try:
-        img = cv2.imread(image_path)
+        digest = digest_fn()
+    except Exception:
+        return compute()
+    # 에러 결과는 저장하지 않음 (다음 업로드 때 다시 시도)
+    return cache.cached(digest, version_fn(), compute, should_store=lambda text: not text.startswith(error_prefix))
+
+# --------------------------------------------------------------------------
+# 이미지 OCR
+# 업로드된 바이트를 메모리에서 바로 디코딩 (작업 폴더에 임시 파일을 만들지 않음)
+# --------------------------------------------------------------------------
+def decode_image(data):
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("이미지를 읽을 수 없습니다")
+    return img
+
+def _ocr_image(img):
+    if OCR_SEGMENT:
+        # 축소 + 이진화 후 말풍선 영역만 병렬 OCR, "[나]/[상대방] 내용" 형식으로 반환
+        text = screenshot_ocr.extract_chat_text(img)
+    else:
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        text = pytesseract.image_to_string(gray, lang='kor+eng')
-        return text.strip() if text.strip() else "(텍스트 인식 실패)"
+        text = screenshot_ocr.run_tesseract(gray)
+    return text.strip() if text.strip() else "(텍스트 인식 실패)"
+
+def _extract_text_from_image(image_path):
+    try:
+        return _ocr_image(cv2.imread(image_path))
+    except Exception as e:
+        return f"OCR 에러: {str(e)}"
+
+def _extract_text_from_image_bytes(data):
+    try:
+        return _ocr_image(decode_image(data))
     except Exception as e:
         return f"OCR 에러: {str(e)}"
 
-def extract_text_from_audio(audio_path, hf_token=None):
+def extract_text_from_image(image_path):
+    with telemetry.span("ocr"):
+        return _cached(lambda: digest_file(image_path), ocr_engine_version,
+                       lambda: _extract_text_from_image(image_path), "OCR 에러")
+
+def extract_text_from_image_bytes(data):
+    telemetry.count("ocr_bytes", len(data))
+    with telemetry.span("ocr", bytes=len(data)):
+        return _cached(lambda: digest_bytes(data), ocr_engine_version,
+                       lambda: _extract_text_from_image_bytes(data), "OCR 에러")
+
+# 여러 장을 병렬로 OCR (결과는 입력 순서 그대로)
+# tesseract는 이미지마다 별도 프로세스로 실행되므로 스레드 풀로도 프로세스 수준 병렬 처리가 된다
+def extract_texts_from_images(images, max_workers=OCR_WORKERS):
+    images = list(images)
+    if len(images) <= 1:
+        return [extract_text_from_image_bytes(data) for data in images]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(images)), thread_name_prefix="lawlens-ocr") as executor:
+        return list(executor.map(extract_text_from_image_bytes, images))
+
+# --------------------------------------------------------------------------
+# 음성 인식
+# 무음 구간을 건너뛰고 30초 이하 청크로 나눠 병렬 인식 (transcription.py)
+# on_partial(지금까지의 텍스트)로 긴 녹음도 진행 상황을 바로 보여줄 수 있다
+# --------------------------------------------------------------------------
+def _transcribe(load, on_partial=None):
     try:
-        model = load_whisper_model()
-        result = model.transcribe(audio_path)
-        return result["text"]
+        result = transcription.transcribe_audio(load(), model_name=WHISPER_MODEL, on_partial=on_partial)
+        # 증거 확인용으로 구간 시작 시각을 붙인다 (clean_text가 타임스탬프를 지우므로 분석 입력에는 영향 없음)
+        return transcription.format_transcript(result)
     except Exception as e:
-        return f"음성 분석 에러: {str(e)}"
\ No newline at end of file
+        return f"음성 분석 에러: {str(e)}"
+
+def _extract_text_from_audio(audio_path, on_partial=None):
+    return _transcribe(lambda: transcription.load_audio(audio_path), on_partial)
+
+def _extract_text_from_audio_bytes(data, on_partial=None):
+    return _transcribe(lambda: transcription.load_audio_bytes(data), on_partial)
+
+def extract_text_from_audio(audio_path, hf_token=None, on_partial=None):
+    with telemetry.span("stt"):
+        return _cached(lambda: digest_file(audio_path), stt_engine_version,
+                       lambda: _extract_text_from_audio(audio_path, on_partial), "음성 분석 에러")
+
+def extract_text_from_audio_bytes(data, on_partial=None):
+    telemetry.count("audio_bytes", len(data))
+    with telemetry.span("stt", bytes=len(data)):
+        return _cached(lambda: digest_bytes(data), stt_engine_version,
+                       lambda: _extract_text_from_audio_bytes(data, on_partial), "음성 분석 에러")
+
+def media_cache_stats():
+    cache = get_media_cache()
+    return cache.stats() if cache is not None else None
@@ -0,0 +1,144 @@
+import contextlib
+import gc
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# --------------------------------------------------------------------------
+# 무거운 모델(Whisper 등) 공유 풀
+# 1. 프로세스마다 한 번만 로드 (Streamlit 밖의 배치 작업/워커에서도 동일하게 동작)
+# 2. preload() 후 fork한 워커 프로세스는 부모의 가중치를 copy-on-write로 공유
+#    (gc.freeze로 로드된 객체를 GC 대상에서 빼서 GC가 페이지를 건드리지 않게 함)
+# 3. 종류별 동시 추론 수를 코어 수 기준 세마포어로 제한
+# --------------------------------------------------------------------------
+CPU_COUNT = os.cpu_count() or 1
+DEFAULT_SLOTS = {
+    "tesseract": CPU_COUNT,
+    "whisper": max(1, CPU_COUNT // 2),
+}
+
+_LOADERS = {}
+_MODELS = {}
+_LOCK = threading.Lock()
+_SLOTS = {}
+_SLOTS_LOCK = threading.Lock()
+
+
+def _reset_after_fork():
+    # fork 시점에 다른 스레드가 잡고 있던 락은 자식에서 영원히 풀리지 않으므로 새로 만든다
+    global _LOCK, _SLOTS_LOCK
+    _LOCK = threading.Lock()
+    _SLOTS_LOCK = threading.Lock()
+    _SLOTS.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# ---------------------------------------------------------
+# 1. 모델 등록 / 로드
+# ---------------------------------------------------------
+def register(name, loader):
+    _LOADERS[name] = loader
+
+
+def whisper_key(model_name):
+    return f"whisper:{model_name}"
+
+
+def _load_whisper(name):
+    import whisper
+    return whisper.load_model(name.split(":", 1)[1], device="cpu")
+
+
+def _loader_for(name):
+    if name in _LOADERS:
+        return _LOADERS[name]
+    if name.startswith("whisper:"):
+        return _load_whisper
+    raise KeyError(f"등록되지 않은 모델: {name}")
+
+
+def get_model(name):
+    model = _MODELS.get(name)
+    if model is None:
+        with _LOCK:
+            model = _MODELS.get(name)
+            if model is None:
+                model = _loader_for(name)(name)
+                _MODELS[name] = model
+    return model
+
+
+def is_loaded(name):
+    return name in _MODELS
+
+
+def preload(*names):
+    # 워커를 fork하기 전에 부모 프로세스에서 호출
+    for name in names:
+        get_model(name)
+    gc.collect()
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+    return list(_MODELS)
+
+
+# ---------------------------------------------------------
+# 2. 동시 추론 수 제한
+# ---------------------------------------------------------
+def slot_count(kind):
+    env = os.getenv(f"LAWLENS_{kind.upper()}_SLOTS")
+    return max(1, int(env)) if env else DEFAULT_SLOTS.get(kind, CPU_COUNT)
+
+
+def _semaphore(kind):
+    semaphore = _SLOTS.get(kind)
+    if semaphore is None:
+        with _SLOTS_LOCK:
+            semaphore = _SLOTS.get(kind)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(slot_count(kind))
+                _SLOTS[kind] = semaphore
+    return semaphore
+
+
+@contextlib.contextmanager
+def inference_slot(kind):
+    with _semaphore(kind):
+        yield
+
+
+# ---------------------------------------------------------
+# 3. fork 기반 워커 프로세스 풀
+# ---------------------------------------------------------
+def _init_worker(torch_threads):
+    if torch_threads:
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+
+
+def make_process_pool(workers, preload_names=(), torch_threads=None):
+    # fork를 쓸 수 있으면 미리 로드한 모델을 워커가 그대로 물려받는다.
+    # (spawn만 되는 환경에서는 워커마다 첫 요청 때 한 번 로드)
+    if preload_names:
+        preload(*preload_names)
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    if torch_threads is None:
+        torch_threads = max(1, CPU_COUNT // max(1, workers))
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=_init_worker, initargs=(torch_threads,))
+
+
+def stats():
+    return {
+        "loaded": sorted(_MODELS),
+        "slots": {kind: slot_count(kind) for kind in set(DEFAULT_SLOTS) | set(_SLOTS)},
+        "pid": os.getpid(),
+    }
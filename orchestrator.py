@@ -0,0 +1,281 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from rag_system import get_engine
+
+# --------------------------------------------------------------------------
+# 진단 오케스트레이션
+# 고소장 초안은 full_query만 있으면 되므로, 전처리/판례 검색과 동시에 실행한다.
+# 사용자가 기다리는 시간 = 두 LLM 호출 중 더 긴 쪽 (합이 아님)
+# --------------------------------------------------------------------------
+DEFAULT_TIMEOUT = float(os.getenv("LAWLENS_TIMEOUT", "180"))
+MAX_WORKERS = int(os.getenv("LAWLENS_WORKERS", "8"))
+# 단일 호출 모드: 특징 분석 + 보고서를 LLM 한 번으로 (실패 시 기존 2회 호출 경로로 자동 전환)
+SINGLE_PASS = os.getenv("LAWLENS_SINGLE_PASS", "0") == "1"
+
+TIMEOUT_RESULT = "⏱️ 분석 시간이 초과되었습니다. 잠시 후 다시 시도해 주세요."
+CANCELLED_RESULT = "분석이 취소되었습니다."
+COMPLAINT_TIMEOUT_RESULT = "⏱️ 고소장 초안 생성 시간이 초과되었습니다."
+# 스트리밍 중 취소 여부를 확인하는 간격 (초)
+POLL_INTERVAL = 0.1
+_STREAM_END = object()
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+def get_executor():
+    # 프로세스 전체가 공유하는 작업 스레드 풀
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="lawlens")
+    return _EXECUTOR
+
+
+class DiagnosisCancelled(Exception):
+    pass
+
+
+class _StreamFailed:
+    # 작업 스레드에서 난 예외를 소비 측으로 넘기기 위한 상자
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+def build_search_query(pre_result):
+    # 특징 분석이 실패했으면 '분석실패' 같은 의미 없는 키워드를 붙이지 않는다
+    analysis = pre_result["analysis"]
+    if "error" in analysis:
+        return pre_result["normalized_text"]
+    candidate = analysis.get("candidate_crime", "기타")
+    return f"{pre_result['normalized_text']}\n키워드: {candidate}"
+
+
+# 답변 캐시 키: 정규화된 텍스트 + 범죄 유형 후보 (특징 분석이 실패한 경우 캐시 사용 안 함)
+def cache_key(pre_result):
+    if "error" in pre_result["analysis"]:
+        return {}
+    return {
+        "normalized_text": pre_result["normalized_text"],
+        "candidate_crime": pre_result["analysis"].get("candidate_crime", "기타"),
+    }
+
+
+# 엔진 호출 인자: 캐시 키 + 특징 분석 결과 (판례 재정렬에 사용)
+def engine_args(pre_result):
+    return {**cache_key(pre_result), "analysis": pre_result["analysis"]}
+
+
+class DiagnosisOrchestrator:
+    def __init__(self, engine=None, preprocessor=None, executor=None, timeout=DEFAULT_TIMEOUT, single_pass=SINGLE_PASS):
+        self.engine = engine or get_engine()
+        self._preprocessor = preprocessor
+        self.executor = executor or get_executor()
+        self.timeout = timeout
+        self.single_pass = single_pass
+
+    @property
+    def preprocessor(self):
+        if self._preprocessor is None:
+            from data_preprocessor import LawLensPreprocessor
+            self._preprocessor = LawLensPreprocessor()
+        return self._preprocessor
+
+    # 전처리 -> 판례 검색/분석 (단계 사이마다 취소 여부 확인)
+    def _analyze(self, full_query, cancel_event, single_pass=False):
+        if single_pass:
+            diagnosis = self._analyze_single_pass(full_query)
+            if diagnosis is not None:
+                return diagnosis
+            if cancel_event.is_set():
+                raise DiagnosisCancelled()
+
+        pre_result = self.preprocessor.run_pipeline(full_query)
+        if cancel_event.is_set():
+            raise DiagnosisCancelled()
+
+        search_query = build_search_query(pre_result)
+        retrieval = self.engine.analyze(search_query, **engine_args(pre_result))
+        return {"pre_result": pre_result, "search_query": search_query, "retrieval": retrieval, "timed_out": False}
+
+    def _analyze_single_pass(self, full_query):
+        normalized_text = self.preprocessor.clean_text(full_query)
+        analysis = None
+        retrieval = {"result": "", "docs": [], "scores": []}
+        for event in self.engine.stream_single_pass(normalized_text, normalized_text=normalized_text):
+            if event["type"] == "fallback":
+                return None
+            if event["type"] == "analysis":
+                analysis = event["analysis"]
+            elif event["type"] == "docs":
+                retrieval.update(docs=event["docs"], scores=event["scores"])
+            elif event["type"] == "done":
+                retrieval["result"] = event["result"]
+        pre_result = {"raw_text": full_query, "normalized_text": normalized_text, "analysis": analysis}
+        return {"pre_result": pre_result, "search_query": normalized_text, "retrieval": retrieval,
+                "timed_out": False, "single_pass": True}
+
+    # 2회 호출 경로: 특징 분석 -> (키워드를 붙인 질의로) 검색/보고서 생성
+    def _two_pass_events(self, full_query):
+        pre_result = self.preprocessor.run_pipeline(full_query)
+        search_query = build_search_query(pre_result)
+        yield {"type": "preprocessed", "pre_result": pre_result, "search_query": search_query}
+        yield from self.engine.stream(search_query, **engine_args(pre_result))
+
+    # 단일 호출 경로: 분석 JSON이 검증을 통과하면 그 결과로 전처리 이벤트를 만들고, 아니면 2회 호출 경로로 전환
+    def _single_pass_events(self, full_query):
+        normalized_text = self.preprocessor.clean_text(full_query)
+        for event in self.engine.stream_single_pass(normalized_text, normalized_text=normalized_text):
+            if event["type"] == "fallback":
+                yield event
+                yield from self._two_pass_events(full_query)
+                return
+            if event["type"] == "analysis":
+                pre_result = {"raw_text": full_query, "normalized_text": normalized_text, "analysis": event["analysis"]}
+                yield {"type": "preprocessed", "pre_result": pre_result, "search_query": normalized_text,
+                       "single_pass": True}
+                continue
+            yield event
+
+    def start_complaint(self, full_query):
+        return self.executor.submit(self.engine.generate_complaint, full_query)
+
+    # cancel_event: 호출 측(배치 종료 등)에서 중단을 요청할 때 사용
+    def _use_single_pass(self, full_query, single_pass):
+        single_pass = self.single_pass if single_pass is None else single_pass
+        # 큰 입력은 단일 호출 프롬프트에 통째로 넣지 않고 구간별 분석 경로(run_pipeline)로 보낸다
+        return single_pass and not self.preprocessor.needs_streaming(full_query)
+
+    def run(self, full_query, timeout=None, cancel_event=None, single_pass=None):
+        timeout = self.timeout if timeout is None else timeout
+        single_pass = self._use_single_pass(full_query, single_pass)
+        deadline = time.monotonic() + timeout
+        cancel_event = cancel_event or threading.Event()
+        started = time.perf_counter()
+
+        complaint_future = self.start_complaint(full_query)
+        analysis_future = self.executor.submit(self._analyze, full_query, cancel_event, single_pass)
+
+        def remaining():
+            return max(0.0, deadline - time.monotonic())
+
+        # 1. 판례 분석 결과 대기
+        cancelled = False
+        try:
+            diagnosis = analysis_future.result(timeout=remaining())
+        except FutureTimeoutError:
+            cancel_event.set()
+            analysis_future.cancel()
+            complaint_future.cancel()
+            diagnosis = self._empty_diagnosis(full_query, TIMEOUT_RESULT)
+            diagnosis["timed_out"] = True
+        except DiagnosisCancelled:
+            # 이미 실행 중인 고소장 작업은 cancel()로 멈출 수 없으므로 결과를 기다리지 않고 버린다
+            cancelled = True
+            complaint_future.cancel()
+            diagnosis = self._empty_diagnosis(full_query, CANCELLED_RESULT)
+        except BaseException:
+            # 분석이 실패하면 고소장도 더 기다릴 이유가 없음
+            cancel_event.set()
+            complaint_future.cancel()
+            raise
+
+        # 2. 고소장 초안 결과 합류
+        if cancelled:
+            complaint_text = CANCELLED_RESULT
+        elif complaint_future.cancelled():
+            complaint_text = COMPLAINT_TIMEOUT_RESULT
+        else:
+            try:
+                complaint_text = complaint_future.result(timeout=remaining())
+            except FutureTimeoutError:
+                complaint_future.cancel()
+                complaint_text = COMPLAINT_TIMEOUT_RESULT
+            except Exception as e:
+                complaint_text = f"고소장 초안 생성 에러: {str(e)}"
+
+        diagnosis["complaint"] = complaint_text
+        diagnosis["elapsed"] = time.perf_counter() - started
+        return diagnosis
+
+    # 이벤트 생산은 작업 스레드에서: 한 단계(특징 분석/임베딩/생성)가 멈춰 있어도
+    # 소비 측이 큐를 시간 제한으로 기다리므로 마감 시간/취소가 바로 반영된다
+    @staticmethod
+    def _produce(events, out, stop):
+        try:
+            for event in events:
+                if stop.is_set():
+                    break
+                out.put(event)
+        except Exception as e:
+            out.put(_StreamFailed(e))
+        finally:
+            events.close()
+            out.put(_STREAM_END)
+
+    # 스트리밍 진단: 전처리 결과 -> 판례 -> 답변 토큰 -> 고소장 순으로 이벤트를 내보낸다
+    # (제너레이터가 중간에 닫히면 진행 중인 고소장 작업도 취소)
+    def stream(self, full_query, timeout=None, cancel_event=None, single_pass=None):
+        timeout = self.timeout if timeout is None else timeout
+        single_pass = self._use_single_pass(full_query, single_pass)
+        deadline = time.monotonic() + timeout
+        cancel_event = cancel_event or threading.Event()
+        started = time.perf_counter()
+
+        complaint_future = self.start_complaint(full_query)
+        stop = threading.Event()
+        try:
+            events = self._single_pass_events(full_query) if single_pass else self._two_pass_events(full_query)
+            out = queue.Queue()
+            self.executor.submit(self._produce, events, out, stop)
+            while True:
+                if cancel_event.is_set():
+                    yield {"type": "token", "text": "\n\n" + CANCELLED_RESULT}
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    yield {"type": "token", "text": "\n\n" + TIMEOUT_RESULT}
+                    break
+                try:
+                    event = out.get(timeout=min(remaining, POLL_INTERVAL))
+                except queue.Empty:
+                    continue
+                if event is _STREAM_END:
+                    break
+                if isinstance(event, _StreamFailed):
+                    raise event.error
+                yield event
+
+            if complaint_future.cancelled() or cancel_event.is_set():
+                complaint_text = CANCELLED_RESULT
+            else:
+                try:
+                    complaint_text = complaint_future.result(timeout=max(0.0, deadline - time.monotonic()))
+                except FutureTimeoutError:
+                    complaint_text = COMPLAINT_TIMEOUT_RESULT
+                except Exception as e:
+                    complaint_text = f"고소장 초안 생성 에러: {str(e)}"
+            yield {"type": "complaint", "text": complaint_text, "elapsed": time.perf_counter() - started}
+        finally:
+            # 멈춰 있던 단계는 끝나는 대로 생산을 멈춘다
+            stop.set()
+            complaint_future.cancel()
+
+    @staticmethod
+    def _empty_diagnosis(full_query, message):
+        return {
+            "pre_result": {"raw_text": full_query, "normalized_text": "", "analysis": {}},
+            "search_query": "",
+            "retrieval": {"result": message, "docs": [], "scores": []},
+            "timed_out": False,
+        }
+
+
+def run_diagnosis(full_query, timeout=None, cancel_event=None, single_pass=None):
+    return DiagnosisOrchestrator().run(full_query, timeout=timeout, cancel_event=cancel_event, single_pass=single_pass)
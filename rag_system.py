@@ -1,90 +1,40 @@
 import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from langchain_chroma import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.documents import Document
+
+from answer_cache import get_answer_cache
+from embedding_cache import CachedEmbeddings, EMBED_CACHE_ENABLED
+from ingest_cases import read_manifest
+from case_metadata import verdict_of, VERDICT_GUILTY
+from lexical_index import LexicalIndex, index_path
+from reranker import load_reranker
+from context_builder import build_context, context_budget, estimate_tokens, similarity_text
+import telemetry
+from analysis_schema import FEATURE_GUIDE, FEATURE_FORMAT, ANALYSIS_CLOSE, split_tagged_analysis, metrics as analysis_metrics
 
 # 1. 환경 설정
 load_dotenv()
 DB_PATH = "./chroma_db"
+COLLECTION_NAME = "lawlens_cases"
 EMBEDDING_MODEL = "models/gemini-embedding-001" 
 LLM_MODEL = "gemini-2.5-flash"
+# 재정렬(reranker.py) 전에 모을 후보 수. 유죄 판례(where 필터)와 전체 판례에서 절반씩
+CANDIDATE_K = int(os.getenv("LAWLENS_CANDIDATES", "20"))
+GUILTY_K = max(1, CANDIDATE_K // 2)
+GENERAL_K = max(1, CANDIDATE_K // 2)
+# 어휘(BM25) 색인 검색 + RRF 결합. 임베딩이 EMBED_TIMEOUT 안에 안 오면 어휘 색인 결과만 사용
+LEXICAL_ENABLED = os.getenv("LAWLENS_LEXICAL", "1") != "0"
+LEXICAL_K = 10
+RRF_K = 60
+EMBED_TIMEOUT = float(os.getenv("LAWLENS_EMBED_TIMEOUT", "10"))
 
-def run_lawlens_analysis(query):
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key or not os.path.exists(DB_PATH):
-        return {"result": "오류: API 키가 없거나 DB가 없습니다.", "docs": [], "scores": []}
-        
-    embeddings = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
-    vector_store = Chroma(
-        persist_directory=DB_PATH, 
-        embedding_function=embeddings,
-        collection_name="lawlens_cases"
-    )
-    
-    # 1. 넉넉하게 10개 검색
-    results = vector_store.similarity_search_with_relevance_scores(query, k=10)
-    
-    if not results:
-        return {"result": "죄송합니다. 유사한 판례를 찾을 수 없습니다.", "docs": [], "scores": []}
-
-    # 2.유죄/무죄 분류
-    guilty_cases = []
-    other_cases = []
-    
-    for doc, score in results:
-        judgment = doc.metadata.get("judgment", "")
-        # 유죄 시그널 확인
-        if "유죄" in judgment or "벌금" in judgment or "징역" in judgment or "선고유예" in judgment:
-            guilty_cases.append((doc, score))
-        else:
-            other_cases.append((doc, score))
-
-    # 3. 메인 케이스 선정 및 상황 판단
-    is_guilty_found = False
-    
-    if guilty_cases:
-        # 유죄가 있으면 -> 그걸 메인으로 (성공!)
-        main_case, main_score = guilty_cases[0]
-        remaining = guilty_cases[1:] + other_cases
-        is_guilty_found = True
-        section_title = "🏆 유사 승소 사례 (유죄 판례)"
-        analysis_guide = "이 판례는 유죄가 선고된 사례입니다. 승소(유죄) 요인을 중점적으로 분석하세요."
-    else:
-        # 유죄가 없으면 -> 무죄 중 제일 비슷한 걸 메인으로 (경고 모드!)
-        main_case, main_score = results[0]
-        remaining = results[1:]
-        is_guilty_found = False
-        section_title = "⚠️ 유사 판례 (무죄 사례 주의)"
-        analysis_guide = """
-        🚨 [중요 경고] 검색 결과, 유사한 유죄 판례가 없습니다. 
-        이 사례는 '무죄(혐의 없음)' 판결이 난 사례입니다.
-        사용자에게 '유사한 승소 사례를 찾지 못했음'을 명확히 알리고, 
-        이 사건은 **어떤 이유 때문에 처벌받지 않았는지(패소 요인)**를 분석하여 사용자에게 주의를 주세요.
-        """
-
-    # 최종 문서 리스트 (메인 + 나머지 4개)
-    final_docs = [main_case]
-    final_scores = [main_score]
-    for doc, score in remaining[:4]:
-        final_docs.append(doc)
-        final_scores.append(score)
-
-    # 4. 프롬프트 구성
-    context_text = f"""
-    [📌 메인 분석 대상 판례]
-    - 판결 결과: {main_case.metadata.get('judgment')} (매우 중요!)
-    - 사건번호: {main_case.metadata.get('case_id')}
-    - 내용: {main_case.page_content}
-    - 유사도: {main_score*100:.1f}%
-
-    [📑 기타 참고 판례]
-    """
-    for i, doc in enumerate(final_docs[1:]):
-        context_text += f"{i+1}. {doc.metadata.get('case_id')} ({doc.metadata.get('judgment')}): {doc.page_content[:100]}...\n"
-
-    template = """
+ADVISOR_TEMPLATE = """
     당신은 대한민국 사이버 범죄 전문 AI 변호사 'LawLens'입니다.
     
     [분석 데이터]
@@ -154,39 +104,577 @@ def run_lawlens_analysis(query):
     **작성 지침:** - 만약 '무죄 사례 주의' 모드라면, 승소 확률이 낮을 수 있음을 솔직하게 말해주세요.
     - 표 형식을 반드시 유지하세요.
     """
+
+ADVISOR_PROMPT = PromptTemplate(template=ADVISOR_TEMPLATE, input_variables=[
+    "context", "question", "main_score_str", "main_case_id", 
+    "section_title", "analysis_guide", "main_judgment"
+])
+# 단일 호출 모드: 특징 분석 JSON과 상담 보고서를 한 번의 생성으로 받는다
+SINGLE_PASS_TEMPLATE = ADVISOR_TEMPLATE + """
+    ---
+    [출력 순서 - 반드시 지킬 것]
+    1. 먼저 <analysis> 와 </analysis> 사이에 [사용자 상황]의 특징 분석 JSON만 출력하세요.
+""" + FEATURE_GUIDE + """
+    <analysis>""" + FEATURE_FORMAT + """    </analysis>
+    2. 그 다음 줄부터 위 [작성 양식]에 따라 보고서를 작성하세요.
+    """
+SINGLE_PASS_PROMPT = PromptTemplate(template=SINGLE_PASS_TEMPLATE, input_variables=ADVISOR_PROMPT.input_variables)
+SINGLE_PASS_KEY = "single-pass"
+ANALYSIS_MAX_CHARS = 4000
+
+COMPLAINT_PROMPT = PromptTemplate(template="[사용자 상황]\n{story}\n\n위 내용을 바탕으로 경찰청 표준 고소장 내용을 작성해줘.", input_variables=["story"])
+
+NO_RESOURCE_RESULT = "오류: API 키가 없거나 DB가 없습니다."
+NO_MATCH_RESULT = "죄송합니다. 유사한 판례를 찾을 수 없습니다."
+
+
+def _is_guilty(metadata):
+    # 적재 시 저장된 판결 구분 사용 (없으면 case_metadata 규칙으로 분류)
+    return verdict_of(metadata) == VERDICT_GUILTY
+
+
+def select_cases(results):
+    # 2.유죄/무죄 분류
+    guilty_cases = []
+    other_cases = []
     
-    prompt = PromptTemplate(template=template, input_variables=[
-        "context", "question", "main_score_str", "main_case_id", 
-        "section_title", "analysis_guide", "main_judgment"
-    ])
-    
-    llm = ChatGoogleGenerativeAI(model=LLM_MODEL, temperature=0.1, google_api_key=api_key)
-    chain = prompt | llm | StrOutputParser()
-    
-    final_response = chain.invoke({
+    for doc, score in results:
+        if _is_guilty(doc.metadata):
+            guilty_cases.append((doc, score))
+        else:
+            other_cases.append((doc, score))
+
+    # 3. 메인 케이스 선정 및 상황 판단
+    if guilty_cases:
+        # 유죄가 있으면 -> 그걸 메인으로 (성공!)
+        main_case, main_score = guilty_cases[0]
+        remaining = guilty_cases[1:] + other_cases
+        section_title = "🏆 유사 승소 사례 (유죄 판례)"
+        analysis_guide = "이 판례는 유죄가 선고된 사례입니다. 승소(유죄) 요인을 중점적으로 분석하세요."
+    else:
+        # 유죄가 없으면 -> 무죄 중 제일 비슷한 걸 메인으로 (경고 모드!)
+        main_case, main_score = results[0]
+        remaining = results[1:]
+        section_title = "⚠️ 유사 판례 (무죄 사례 주의)"
+        analysis_guide = """
+        🚨 [중요 경고] 검색 결과, 유사한 유죄 판례가 없습니다. 
+        이 사례는 '무죄(혐의 없음)' 판결이 난 사례입니다.
+        사용자에게 '유사한 승소 사례를 찾지 못했음'을 명확히 알리고, 
+        이 사건은 **어떤 이유 때문에 처벌받지 않았는지(패소 요인)**를 분석하여 사용자에게 주의를 주세요.
+        """
+
+    # 최종 문서 리스트 (메인 + 나머지 4개)
+    final_docs = [main_case]
+    final_scores = [main_score]
+    for doc, score in remaining[:4]:
+        final_docs.append(doc)
+        final_scores.append(score)
+
+    return {
+        "docs": final_docs,
+        "scores": final_scores,
+        "is_guilty_found": bool(guilty_cases),
+        "section_title": section_title,
+        "analysis_guide": analysis_guide,
+    }
+
+
+def build_prompt_inputs(query, selection):
+    main_case = selection["docs"][0]
+    main_score = selection["scores"][0]
+
+    # 4. 프롬프트 구성 (판례 본문 전체 대신 핵심 문장 위주, 토큰 예산 안에서)
+    context_text = build_context(selection, context_budget(ADVISOR_TEMPLATE, query))
+
+    return {
         "context": context_text,
         "question": query,
-        "main_score_str": f"약 {main_score*100:.1f}%",
+        "main_score_str": similarity_text(main_score),
         "main_case_id": main_case.metadata.get('case_id', '정보 없음'),
         "main_judgment": main_case.metadata.get('judgment', '미상'),
-        "section_title": section_title,
-        "analysis_guide": analysis_guide
-    })
-    
-    return {
-        "result": final_response,
-        "docs": final_docs,
-        "scores": final_scores
+        "section_title": selection["section_title"],
+        "analysis_guide": selection["analysis_guide"]
     }
 
+
+def prompt_tokens(inputs):
+    return estimate_tokens(ADVISOR_PROMPT.format(**inputs))
+
+
+def _doc_key(doc):
+    return doc.metadata.get("case_id") or doc.page_content
+
+
+def reciprocal_rank_fusion(result_lists, k=RRF_K, limit=None):
+    # 순위만 보고 합친다 (1 / (k + 순위)). 화면에 보여줄 유사도는 점수가 있는 검색(벡터)의 값만 쓰고,
+    # 어휘 색인에서만 나온 판례는 None으로 둔다 (척도가 다른 점수를 섞지 않음)
+    fused = {}
+    for results in result_lists:
+        for rank, (doc, relevance) in enumerate(results):
+            key = _doc_key(doc)
+            entry = fused.setdefault(key, [doc, 0.0, None])
+            entry[1] += 1.0 / (k + rank + 1)
+            if relevance is not None:
+                entry[2] = relevance if entry[2] is None else max(entry[2], relevance)
+    ordered = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)
+    return [(doc, relevance) for doc, _, relevance in ordered[:limit]]
+
+
+# --------------------------------------------------------------------------
+# 검색 엔진 (프로세스당 1개 생성, 모든 세션/스레드가 공유)
+# 임베딩/Chroma/LLM 클라이언트를 한 번만 만들고 재사용한다.
+# --------------------------------------------------------------------------
+class LawLensEngine:
+    # embeddings / llm_factory(temperature): 벤치마크 등에서 Gemini 대신 다른 백엔드를 넣을 때 사용
+    def __init__(self, db_path=DB_PATH, collection_name=COLLECTION_NAME, api_key=None, reranker=None,
+                 embeddings=None, llm_factory=None):
+        self.db_path = db_path
+        self.collection_name = collection_name
+        self._api_key = api_key
+        self.reranker = reranker or load_reranker()
+        self._embedding_backend = embeddings
+        self._llm_factory = llm_factory
+        self._lock = threading.RLock()
+        self._embeddings = None
+        self._vector_store = None
+        self._chains = {}
+        self._answer_cache = None
+        self._corpus_version = None
+        self._lexical_index = None
+        self._lexical_loaded = False
+        self._embed_executor = None
+        self.retrieval_modes = Counter()
+        self.loaded_at = None
+        self.last_error = None
+
+    @property
+    def api_key(self):
+        return self._api_key or os.getenv("GOOGLE_API_KEY")
+
+    def is_available(self):
+        return bool(self.api_key) and os.path.exists(self.db_path)
+
+    # 벡터 DB 핸들 (최초 1회만 디스크에서 연다)
+    @property
+    def vector_store(self):
+        store = self._vector_store
+        if store is not None:
+            return store
+        with self._lock:
+            if self._vector_store is None:
+                # Chroma/Google 클라이언트는 처음 검색할 때 import (텍스트 채팅 첫 화면은 가볍게)
+                from langchain_chroma import Chroma
+                embeddings = self._embedding_backend
+                if embeddings is None:
+                    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+                    embeddings = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+                    if EMBED_CACHE_ENABLED:
+                        # 같은 질의는 임베딩 API를 다시 호출하지 않음
+                        embeddings = CachedEmbeddings(embeddings, namespace=EMBEDDING_MODEL)
+                self._embeddings = embeddings
+                self._vector_store = Chroma(
+                    persist_directory=self.db_path, 
+                    embedding_function=self._embeddings,
+                    collection_name=self.collection_name
+                )
+                self.loaded_at = time.time()
+            return self._vector_store
+
+    @property
+    def embeddings(self):
+        self.vector_store
+        return self._embeddings
+
+    # 판례 DB 버전 (문서 수 + ingest_cases.py가 남긴 개정 번호). 재로딩 전까지 한 번만 계산
+    def corpus_version(self):
+        if self._corpus_version is None:
+            revision = read_manifest(self.db_path).get("revision", 0)
+            self._corpus_version = f"{self.vector_store._collection.count()}-r{revision}"
+        return self._corpus_version
+
+    # 어휘 색인 (최초 사용 시 mmap으로 연다. 색인이 없으면 None)
+    @property
+    def lexical_index(self):
+        if not LEXICAL_ENABLED:
+            return None
+        if not self._lexical_loaded:
+            with self._lock:
+                if not self._lexical_loaded:
+                    try:
+                        self._lexical_index = LexicalIndex.load(index_path(self.db_path))
+                    except Exception as e:
+                        self.last_error = f"lexical index: {e}"
+                    self._lexical_loaded = True
+        return self._lexical_index
+
+    @property
+    def answer_cache(self):
+        # 특징 분석 캐시와 같은 저장소를 쓰도록 프로세스 공용 캐시를 사용
+        if self._answer_cache is None:
+            self._answer_cache = get_answer_cache()
+        return self._answer_cache
+
+    # 온도별 LLM 체인 (prompt | llm | parser)
+    def _chain(self, name, prompt, temperature):
+        chain = self._chains.get(name)
+        if chain is not None:
+            return chain
+        with self._lock:
+            if name not in self._chains:
+                if self._llm_factory is not None:
+                    llm = self._llm_factory(temperature)
+                else:
+                    from langchain_google_genai import ChatGoogleGenerativeAI
+                    llm = ChatGoogleGenerativeAI(model=LLM_MODEL, temperature=temperature, google_api_key=self.api_key)
+                self._chains[name] = prompt | llm | StrOutputParser()
+            return self._chains[name]
+
+    def advisor_chain(self):
+        return self._chain("advisor", ADVISOR_PROMPT, 0.1)
+
+    def complaint_chain(self):
+        return self._chain("complaint", COMPLAINT_PROMPT, 0.2)
+
+    def single_pass_chain(self):
+        return self._chain("single_pass", SINGLE_PASS_PROMPT, 0.1)
+
+    # ---------------------------------------------------------
+    # 운영용 훅: 워밍업 / 상태 확인 / 재로딩
+    # ---------------------------------------------------------
+    def warm_up(self):
+        if not self.is_available():
+            return self.health()
+        try:
+            # 컬렉션을 한 번 읽어 세그먼트를 메모리에 올려 둔다
+            self.vector_store.get(limit=1)
+            self.lexical_index
+            self.advisor_chain()
+            self.complaint_chain()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+        return self.health()
+
+    def health(self):
+        status = {
+            "api_key": bool(self.api_key),
+            "db_exists": os.path.exists(self.db_path),
+            "loaded": self._vector_store is not None,
+            "loaded_at": self.loaded_at,
+            "last_error": self.last_error,
+            "answer_cache": self._answer_cache.stats() if self._answer_cache is not None else None,
+            "embedding_cache": self._embeddings.stats() if isinstance(self._embeddings, CachedEmbeddings) else None,
+            "lexical_index": self._lexical_index.stats() if self._lexical_index is not None else None,
+            "retrieval_modes": dict(self.retrieval_modes),
+            "analysis_parse": analysis_metrics(),
+        }
+        status["ok"] = status["api_key"] and status["db_exists"] and not status["last_error"]
+        return status
+
+    def reload(self):
+        # 진행 중인 요청은 기존 핸들을 그대로 쓰고, 새 요청부터 새 핸들을 사용
+        with self._lock:
+            self._vector_store = None
+            self._embeddings = None
+            self._chains = {}
+            self._corpus_version = None
+            self._lexical_index = None
+            self._lexical_loaded = False
+            self.loaded_at = None
+            self.last_error = None
+        return self.warm_up()
+
+    # ---------------------------------------------------------
+    # 검색 & 생성
+    # ---------------------------------------------------------
+    def _search_by_vector(self, vector, k, filter=None):
+        store = self.vector_store
+        relevance = store._select_relevance_score_fn()
+        with telemetry.span("chroma_search", k=k, filtered=filter is not None):
+            results = store.similarity_search_by_vector_with_relevance_scores(vector, k=k, filter=filter)
+        return [(doc, relevance(distance)) for doc, distance in results]
+
+    def embed_query(self, query):
+        # 임베딩 서비스가 느릴 때 요청 전체가 묶이지 않도록 시간 제한을 둔다
+        if self._embed_executor is None:
+            with self._lock:
+                if self._embed_executor is None:
+                    self._embed_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lawlens-embed")
+        embeddings = self.embeddings
+        with telemetry.span("embed", chars=len(query)):
+            return self._embed_executor.submit(embeddings.embed_query, query).result(timeout=EMBED_TIMEOUT)
+
+    # 반환 점수는 None: BM25를 눌러 담은 값은 유사도가 아니므로 유사도/승소 확률로 보여주지 않는다
+    def lexical_search(self, query, k=LEXICAL_K):
+        index = self.lexical_index
+        if index is None:
+            return []
+        results = []
+        with telemetry.span("lexical_search", k=k):
+            for doc_index, _, _ in index.search(query, k):
+                record = index.record(doc_index)
+                results.append((Document(page_content=record["page_content"], metadata=record["metadata"]), None))
+        return results
+
+    def vector_search(self, query, k=10):
+        # 질의 임베딩은 한 번만 계산하고, 유죄 판례(where 필터) + 전체 판례를 각각 검색
+        vector = self.embed_query(query)
+        try:
+            guilty = self._search_by_vector(vector, GUILTY_K, filter={"verdict": VERDICT_GUILTY})
+        except Exception:
+            guilty = []
+        if not guilty:
+            # 판결 구분 메타데이터가 없는 예전 DB -> 넉넉하게 검색 후 분류
+            return self._search_by_vector(vector, k)
+
+        merged = {}
+        for doc, score in guilty + self._search_by_vector(vector, GENERAL_K):
+            key = _doc_key(doc)
+            if key not in merged or score > merged[key][1]:
+                merged[key] = (doc, score)
+        return sorted(merged.values(), key=lambda pair: pair[1], reverse=True)
+
+    def retrieve(self, query, k=10):
+        # 1. 어휘 색인(로컬, 빠름) + 벡터 검색 -> RRF로 합침
+        try:
+            lexical = self.lexical_search(query)
+        except Exception as e:
+            self.last_error = f"lexical index: {e}"
+            lexical = []
+        try:
+            vector = self.vector_search(query, k)
+        except Exception:
+            if not lexical:
+                raise
+            # 임베딩 서비스 장애/지연 -> 어휘 색인 결과만으로 답변
+            self.retrieval_modes["lexical_only"] += 1
+            return lexical
+        if not lexical:
+            self.retrieval_modes["vector_only"] += 1
+            return vector
+        self.retrieval_modes["hybrid"] += 1
+        return reciprocal_rank_fusion([vector, lexical], limit=max(k, len(vector)))
+
+    # 검색 + 재정렬 + 메인 케이스 선정 + 프롬프트 입력 구성 (생성 직전까지)
+    # analysis: analyze_features 결과 (범죄 유형/공연성/대상 특정성을 재정렬에 사용)
+    def prepare(self, query, analysis=None):
+        if not self.is_available():
+            return {"result": NO_RESOURCE_RESULT, "docs": [], "scores": []}, None
+
+        results = self.retrieve(query, k=CANDIDATE_K)
+        if not results:
+            return {"result": NO_MATCH_RESULT, "docs": [], "scores": []}, None
+
+        with telemetry.span("rerank", candidates=len(results)):
+            results = self.reranker.rerank(query, results, analysis)
+
+        with telemetry.span("build_context"):
+            selection = select_cases(results)
+            inputs = build_prompt_inputs(query, selection)
+            # 요청별 프롬프트 크기 (추정 토큰 수)
+            selection["prompt_tokens"] = prompt_tokens(inputs)
+        telemetry.count("prompt_tokens", selection["prompt_tokens"])
+        return selection, inputs
+
+    # ---------------------------------------------------------
+    # 답변 캐시 (normalized_text가 주어졌을 때만 사용)
+    # ---------------------------------------------------------
+    def _lookup_answer(self, query, normalized_text, candidate_crime):
+        cache = self.answer_cache
+        if cache is None or not normalized_text or not self.is_available():
+            return None, None
+        try:
+            with telemetry.span("answer_cache") as stage:
+                cached, vector = cache.lookup(
+                    normalized_text, candidate_crime, self.corpus_version(),
+                    vector_fn=lambda: self.embed_query(query)
+                )
+                stage.set(hit=cached is not None)
+        except Exception as e:
+            self.last_error = f"answer cache: {e}"
+            return None, None
+        if cached is not None:
+            cached["cached"] = True
+        return cached, vector
+
+    def _store_answer(self, normalized_text, candidate_crime, result, vector):
+        cache = self.answer_cache
+        if cache is None or not normalized_text:
+            return
+        try:
+            cache.store_result(normalized_text, candidate_crime, result, self.corpus_version(), vector=vector)
+        except Exception as e:
+            self.last_error = f"answer cache: {e}"
+
+    def generate(self, inputs):
+        with telemetry.span("generate_report"):
+            result = self.advisor_chain().invoke(inputs)
+        telemetry.count("llm_output_chars", len(result), stage="report")
+        return result
+
+    def analyze(self, query, normalized_text=None, candidate_crime=None, analysis=None):
+        cached, vector = self._lookup_answer(query, normalized_text, candidate_crime)
+        if cached is not None:
+            return cached
+
+        selection, inputs = self.prepare(query, analysis)
+        if inputs is None:
+            return selection
+
+        final_response = self.generate(inputs)
+        
+        result = {
+            "result": final_response,
+            "docs": selection["docs"],
+            "scores": selection["scores"],
+            "prompt_tokens": selection["prompt_tokens"],
+        }
+        self._store_answer(normalized_text, candidate_crime, result, vector)
+        return result
+
+    # 스트리밍 버전: 판례(docs/scores)를 먼저 내보내고, 답변은 토큰 단위로 전달
+    def stream(self, query, normalized_text=None, candidate_crime=None, analysis=None):
+        cached, vector = self._lookup_answer(query, normalized_text, candidate_crime)
+        if cached is not None:
+            yield {"type": "docs", "docs": cached["docs"], "scores": cached["scores"], "cached": True}
+            yield {"type": "token", "text": cached["result"]}
+            yield {"type": "done", "result": cached["result"]}
+            return
+
+        selection, inputs = self.prepare(query, analysis)
+        yield {"type": "docs", "docs": selection["docs"], "scores": selection["scores"],
+               "prompt_tokens": selection.get("prompt_tokens")}
+
+        if inputs is None:
+            yield {"type": "token", "text": selection["result"]}
+            yield {"type": "done", "result": selection["result"]}
+            return
+
+        chunks = []
+        stage_started = time.perf_counter()
+        with telemetry.span("generate_report", streaming=True) as stage:
+            for chunk in self.advisor_chain().stream(inputs):
+                if not chunk:
+                    continue
+                if not chunks:
+                    stage.set(first_token_ms=round((time.perf_counter() - stage_started) * 1000, 1))
+                chunks.append(chunk)
+                # 토큰을 받아 화면에 그리는 시간은 생성 시간에서 뺀다
+                with stage.paused():
+                    yield {"type": "token", "text": chunk}
+        result = "".join(chunks)
+        telemetry.count("llm_output_chars", len(result), stage="report")
+        self._store_answer(normalized_text, candidate_crime, {
+            "result": result, "docs": selection["docs"], "scores": selection["scores"]
+        }, vector)
+        yield {"type": "done", "result": result}
+
+    # ---------------------------------------------------------
+    # 단일 호출 모드 (정규화 텍스트만으로 검색 -> 분석 JSON + 보고서를 한 번에 생성)
+    # 분석 JSON이 형식에 맞지 않으면 {"type": "fallback"}을 내보내고 끝낸다 (호출 측이 2회 호출 경로로 전환)
+    # ---------------------------------------------------------
+    def stream_single_pass(self, query, normalized_text=None):
+        cached, vector = self._lookup_answer(query, normalized_text, SINGLE_PASS_KEY)
+        if cached is not None and cached.get("analysis"):
+            yield {"type": "analysis", "analysis": cached["analysis"]}
+            yield {"type": "docs", "docs": cached["docs"], "scores": cached["scores"], "cached": True}
+            yield {"type": "token", "text": cached["result"]}
+            yield {"type": "done", "result": cached["result"]}
+            return
+
+        selection, inputs = self.prepare(query)
+        if inputs is None:
+            yield {"type": "fallback", "reason": selection["result"]}
+            return
+        yield {"type": "docs", "docs": selection["docs"], "scores": selection["scores"],
+               "prompt_tokens": estimate_tokens(SINGLE_PASS_PROMPT.format(**inputs))}
+
+        # 분석 JSON이 끝날 때까지는 모아 두고, 검증을 통과한 뒤부터 보고서 토큰을 내보낸다
+        buffer = ""
+        analysis = None
+        chunks = []
+        with telemetry.span("generate_single_pass") as stage:
+            for chunk in self.single_pass_chain().stream(inputs):
+                if not chunk:
+                    continue
+                if analysis is None:
+                    buffer += chunk
+                    if ANALYSIS_CLOSE not in buffer:
+                        if len(buffer) > ANALYSIS_MAX_CHARS:
+                            stage.set(fallback=True)
+                            with stage.paused():
+                                yield {"type": "fallback", "reason": "분석 JSON 없음"}
+                            return
+                        continue
+                    analysis, chunk, errors = split_tagged_analysis(buffer)
+                    if errors:
+                        stage.set(fallback=True)
+                        with stage.paused():
+                            yield {"type": "fallback", "reason": "; ".join(errors)}
+                        return
+                    with stage.paused():
+                        yield {"type": "analysis", "analysis": analysis}
+                    chunk = chunk.lstrip()
+                    if not chunk:
+                        continue
+                chunks.append(chunk)
+                with stage.paused():
+                    yield {"type": "token", "text": chunk}
+
+        if analysis is None:
+            yield {"type": "fallback", "reason": "분석 JSON 없음"}
+            return
+        result = "".join(chunks)
+        telemetry.count("llm_output_chars", len(result), stage="single_pass")
+        self._store_answer(normalized_text, SINGLE_PASS_KEY, {
+            "result": result, "docs": selection["docs"], "scores": selection["scores"], "analysis": analysis
+        }, vector)
+        yield {"type": "done", "result": result}
+
+    def generate_complaint(self, user_story):
+        if not self.api_key: return "API Key Error"
+        # 같은 입력이면 저장해 둔 초안을 그대로 사용 (LLM 호출 없음)
+        cache = self.answer_cache
+        try:
+            cached = cache.lookup_complaint(user_story) if cache is not None else None
+        except Exception as e:
+            self.last_error = f"answer cache: {e}"
+            cached = None
+        if cached is not None:
+            telemetry.count("complaint_cache_hits")
+            return cached
+        with telemetry.span("complaint"):
+            result = self.complaint_chain().invoke({"story": user_story})
+        telemetry.count("llm_output_chars", len(result), stage="complaint")
+        if cache is not None and result:
+            try:
+                cache.store_complaint(user_story, result)
+            except Exception as e:
+                self.last_error = f"answer cache: {e}"
+        return result
+
+
+_ENGINE = None
+_ENGINE_LOCK = threading.Lock()
+
+def get_engine():
+    global _ENGINE
+    if _ENGINE is None:
+        with _ENGINE_LOCK:
+            if _ENGINE is None:
+                _ENGINE = LawLensEngine()
+    return _ENGINE
+
+
+def run_lawlens_analysis(query, normalized_text=None, candidate_crime=None, analysis=None):
+    return get_engine().analyze(query, normalized_text, candidate_crime, analysis)
+
+def stream_lawlens_analysis(query, normalized_text=None, candidate_crime=None, analysis=None):
+    return get_engine().stream(query, normalized_text, candidate_crime, analysis)
+
 # (호환성 유지)
 def get_lawlens_advisor(): pass
 def get_similarity_scores(query, k=5): pass
 
 def generate_complaint_draft(user_story):
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key: return "API Key Error"
-    llm = ChatGoogleGenerativeAI(model=LLM_MODEL, temperature=0.2, google_api_key=api_key)
-    prompt = PromptTemplate(template="[사용자 상황]\n{story}\n\n위 내용을 바탕으로 경찰청 표준 고소장 내용을 작성해줘.", input_variables=["story"])
-    chain = prompt | llm | StrOutputParser()
-    return chain.invoke({"story": user_story})
\ No newline at end of file
+    return get_engine().generate_complaint(user_story)
@@ -0,0 +1,118 @@
+import importlib
+import os
+
+import numpy as np
+
+from case_metadata import verdict_of, VERDICT_GUILTY
+from lexical_index import term_ids
+
+# --------------------------------------------------------------------------
+# 판례 재정렬(rerank) 단계
+# 검색으로 넉넉하게 가져온 후보를 CPU에서 싸게 계산되는 특징으로 다시 점수 매긴 뒤
+# 메인 판례 선정(select_cases)으로 넘긴다. 점수 계산은 (후보 수 x 특징 수) 행렬 곱 한 번.
+#
+# 특징: 검색 유사도 / 질의-판례 글자 n-gram 겹침 / 범죄 유형 일치 /
+#       공연성(space) 일치 / 대상 특정성(target_type) 일치 / 유죄 여부
+# LAWLENS_RERANKER: feature(기본), none, 또는 "모듈:클래스" (rerank(query, candidates, analysis) 구현)
+# --------------------------------------------------------------------------
+RERANKER = os.getenv("LAWLENS_RERANKER", "feature")
+
+FEATURES = ("relevance", "lexical", "crime", "space", "target", "guilty")
+DEFAULT_WEIGHTS = {
+    "relevance": 1.0,
+    "lexical": 0.5,
+    "crime": 0.3,
+    "space": 0.15,
+    "target": 0.1,
+    "guilty": 0.05,
+}
+
+# analyze_features 결과값 -> 판례 본문/제목에서 찾을 표현
+CRIME_TERMS = {
+    "모욕": ("모욕",),
+    "통신매체이용음란": ("통신매체", "음란"),
+    "명예훼손": ("명예훼손", "허위사실", "사실을 적시"),
+    "협박": ("협박",),
+}
+SPACE_TERMS = {
+    "1:1대화": ("1:1", "개인 메시지", "개인메시지", "쪽지", "DM"),
+    "소수단톡방": ("단톡방", "단체 대화방", "단체대화방", "채팅방"),
+    "다수단톡방": ("단톡방", "단체 대화방", "단체대화방", "오픈채팅"),
+    "전체채팅/게시판": ("게시판", "댓글", "커뮤니티", "게시글", "인터넷 카페", "불특정 다수"),
+}
+TARGET_TERMS = {
+    "개인(닉네임)": ("닉네임", "아이디", "별명"),
+    "개인(실명/지인)": ("실명", "지인", "동료", "직장"),
+    "집단": ("집단", "단체"),
+    "불특정": ("불특정",),
+}
+
+
+def _lookup_terms(table, value):
+    # "통신매체이용음란(통매음)"처럼 부가 설명이 붙은 값도 매칭
+    value = str(value or "")
+    for key, terms in table.items():
+        if key and key in value:
+            return terms
+    return ()
+
+
+def _doc_text(doc):
+    metadata = doc.metadata
+    return f"{metadata.get('title', '')} {metadata.get('judgment', '')} {doc.page_content}"
+
+
+def _contains_any(texts, terms):
+    if not terms:
+        return np.zeros(len(texts), dtype=np.float32)
+    return np.fromiter((any(term in text for term in terms) for text in texts), dtype=np.float32, count=len(texts))
+
+
+class NoopReranker:
+    def rerank(self, query, candidates, analysis=None):
+        return candidates
+
+
+class FeatureReranker:
+    def __init__(self, weights=None):
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.weights = np.asarray([weights[name] for name in FEATURES], dtype=np.float32)
+
+    def features(self, query, candidates, analysis=None):
+        analysis = analysis if isinstance(analysis, dict) and "error" not in analysis else {}
+        features = analysis.get("features") or {}
+        texts = [_doc_text(doc) for doc, _ in candidates]
+
+        matrix = np.zeros((len(candidates), len(FEATURES)), dtype=np.float32)
+        # 어휘 색인에서만 찾은 후보는 벡터 유사도가 없음(None) -> 0
+        matrix[:, 0] = [relevance or 0.0 for _, relevance in candidates]
+
+        # 질의 n-gram 중 판례에 등장하는 비율
+        query_ids = np.unique(term_ids(query))
+        if len(query_ids):
+            matrix[:, 1] = [np.isin(query_ids, term_ids(text)).mean() for text in texts]
+
+        matrix[:, 2] = _contains_any(texts, _lookup_terms(CRIME_TERMS, analysis.get("candidate_crime")))
+        matrix[:, 3] = _contains_any(texts, _lookup_terms(SPACE_TERMS, features.get("space")))
+        matrix[:, 4] = _contains_any(texts, _lookup_terms(TARGET_TERMS, features.get("target_type")))
+        matrix[:, 5] = [verdict_of(doc.metadata) == VERDICT_GUILTY for doc, _ in candidates]
+        return matrix
+
+    def scores(self, query, candidates, analysis=None):
+        return self.features(query, candidates, analysis) @ self.weights
+
+    def rerank(self, query, candidates, analysis=None):
+        # 순서만 바꾸고, 화면에 보여줄 유사도는 검색 단계 값을 그대로 둔다
+        if len(candidates) < 2:
+            return candidates
+        order = np.argsort(-self.scores(query, candidates, analysis), kind="stable")
+        return [candidates[i] for i in order]
+
+
+def load_reranker(name=RERANKER):
+    if not name or name == "none":
+        return NoopReranker()
+    if name == "feature":
+        return FeatureReranker()
+    module_name, _, class_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
@@ -0,0 +1,155 @@
+import telemetry
+from case_metadata import verdict_of
+
+# --------------------------------------------------------------------------
+# 유사 판례 대시보드 (결과 뷰)
+# 메시지마다 판례 목록을 열 단위(column) 리스트로 한 번만 만들어 저장하고 (DataFrame 보관 X),
+# 차트 스펙(vega-lite dict)은 처음 그릴 때 한 번만 만들어 메시지에 같이 저장한다.
+# Streamlit이 다시 실행될 때마다 지난 메시지는 저장된 값으로 그리기만 하고,
+# 지난 대화의 대시보드는 기본으로 접어 두어 펼친 것만 그린다.
+# --------------------------------------------------------------------------
+COLUMNS = ("판례명", "사건번호", "벌금(만원)", "연도", "판결", "판결_구분", "유사도(%)", "링크")
+VERDICT_DOMAIN = ["유죄", "무죄", "기타"]
+VERDICT_COLORS = ["#e74c3c", "#3498db", "#555455"]
+CASE_URL = "https://www.law.go.kr/precSc.do?menuId=7&query={case_id}"
+
+
+# ---------------------------------------------------------
+# 1. 메시지별 결과 레코드 (파생 열은 여기서 한 번만 계산)
+# ---------------------------------------------------------
+def build_view(docs, scores):
+    columns = {name: [] for name in COLUMNS}
+    for i, doc in enumerate(docs):
+        meta = doc.metadata
+        score = scores[i] if i < len(scores) else None
+        row = (
+            meta.get("title", "?"), meta.get("case_id", "?"),
+            meta.get("fine", 0), meta.get("year", 2020),
+            meta.get("judgment", "기타"), verdict_of(meta), None if score is None else score * 100,
+            CASE_URL.format(case_id=meta.get("case_id", "")),
+        )
+        for name, value in zip(COLUMNS, row):
+            columns[name].append(value)
+    # 평균은 벡터 유사도가 있는 판례만 (어휘 색인에서만 찾은 판례는 유사도 없음)
+    known = [score for score in scores if score is not None]
+    return {
+        "columns": columns,
+        "count": len(docs),
+        "avg_score": sum(known) / len(known) if known else None,
+        "specs": None,
+    }
+
+
+def _rows(columns):
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+# ---------------------------------------------------------
+# 2. 차트 스펙 (메시지당 1회 생성 후 재사용)
+# ---------------------------------------------------------
+def _build_specs(columns):
+    # altair는 대시보드를 처음 그릴 때 import
+    import altair as alt
+
+    data = alt.Data(values=_rows(columns))
+    similarity = alt.Chart(data).mark_bar(color='#ff9f43', cornerRadius=5).encode(
+        x=alt.X('사건번호:N', sort=None, axis=alt.Axis(labelAngle=-45), title='사건 번호'),
+        y=alt.Y('유사도(%):Q', scale=alt.Scale(domain=[0, 100]), title='유사도(%)'),
+        tooltip=[
+            alt.Tooltip('판례명:N', title='판례명'),
+            alt.Tooltip('유사도(%):Q', title='유사도(%)', format='.1f')
+        ]
+    ).properties(height=250)
+    # 도넛 차트 & 색상 고정: 유죄=빨강, 무죄=파랑, 기타=회색
+    verdict = alt.Chart(data).mark_arc(innerRadius=60).encode(
+        theta=alt.Theta(field="판결_구분", aggregate="count", type='quantitative'),
+        color=alt.Color('판결_구분:N',
+                        scale=alt.Scale(domain=VERDICT_DOMAIN, range=VERDICT_COLORS),
+                        legend=alt.Legend(title="판결 구분")),
+        tooltip=[
+            alt.Tooltip('판결_구분:N', title='구분'),
+            alt.Tooltip('count():Q', title='건수'),
+            alt.Tooltip('판결:N', title='상세 내용')
+        ]
+    ).properties(height=250)
+    fine = alt.Chart(data).mark_bar(cornerRadius=5).encode(
+        x=alt.X('사건번호:N', axis=alt.Axis(labelAngle=-45), title='사건 번호'),
+        y=alt.Y('벌금(만원):Q', title='벌금(만원)'),
+        color=alt.Color('판결:N'),
+        tooltip=[
+            alt.Tooltip('사건번호:N', title='사건번호'),
+            alt.Tooltip('벌금(만원):Q', title='벌금')
+        ]
+    ).properties(height=200)
+    trend = alt.Chart(data).mark_line(point=True).encode(
+        x=alt.X('연도:O', title='연도'),
+        y=alt.Y('벌금(만원):Q', title='벌금(만원)'),
+        color=alt.value("#8b5c49"),
+        tooltip=[
+            alt.Tooltip('연도:O', title='연도'),
+            alt.Tooltip('벌금(만원):Q', title='벌금')
+        ]
+    ).properties(height=200)
+    return {
+        "similarity": similarity.to_dict(),
+        "verdict": verdict.to_dict(),
+        "fine": fine.to_dict(),
+        "trend": trend.to_dict(),
+    }
+
+
+def chart_specs(view):
+    if view["specs"] is None:
+        view["specs"] = _build_specs(view["columns"])
+    return view["specs"]
+
+
+# ---------------------------------------------------------
+# 3. 그리기
+# ---------------------------------------------------------
+def _column_config(st):
+    return {
+        "판례명": st.column_config.TextColumn("판례 제목", width="medium"),
+        "사건번호": st.column_config.TextColumn("사건 번호"),
+        "유사도(%)": st.column_config.ProgressColumn("유사도", format="%.1f%%", min_value=0, max_value=100),
+        "벌금(만원)": st.column_config.NumberColumn("벌금", format="%d 만원"),
+        "판결": st.column_config.TextColumn("결과"),
+        "판결_구분": st.column_config.TextColumn("구분"),
+        "링크": st.column_config.LinkColumn("판례 원본", display_text="전문 보기 🔗")
+    }
+
+
+def render_dashboard(st, view):
+    avg_score = view["avg_score"]
+    st.metric("전체 판례 평균 유사도", "-" if avg_score is None else f"{avg_score*100:.1f}%")
+    if not view["count"]:
+        return
+    specs = chart_specs(view)
+
+    col1, col2 = st.columns([1.5, 1])
+    with col1:
+        st.markdown("##### 📏 판례별 유사도 비교")
+        st.vega_lite_chart(specs["similarity"], theme="streamlit")
+    with col2:
+        st.markdown("##### ⚖️ 판결 결과 비율")
+        st.vega_lite_chart(specs["verdict"], theme="streamlit")
+
+    col3, col4 = st.columns(2)
+    with col3:
+        st.markdown("##### 💰 벌금 액수 비교")
+        st.vega_lite_chart(specs["fine"], theme="streamlit")
+    with col4:
+        st.markdown("##### 📈 연도별 추이")
+        st.vega_lite_chart(specs["trend"], theme="streamlit")
+
+    st.markdown("##### 🔎 상세 판례 데이터 (원본 보기)")
+    st.dataframe(view["columns"], column_config=_column_config(st), hide_index=True, width="stretch")
+
+
+def render_message_dashboard(st, view, key, expanded=False):
+    # 펼치기 전에는 차트/표를 만들지 않는다 (지난 대화는 기본으로 접힘)
+    st.markdown("---")
+    label = f"📊 유사 판례 분석 대시보드 ({view['count']}건)"
+    if st.toggle(label, value=expanded, key=f"dashboard_{key}"):
+        with telemetry.span("render_dashboard", cases=view["count"], cached=view["specs"] is not None):
+            render_dashboard(st, view)
@@ -0,0 +1,134 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import pytesseract
+
+import model_pool
+
+# --------------------------------------------------------------------------
+# 채팅 스크린샷 전처리 + 말풍선 단위 OCR
+# 1. 긴 휴대폰 스크린샷은 폭 기준으로 축소하고 (다크 모드는 반전) 적응형 이진화
+# 2. 글자 영역을 팽창시켜 말풍선/텍스트 블록을 찾고, 해당 영역만 잘라 병렬 OCR
+# 3. 블록의 좌/우 정렬로 화자를 구분 (오른쪽 = 나, 왼쪽 = 상대방, 가운데 = 날짜/시스템)
+# --------------------------------------------------------------------------
+MAX_WIDTH = int(os.getenv("LAWLENS_OCR_MAX_WIDTH", "1080"))
+OCR_LANG = "kor+eng"
+BLOCK_CONFIG = "--psm 6"
+SELF_SPEAKER = "나"
+OTHER_SPEAKER = "상대방"
+BLOCK_WORKERS = os.cpu_count() or 1
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_executor():
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(max_workers=BLOCK_WORKERS, thread_name_prefix="lawlens-ocr-block")
+    return _EXECUTOR
+
+
+# 이미지 여러 장 x 블록 여러 개가 동시에 돌 때 tesseract 프로세스 수를 코어 수로 제한 (LAWLENS_TESSERACT_SLOTS)
+def run_tesseract(img, config=""):
+    with model_pool.inference_slot("tesseract"):
+        return pytesseract.image_to_string(img, lang=OCR_LANG, config=config)
+
+
+# ---------------------------------------------------------
+# 전처리
+# ---------------------------------------------------------
+def prepare_gray(img):
+    height, width = img.shape[:2]
+    if width > MAX_WIDTH:
+        scale = MAX_WIDTH / width
+        img = cv2.resize(img, (MAX_WIDTH, int(height * scale)), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    # 다크 모드 (어두운 배경에 밝은 글씨) -> 반전해서 항상 밝은 배경/어두운 글씨로 맞춤
+    if float(np.mean(gray)) < 110:
+        gray = cv2.bitwise_not(gray)
+    return gray
+
+
+def binarize(gray):
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+
+
+# ---------------------------------------------------------
+# 말풍선/텍스트 블록 검출
+# ---------------------------------------------------------
+def detect_text_blocks(gray):
+    height, width = gray.shape[:2]
+    text_mask = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 25, 15)
+    # 가로로 글자/단어를 잇고, 세로로 여러 줄짜리 말풍선을 하나로 묶는다
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(9, width // 30), max(5, width // 90)))
+    merged = cv2.dilate(text_mask, kernel, iterations=2)
+    contours = cv2.findContours(merged, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+
+    blocks = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h < 12 or w < 20:
+            continue  # 아이콘/잡음
+        if w > width * 0.98 and h > height * 0.5:
+            continue  # 화면 전체를 덮는 배경
+        blocks.append((x, y, w, h))
+    blocks.sort(key=lambda b: (b[1], b[0]))
+    return blocks
+
+
+def attribute_speaker(block, width):
+    x, _, w, _ = block
+    center = x + w / 2
+    # 양쪽 여백이 있고 가운데 정렬된 블록은 날짜/시스템 메시지
+    left, right = x, width - (x + w)
+    if abs(center - width / 2) < width * 0.08 and left > width * 0.1 and right > width * 0.1:
+        return None
+    # 중심 대신 좌우 여백으로 판단 (왼쪽 정렬된 긴 말풍선은 중심이 화면 가운데를 넘을 수 있음)
+    return SELF_SPEAKER if left > right else OTHER_SPEAKER
+
+
+def _ocr_block(binary, block):
+    x, y, w, h = block
+    pad = 6
+    crop = binary[max(0, y - pad):y + h + pad, max(0, x - pad):x + w + pad]
+    return run_tesseract(crop, BLOCK_CONFIG).strip()
+
+
+# ---------------------------------------------------------
+# 스크린샷 -> 화자별 줄 목록
+# ---------------------------------------------------------
+def extract_chat_lines(img):
+    gray = prepare_gray(img)
+    binary = binarize(gray)
+    width = gray.shape[1]
+    blocks = detect_text_blocks(gray)
+    if not blocks:
+        return []
+
+    texts = list(_get_executor().map(lambda block: _ocr_block(binary, block), blocks))
+    lines = []
+    for block, text in zip(blocks, texts):
+        if not text:
+            continue
+        speaker = attribute_speaker(block, width)
+        text = " ".join(text.split())
+        lines.append({"speaker": speaker, "text": text, "box": block})
+    return lines
+
+
+def format_chat_lines(lines):
+    return "\n".join(f"[{line['speaker']}] {line['text']}" if line["speaker"] else line["text"] for line in lines)
+
+
+def extract_chat_text(img):
+    lines = extract_chat_lines(img)
+    if lines:
+        return format_chat_lines(lines)
+    # 블록을 못 찾으면 이진화된 전체 이미지로 한 번 더 시도
+    return run_tesseract(binarize(prepare_gray(img))).strip()
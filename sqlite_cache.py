@@ -0,0 +1,219 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# --------------------------------------------------------------------------
+# SQLite 기반 영속 캐시 (키-값 + 선택적 벡터 컬럼)
+# TTL 만료 / LRU(최근 접근 순) 제거 / 개수·용량 제한 / 히트율 통계 지원
+# 답변 캐시, 임베딩 캐시 등에서 공통으로 사용한다.
+# --------------------------------------------------------------------------
+CACHE_DIR = os.getenv("LAWLENS_CACHE_DIR", "./.lawlens_cache")
+
+
+def cache_path(filename):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, filename)
+
+
+class SQLiteCache:
+    def __init__(self, path, ttl=None, max_entries=None, max_bytes=None):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._vector_indexes = {}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                vector BLOB,
+                tag TEXT,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_tag ON entries(tag)")
+        self._conn.commit()
+
+    def _is_expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    # ---------------------------------------------------------
+    # 조회
+    # ---------------------------------------------------------
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        expired = []
+        with self._lock:
+            # SQLite 변수 개수 제한을 피하기 위해 나눠서 조회
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value, created FROM entries WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for key, value, created in rows:
+                    if self._is_expired(created, now):
+                        expired.append(key)
+                    else:
+                        found[key] = value
+            if found:
+                self._conn.executemany(
+                    "UPDATE entries SET accessed = ? WHERE key = ?", [(now, key) for key in found]
+                )
+            if expired:
+                self._delete_locked(expired)
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    # 코사인 유사도가 threshold 이상인 가장 가까운 항목 (벡터가 저장된 항목만 대상)
+    def nearest(self, vector, threshold, tag=None):
+        query = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return None
+        keys, matrix = self._vector_index(tag, query.shape[0])
+        if not keys:
+            return None
+        sims = matrix @ (query / norm)
+        best = int(np.argmax(sims))
+        if float(sims[best]) < threshold:
+            return None
+        value = self.get(keys[best])
+        if value is None:
+            return None
+        return keys[best], value, float(sims[best])
+
+    def _vector_index(self, tag, dim):
+        cached = self._vector_indexes.get((tag, dim))
+        if cached is not None and cached[0] == self._generation:
+            return cached[1], cached[2]
+
+        with self._lock:
+            generation = self._generation
+            if tag is None:
+                rows = self._conn.execute("SELECT key, vector FROM entries WHERE vector IS NOT NULL").fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT key, vector FROM entries WHERE vector IS NOT NULL AND tag = ?", (tag,)
+                ).fetchall()
+
+        keys = []
+        vectors = []
+        for key, blob in rows:
+            vec = np.frombuffer(blob, dtype=np.float32)
+            if vec.shape[0] == dim:
+                keys.append(key)
+                vectors.append(vec)
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, dim), dtype=np.float32)
+        self._vector_indexes[(tag, dim)] = (generation, keys, matrix)
+        return keys, matrix
+
+    # ---------------------------------------------------------
+    # 저장 / 삭제
+    # ---------------------------------------------------------
+    def put(self, key, value, vector=None, tag=None):
+        self.put_many([(key, value, vector, tag)])
+
+    def put_many(self, items):
+        now = time.time()
+        rows = []
+        for key, value, vector, tag in items:
+            blob = None
+            if vector is not None:
+                vec = np.asarray(vector, dtype=np.float32)
+                norm = float(np.linalg.norm(vec))
+                # 유사도 검색용이므로 정규화해서 저장
+                blob = (vec / norm if norm else vec).astype(np.float32).tobytes()
+            size = len(value) + (len(blob) if blob else 0)
+            rows.append((key, value, blob, tag, now, now, size))
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, vector, tag, created, accessed, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._evict_locked(now)
+            self._conn.commit()
+            self._generation += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._delete_locked([key])
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self._generation += 1
+            self.hits = 0
+            self.misses = 0
+
+    def _delete_locked(self, keys):
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+        self._generation += 1
+
+    def _evict_locked(self, now):
+        # 1. 만료 항목 제거
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+        # 2. 개수 제한 (오래 안 쓴 것부터)
+        if self.max_entries is not None:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY accessed ASC LIMIT ?)", (count - self.max_entries,)
+                )
+        # 3. 용량 제한
+        if self.max_bytes is not None:
+            (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                victims = []
+                for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC"):
+                    victims.append(key)
+                    excess -= size
+                    if excess <= 0:
+                        break
+                self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in victims])
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
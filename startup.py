@@ -0,0 +1,115 @@
+import importlib
+import os
+import sys
+import threading
+import time
+
+# --------------------------------------------------------------------------
+# 앱 시작 시간 단축: 무거운 백엔드 지연 로딩 + 백그라운드 예열 + 시작 시간 보고
+# - 미디어(OCR/STT: cv2, pytesseract, whisper -> torch)는 파일을 처음 올렸을 때 import
+# - 검색/생성(Chroma, Google GenAI)은 첫 화면을 그린 뒤 백그라운드 스레드에서 미리 준비 (LAWLENS_PREWARM)
+#     none: 예열 안 함 (첫 질문 때 로드) / retrieval: 판례 검색 엔진 (기본) / all: + 미디어 모듈
+# - report(): 단계별 소요 시간, 현재 RSS, 로드된 무거운 모듈
+# --------------------------------------------------------------------------
+PREWARM = os.getenv("LAWLENS_PREWARM", "retrieval")
+HEAVY_MODULES = ("torch", "whisper", "cv2", "pytesseract", "chromadb", "langchain_chroma", "langchain_google_genai", "altair")
+
+STARTED = time.perf_counter()
+_timings = {}
+_lock = threading.Lock()
+_prewarm_thread = None
+
+
+def _record(name, seconds):
+    with _lock:
+        _timings.setdefault(name, round(seconds, 3))
+
+
+def mark(name):
+    # 프로세스에서 startup을 처음 import한 시점부터 경과 시간 (같은 이름은 처음 한 번만)
+    _record(name, time.perf_counter() - STARTED)
+
+
+def timed_import(name):
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    _record(f"import {name}", time.perf_counter() - started)
+    return module
+
+
+def media():
+    return timed_import("media_utils")
+
+
+# ---------------------------------------------------------
+# 백그라운드 예열 (프로세스당 1회)
+# ---------------------------------------------------------
+def _prewarm(targets):
+    if targets in ("retrieval", "all"):
+        started = time.perf_counter()
+        try:
+            from rag_system import get_engine
+            get_engine().warm_up()
+        except Exception as e:
+            print(f"[LawLens] 검색 엔진 예열 실패: {e}", file=sys.stderr)
+        _record("prewarm retrieval", time.perf_counter() - started)
+    if targets == "all":
+        started = time.perf_counter()
+        try:
+            media()
+        except Exception as e:
+            print(f"[LawLens] 미디어 모듈 예열 실패: {e}", file=sys.stderr)
+        _record("prewarm media", time.perf_counter() - started)
+    print(format_report(), file=sys.stderr)
+
+
+def prewarm(targets=PREWARM):
+    global _prewarm_thread
+    if not targets or targets == "none":
+        return None
+    with _lock:
+        if _prewarm_thread is None:
+            _prewarm_thread = threading.Thread(target=_prewarm, args=(targets,), name="lawlens-prewarm", daemon=True)
+            _prewarm_thread.start()
+    return _prewarm_thread
+
+
+# ---------------------------------------------------------
+# 시작 시간 보고
+# ---------------------------------------------------------
+def rss_mb():
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        # 리눅스 외 환경은 최대 RSS로 대신함 (macOS는 바이트 단위)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except (ImportError, OSError):
+        return None
+
+
+def report():
+    with _lock:
+        timings = dict(_timings)
+    return {
+        "timings": timings,
+        "rss_mb": rss_mb(),
+        "prewarm": PREWARM,
+        "loaded": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+
+def format_report(data=None):
+    data = data or report()
+    rss = f"{data['rss_mb']:.0f}MB" if data["rss_mb"] is not None else "알 수 없음"
+    timings = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in data["timings"].items())
+    return f"[LawLens] 시작: {timings} / RSS {rss} / 로드된 모듈: {', '.join(data['loaded']) or '없음'}"
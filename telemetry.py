@@ -0,0 +1,244 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+# --------------------------------------------------------------------------
+# 단계별 소요 시간 / 카운터 측정 (진단 파이프라인 병목 확인용)
+# - span("ocr", bytes=...)으로 감싼 구간의 시간을 단계별 히스토그램에 누적하고 최근 구간을 보관
+# - count("llm_output_chars", n, stage="report")로 토큰/바이트 등 카운터 누적
+# - 내보내기: LAWLENS_TELEMETRY_FILE (구간마다 JSONL 한 줄) / LAWLENS_METRICS_PORT (Prometheus 텍스트 /metrics)
+#   /metrics는 인증이 없으므로 기본으로 로컬에서만 받는다 (다른 호스트에서 수집하려면 LAWLENS_METRICS_HOST)
+# - LAWLENS_TELEMETRY=1 일 때만 동작. 꺼져 있으면 span()은 공유 no-op 객체를 돌려주고 count()는 바로 반환
+# --------------------------------------------------------------------------
+TELEMETRY_ENABLED = os.getenv("LAWLENS_TELEMETRY", "0") == "1"
+TELEMETRY_FILE = os.getenv("LAWLENS_TELEMETRY_FILE", "")
+METRICS_PORT = int(os.getenv("LAWLENS_METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("LAWLENS_METRICS_HOST", "127.0.0.1")
+RECENT_SPANS = 1000
+# 히스토그램 구간 경계 (초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+_enabled = TELEMETRY_ENABLED
+_lock = threading.Lock()
+_histograms = {}
+_counters = defaultdict(float)
+_recent = deque(maxlen=RECENT_SPANS)
+_file = None
+_server = None
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(flag):
+    global _enabled
+    _enabled = bool(flag)
+
+
+# ---------------------------------------------------------
+# 1. 구간(span)
+# ---------------------------------------------------------
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def paused(self):
+        return self
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "started_at", "_started", "_paused")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self._paused = 0.0
+
+    def __enter__(self):
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._started - self._paused
+        if exc_type is GeneratorExit:
+            self.attrs["closed"] = True
+        elif exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _record(self, duration)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def paused(self):
+        # 생성기 구간에서 yield 동안(소비자 처리 시간)은 빼고 잰다: with stage.paused(): yield ...
+        return _Pause(self)
+
+
+class _Pause:
+    __slots__ = ("span", "_started")
+
+    def __init__(self, span):
+        self.span = span
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span._paused += time.perf_counter() - self._started
+        return False
+
+
+def span(name, **attrs):
+    if not _enabled:
+        return _NOOP
+    return Span(name, attrs)
+
+
+def count(name, value=1, **labels):
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] += value
+
+
+def _record(s, duration):
+    event = {"span": s.name, "ts": s.started_at, "ms": round(duration * 1000, 3),
+             "thread": threading.current_thread().name, **s.attrs}
+    with _lock:
+        histogram = _histograms.get(s.name)
+        if histogram is None:
+            histogram = _histograms[s.name] = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(BUCKETS)}
+        histogram["count"] += 1
+        histogram["sum"] += duration
+        histogram["max"] = max(histogram["max"], duration)
+        for i, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                histogram["buckets"][i] += 1
+                break
+        _recent.append(event)
+        if TELEMETRY_FILE:
+            _write(event)
+
+
+def _write(event):
+    # _lock 안에서 호출됨
+    global _file
+    if _file is None:
+        directory = os.path.dirname(TELEMETRY_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _file = open(TELEMETRY_FILE, "a", encoding="utf-8", buffering=1)
+    _file.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+
+
+# ---------------------------------------------------------
+# 2. 조회 (디버그 패널 / 벤치마크)
+# ---------------------------------------------------------
+def recent_spans(since=None):
+    with _lock:
+        events = list(_recent)
+    if since is not None:
+        events = [event for event in events if event["ts"] >= since]
+    return events
+
+
+def summary():
+    with _lock:
+        stages = {
+            name: {"count": h["count"], "mean_ms": h["sum"] / h["count"] * 1000, "max_ms": h["max"] * 1000}
+            for name, h in _histograms.items()
+        }
+        counters = {_counter_label(name, labels): value for (name, labels), value in _counters.items()}
+    return {"stages": stages, "counters": counters}
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _recent.clear()
+
+
+def _counter_label(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+
+# ---------------------------------------------------------
+# 3. Prometheus 텍스트 형식 (/metrics)
+# ---------------------------------------------------------
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+
+def prometheus_text():
+    lines = ["# TYPE lawlens_stage_seconds histogram"]
+    with _lock:
+        for name, h in sorted(_histograms.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS, h["buckets"]):
+                cumulative += n
+                le = "+Inf" if math.isinf(bound) else repr(bound)
+                lines.append(f'lawlens_stage_seconds_bucket{_labels((("stage", name), ("le", le)))} {cumulative}')
+            lines.append(f'lawlens_stage_seconds_sum{_labels((("stage", name),))} {h["sum"]:.6f}')
+            lines.append(f'lawlens_stage_seconds_count{_labels((("stage", name),))} {h["count"]}')
+        counters = sorted(_counters.items())
+    typed = set()
+    for (name, labels), value in counters:
+        metric = "lawlens_" + name.replace(".", "_") + "_total"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    # 포트가 0이거나 측정이 꺼져 있으면 아무것도 하지 않음 (프로세스당 1회)
+    global _server
+    if not port or not _enabled or _server is not None:
+        return _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="lawlens-metrics", daemon=True).start()
+    return _server
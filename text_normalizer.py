@@ -0,0 +1,111 @@
+import re
+from functools import lru_cache
+
+import emoji
+
+# --------------------------------------------------------------------------
+# 정규화 (Normalization) & 노이즈 제거 (Noise Cleaning)
+# LawLensPreprocessor.clean_text의 구현부. 출력은 기존 구현과 글자 단위로 동일하다.
+# - 정규식은 모듈 로드 시 한 번만 컴파일
+# - 시스템 메시지는 ".*" 백트래킹 대신 줄 단위 문자열 검사로 제거
+# - 이모지/전화번호/타임스탬프가 없는 텍스트는 해당 단계를 건너뜀
+# --------------------------------------------------------------------------
+
+# 1. 날짜/시간 패턴 (예: "2024년 1월 1일 월요일", "---- 2024.01.01 ----", "[오전 10:30]", "14:20:55")
+_DATE_LINE_RE = re.compile(r'[-=]*\s*\d{4}[년.-]\s*\d{1,2}[월.-]\s*\d{1,2}[일.-]?\s*.*[-=]*')
+_TIMESTAMP_RE = re.compile(r'\[?\s*(오전|오후)?\s*\d{1,2}:\d{2}(:\d{2})?\s*\]?')
+
+# 2. 시스템 메시지 (해당 문구가 들어간 줄은 통째로 비움)
+_SYSTEM_MARKERS = ("님이 입장하셨습니다", "님이 나갔습니다", "채팅방을 나갔습니다")
+_INVITE_HEAD = "님이 "
+_INVITE_TAIL = "님을 초대했습니다"
+
+# 3. 개인정보(PII) 마스킹: 전화번호 (010-1234-5678, 010 1234 5678) -> [전화번호]
+_PHONE_RE = re.compile(r'01[016789][-\s.]?\d{3,4}[-\s.]?\d{4}')
+
+# 4. 반복 문자 축약
+_REPEAT_RE = re.compile(r'(.)\1{2,}')
+
+# 5. 이모지 문자 테이블
+# ASCII로 시작하는 이모지는 키캡(#️⃣, 1️⃣ 등)뿐이고 키캡 문자(U+20E3)는 테이블에 포함된다.
+# demojize는 단독 U+FE0F도 지우므로 시작 문자가 아닌 구성 문자까지 모두 검사 대상으로 둔다.
+# 텍스트 표현 선택자(U+FE0E, 예: iOS의 "♥︎")는 EMOJI_DATA에 없지만 demojize가 지우므로 따로 넣는다.
+# 이모지 시퀀스는 이모지 구성 문자 밖으로 이어지지 않으므로, 연속 구간만 demojize해도 결과가 같다.
+_EMOJI_CHARS = frozenset(c for e in emoji.EMOJI_DATA for c in e if not c.isascii()) | {"\ufe0e"}
+
+
+def _char_class(chars):
+    # 연속된 코드포인트를 범위로 묶어야 re 문자 클래스 검사가 빠르다
+    ranges = []
+    for cp in sorted(ord(c) for c in chars):
+        if ranges and ranges[-1][1] == cp - 1:
+            ranges[-1][1] = cp
+        else:
+            ranges.append([cp, cp])
+    return "".join(
+        re.escape(chr(a)) if a == b else f"{re.escape(chr(a))}-{re.escape(chr(b))}" for a, b in ranges
+    )
+
+
+_EMOJI_RUN_RE = re.compile("[#*0-9]?[" + _char_class(_EMOJI_CHARS) + "]+")
+
+
+def _is_system_line(line):
+    for marker in _SYSTEM_MARKERS:
+        if marker in line:
+            return True
+    head = line.find(_INVITE_HEAD)
+    return head >= 0 and line.find(_INVITE_TAIL, head + len(_INVITE_HEAD)) >= 0
+
+
+def _drop_system_lines(text):
+    # "."은 "\n"만 제외하므로 "\n" 기준으로만 나눈다 (splitlines 사용 금지)
+    lines = text.split("\n")
+    changed = False
+    for i, line in enumerate(lines):
+        if line and _is_system_line(line):
+            lines[i] = ""
+            changed = True
+    return "\n".join(lines) if changed else text
+
+
+def has_emoji(text):
+    return not _EMOJI_CHARS.isdisjoint(text)
+
+
+# 같은 이모지 구간은 반복해서 등장하므로 변환 결과를 기억해 둔다
+@lru_cache(maxsize=8192)
+def _demojize_cached(run):
+    return emoji.demojize(run, language='ko')
+
+
+def _demojize_run(match):
+    return _demojize_cached(match.group(0))
+
+
+def normalize_text(text):
+    if not text:
+        return ""
+    # 1. 날짜 구분선 / 타임스탬프 제거
+    text = _DATE_LINE_RE.sub('', text)
+    if ":" in text:
+        text = _TIMESTAMP_RE.sub('', text)
+
+    # 2. 시스템 메시지 제거
+    if "님" in text or _SYSTEM_MARKERS[2] in text:
+        text = _drop_system_lines(text)
+
+    # 3. 전화번호 마스킹
+    if "01" in text:
+        text = _PHONE_RE.sub('[전화번호]', text)
+
+    # 4. 반복 문자 축약
+    text = _REPEAT_RE.sub(r'\1\1', text)
+
+    # 5. 이모지 -> 텍스트 (콜론 제거로 토큰화 용이하게)
+    if has_emoji(text):
+        text = _EMOJI_RUN_RE.sub(_demojize_run, text)
+    text = text.replace(":", " ")
+
+    # 6. 다중 공백 및 줄바꿈 정리 (str.split과 \s는 같은 공백 정의를 사용)
+    return " ".join(text.split())
@@ -0,0 +1,242 @@
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import model_pool
+
+# --------------------------------------------------------------------------
+# 긴 녹음 파일용 음성 인식 파이프라인
+# 1. 오디오를 한 번만 디코딩 (16kHz mono float32)
+# 2. 에너지 기반 VAD로 무음 구간 제거
+# 3. 발화 구간을 30초 이하 청크로 묶어 작업자 풀에서 병렬 인식
+# 4. 청크별 세그먼트를 원래 타임라인 기준 타임스탬프로 이어 붙이고, 타임라인 순서대로 부분 결과 제공
+# --------------------------------------------------------------------------
+# whisper.audio.SAMPLE_RATE (whisper/torch는 실제로 인식할 때 처음 import)
+SAMPLE_RATE = 16000
+WHISPER_MODEL = os.getenv("LAWLENS_WHISPER_MODEL", "tiny")
+WHISPER_LANGUAGE = os.getenv("LAWLENS_WHISPER_LANGUAGE") or None
+# process 백엔드의 워커 프로세스 수 (thread 백엔드는 공유 모델 하나로 차례로 처리)
+STT_WORKERS = int(os.getenv("LAWLENS_STT_WORKERS", str(min(2, os.cpu_count() or 1))))
+CHUNK_SECONDS = 30.0
+
+FRAME_SECONDS = 0.03
+MIN_SILENCE_SECONDS = 0.6
+SPEECH_PAD_SECONDS = 0.2
+MIN_SPEECH_SECONDS = 0.25
+
+
+# ---------------------------------------------------------
+# 1. 디코딩 (파일 경로 또는 메모리 바이트)
+# ---------------------------------------------------------
+def load_audio(path):
+    import whisper
+    return whisper.load_audio(path, sr=SAMPLE_RATE)
+
+
+def load_audio_bytes(data):
+    # 임시 파일 없이 ffmpeg 표준 입력으로 디코딩
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-",
+    ]
+    out = subprocess.run(cmd, input=data, capture_output=True, check=True).stdout
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+# ---------------------------------------------------------
+# 2. VAD (프레임 RMS 에너지 + 적응형 임계값)
+# ---------------------------------------------------------
+def detect_speech(audio, sr=SAMPLE_RATE):
+    frame = int(sr * FRAME_SECONDS)
+    count = len(audio) // frame
+    if count == 0:
+        return [(0, len(audio))] if len(audio) else []
+
+    frames = audio[:count * frame].reshape(count, frame)
+    db = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+    # 배경 소음보다 충분히 크거나, 최대 음량 대비 너무 작지 않은 프레임을 발화로 본다
+    threshold = max(np.percentile(db, 10) + 10.0, db.max() - 45.0)
+    voiced = db > threshold
+
+    segments = []
+    start = None
+    for i, is_voiced in enumerate(voiced):
+        if is_voiced and start is None:
+            start = i
+        elif not is_voiced and start is not None:
+            segments.append([start, i])
+            start = None
+    if start is not None:
+        segments.append([start, count])
+
+    # 짧은 무음은 이어 붙이고, 너무 짧은 발화는 버림
+    gap = int(MIN_SILENCE_SECONDS / FRAME_SECONDS)
+    merged = []
+    for seg in segments:
+        if merged and seg[0] - merged[-1][1] <= gap:
+            merged[-1][1] = seg[1]
+        else:
+            merged.append(seg)
+
+    pad = int(SPEECH_PAD_SECONDS * sr)
+    min_len = int(MIN_SPEECH_SECONDS * sr)
+    result = []
+    for s, e in merged:
+        s, e = max(0, s * frame - pad), min(len(audio), e * frame + pad)
+        if e - s >= min_len:
+            result.append((s, e))
+    return result
+
+
+# ---------------------------------------------------------
+# 3. 청크 구성 (발화 구간을 30초 이하로 묶기)
+# ---------------------------------------------------------
+def make_chunks(segments, sr=SAMPLE_RATE, chunk_seconds=CHUNK_SECONDS):
+    limit = int(chunk_seconds * sr)
+    chunks = []
+    for s, e in segments:
+        # 30초보다 긴 발화는 강제로 나눔
+        while e - s > limit:
+            chunks.append([s, s + limit])
+            s += limit
+        if chunks and e - chunks[-1][0] <= limit:
+            chunks[-1][1] = e
+        else:
+            chunks.append([s, e])
+    return [tuple(c) for c in chunks]
+
+
+# ---------------------------------------------------------
+# 4. 병렬 인식
+# whisper의 transcribe는 모델에 KV 캐시 훅을 걸기 때문에 한 모델을 동시에 쓸 수 없다.
+# - thread: 프로세스당 공유 모델 하나만 두고 청크를 한 번에 하나씩 인식 (torch가 모든 코어 사용).
+#           복제본을 만들지 않으므로 메모리는 모델 1개분
+# - process: 모델을 미리 로드한 뒤 fork한 워커 프로세스가 가중치를 copy-on-write로 공유 (청크 병렬 인식)
+# ---------------------------------------------------------
+STT_BACKEND = os.getenv("LAWLENS_STT_BACKEND", "thread")
+
+
+def transcribe_samples(model, samples, offset, language=None):
+    result = model.transcribe(samples, language=language, fp16=False, condition_on_previous_text=False)
+    segments = [
+        {"start": offset + seg["start"], "end": offset + seg["end"], "text": seg["text"].strip()}
+        for seg in result.get("segments", [])
+        if seg["text"].strip()
+    ]
+    return {
+        "start": offset,
+        "end": offset + len(samples) / SAMPLE_RATE,
+        "text": " ".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "language": result.get("language"),
+    }
+
+
+def _transcribe_in_process(model_name, samples, offset, language):
+    # 워커 프로세스에서 실행 (fork 전에 로드된 모델을 그대로 사용)
+    return transcribe_samples(model_pool.get_model(model_pool.whisper_key(model_name)), samples, offset, language)
+
+
+class WhisperWorkers:
+    def __init__(self, model_name=WHISPER_MODEL, workers=STT_WORKERS, backend=STT_BACKEND):
+        self.model_name = model_name
+        self.workers = max(1, workers)
+        self.backend = backend
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def key(self):
+        return model_pool.whisper_key(self.model_name)
+
+    def model(self):
+        return model_pool.get_model(self.key)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.backend == "process":
+                        self._executor = model_pool.make_process_pool(self.workers, preload_names=(self.key,))
+                    else:
+                        # 공유 모델은 동시에 쓸 수 없으므로 작업 스레드 하나가 청크를 차례로 처리한다
+                        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lawlens-stt")
+        return self._executor
+
+    def transcribe_chunk(self, audio, chunk, language=None):
+        start, end = chunk
+        with model_pool.inference_slot("whisper"):
+            return transcribe_samples(self.model(), audio[start:end], start / SAMPLE_RATE, language)
+
+    def submit(self, audio, chunk, language=None):
+        if self.backend == "process":
+            start, end = chunk
+            # 프로세스 워커에는 해당 구간 샘플만 넘긴다
+            return self.executor.submit(_transcribe_in_process, self.model_name, audio[start:end],
+                                        start / SAMPLE_RATE, language)
+        return self.executor.submit(self.transcribe_chunk, audio, chunk, language)
+
+    def iter_transcribe(self, audio, language=WHISPER_LANGUAGE):
+        chunks = make_chunks(detect_speech(audio))
+        if not chunks:
+            return
+
+        # 언어를 지정하지 않았다면 첫 청크에서 감지한 언어를 나머지에 재사용
+        first = self.submit(audio, chunks[0], language).result()
+        yield first
+        language = language or first["language"]
+
+        futures = [self.submit(audio, chunk, language) for chunk in chunks[1:]]
+        try:
+            # 끝난 순서가 아니라 타임라인 순서대로 내보냄
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+_WORKERS = {}
+_WORKERS_LOCK = threading.Lock()
+
+def get_workers(model_name=WHISPER_MODEL):
+    with _WORKERS_LOCK:
+        if model_name not in _WORKERS:
+            _WORKERS[model_name] = WhisperWorkers(model_name)
+        return _WORKERS[model_name]
+
+
+def format_timestamp(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+def format_transcript(result):
+    # 구간별 "[mm:ss] 텍스트" 줄 (구간 정보가 없으면 이어 붙인 텍스트 그대로)
+    if not result["segments"]:
+        return result["text"]
+    return "\n".join(f"[{format_timestamp(seg['start'])}] {seg['text']}" for seg in result["segments"])
+
+
+def iter_transcription(audio, model_name=WHISPER_MODEL):
+    return get_workers(model_name).iter_transcribe(audio)
+
+
+def transcribe_audio(audio, model_name=WHISPER_MODEL, on_partial=None):
+    # audio: 디코딩된 float32 배열. on_partial(지금까지의 텍스트)로 부분 결과 전달
+    texts = []
+    segments = []
+    language = None
+    for chunk in iter_transcription(audio, model_name):
+        language = language or chunk["language"]
+        if chunk["text"]:
+            texts.append(chunk["text"])
+        segments.extend(chunk["segments"])
+        if on_partial is not None:
+            on_partial(" ".join(texts))
+    return {"text": " ".join(texts), "segments": segments, "language": language}